@@ -0,0 +1,79 @@
+"""
+Executa cada implementação sobre o mesmo corpus de vetores e compara a vazão.
+
+Contrato de um harness: recebe o caminho de `vectors.json` como último
+argumento, corre os vetores e imprime UMA linha JSON em stdout:
+
+    {"impl": "go", "failed": 0, "ops_per_sec": {"seal_verify": ..., "mask": ..., "shadow": ..., "nonce": ...}}
+
+Implementações sem harness (ou sem toolchain instalada) aparecem como
+"sem harness" / "toolchain ausente" em vez de falharem a execução.
+
+Uso: python conformance/run_benchmarks.py [--seconds 1]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VECTORS = os.path.join(ROOT, "conformance", "vectors.json")
+
+# nome -> (pasta, ficheiro do harness, comando sem o caminho do corpus)
+HARNESSES = {
+    "python": ("implementations/python", "elp_conformance.py",
+               [sys.executable, "elp_conformance.py", "bench", "--json", "--seconds", "{seconds}"]),
+    "python-native": ("implementations/python", "elp_conformance.py",
+                      [sys.executable, "elp_conformance.py", "--native", "bench", "--json", "--seconds", "{seconds}"]),
+    "go": ("implementations/go", "cmd/elp-conformance/main.go", ["go", "run", "./cmd/elp-conformance"]),
+    "rust": ("implementations/rust", "examples/conformance.rs", ["cargo", "run", "--release", "--example", "conformance", "--"]),
+    "typescript": ("implementations/typescript", "conformance.ts", ["npx", "ts-node", "conformance.ts"]),
+    "kotlin": ("implementations/kotlin", "src/main/kotlin/Conformance.kt", ["gradle", "-q", "runConformance", "--args"]),
+}
+
+
+def run(name: str, seconds: float) -> dict:
+    folder, harness, command = HARNESSES[name]
+    cwd = os.path.join(ROOT, folder)
+    if not os.path.exists(os.path.join(cwd, harness)):
+        return {"impl": name, "status": "sem harness"}
+    if shutil.which(command[0]) is None:
+        return {"impl": name, "status": "toolchain ausente"}
+    argv = [part.format(seconds=seconds) for part in command] + [VECTORS]
+    proc = subprocess.run(argv, cwd=cwd, capture_output=True, text=True)
+    if proc.returncode != 0 or not proc.stdout.strip():
+        last = (proc.stderr.strip().splitlines() or [f"exit {proc.returncode}"])[-1]
+        return {"impl": name, "status": f"erro: {last[:60]}"}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["status"] = "conforme" if result.get("failed") == 0 else f"{result.get('failed')} divergência(s)"
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    parser.add_argument("--only", nargs="*", choices=sorted(HARNESSES))
+    args = parser.parse_args()
+
+    columns = ("seal_verify", "mask", "shadow", "nonce")
+    print(f"{'implementação':<16}{'estado':<22}" + "".join(f"{c + ' ops/s':>18}" for c in columns))
+    errors = []
+    divergent = False
+    for name in args.only or HARNESSES:
+        result = run(name, args.seconds)
+        rates = result.get("ops_per_sec", {})
+        divergent |= result.get("failed", 0) > 0
+        status = result["status"]
+        if status.startswith("erro"):
+            errors.append(f"{name}: {status}")
+            status = "erro"
+        print(f"{name:<16}{status:<22}" + "".join(f"{rates[c]:>18,}" if c in rates else f"{'-':>18}" for c in columns))
+    for error in errors:
+        print(error)
+    return 1 if divergent else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""
+Exemplo: ELP-Ω numa app Flask (WSGI).
+
+    pip install -e implementations/python flask gunicorn
+    ELP_SECRET_KEY=... gunicorn --threads 32 -b 127.0.0.1:8000 app:app
+
+O middleware envolve `app.wsgi_app`: pedidos sem selo válido recebem a Shadow
+Reality sem nunca chegar às rotas do Flask. O engine padrão do adaptador WSGI
+é seguro entre threads (gunicorn `--threads`).
+"""
+import os
+
+from flask import Flask, jsonify
+
+from elp_omega import ElpOmegaWSGIMiddleware
+
+app = Flask(__name__)
+
+
+@app.get("/api/v1/resource")
+def sensitive_data():
+    return jsonify({
+        "data": {
+            "secret": "DADOS SECRETOS DO BANC0 CENTRAL",
+            "balance": 1000000.00,
+            "status": "verified",
+        },
+    })
+
+
+app.wsgi_app = ElpOmegaWSGIMiddleware(app.wsgi_app, secret_key=os.environ.get("ELP_SECRET_KEY", "SUA_CHAVE_MESTRA_AQUI"))
+
+
+if __name__ == "__main__":
+    app.run(host="127.0.0.1", port=8000, threaded=True)
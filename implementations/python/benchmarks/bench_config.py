@@ -0,0 +1,89 @@
+"""
+Benchmark: latência por pedido durante reconfigurações a quente (elp_config).
+
+Pedidos PRIME assinados passam pelo ElpOmegaWSGIMiddleware enquanto uma
+thread publica snapshots novos (STABILITY_SEED, janela de frescor, políticas
+por rota) a intervalos fixos. Compara p50/p99/máximo com e sem trocas e conta
+pedidos que deixaram de ser PRIME: com snapshots imutáveis deve ser zero.
+
+Uso: python benchmarks/bench_config.py --requests 100000 --swap-every-ms 5
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from elp_config import ElpConfig, HotConfig
+from elp_shared import Keyring
+from elp_wsgi import ElpOmegaWSGIMiddleware
+
+PATH = "/api/v1/accounts/7"
+
+
+def configs():
+    """Alterna entre configurações que mexem em tudo o que a troca pode mudar."""
+    for i in range(1_000_000):
+        yield ElpConfig(max_age_ms=300000 - (i % 2) * 60000, shadow_seed=f"seed-{i}",
+                        permissions={"READ": 0, "WRITE": 3}, routes={"GET /api/v1/admin": ["WRITE"]},
+                        route_policies={"/health": {"bypass": True}, "/api/v1/transfers/*": {"max_age_ms": 30000}})
+
+
+def run(requests: int, swap_every_ms: float) -> dict:
+    hot = HotConfig(ElpConfig(), Keyring(b"bench-config-secret"), thread_safe=True)
+    app = ElpOmegaWSGIMiddleware(lambda e, s: s("200 OK", [("Content-Type", "text/plain")]) or [b"PRIME"],
+                                 hot_config=hot)
+    signer = hot.snapshot.engine
+    stop = threading.Event()
+    builds = []
+
+    def swapper():
+        for config in configs():
+            if stop.wait(swap_every_ms / 1000):
+                return
+            started = time.perf_counter()
+            hot.apply(config)
+            builds.append(time.perf_counter() - started)
+
+    thread = threading.Thread(target=swapper, daemon=True)
+    if swap_every_ms > 0:
+        thread.start()
+    latencies, wrong = [], 0
+    start_response = lambda s, h, exc_info=None: None
+    for i in range(requests):
+        ts = int(time.time() * 1000)
+        nonce = f"n{i}"
+        environ = {"REQUEST_METHOD": "GET", "PATH_INFO": PATH, "REMOTE_ADDR": "10.0.0.1",
+                   "HTTP_X_ELP_MASK": "9", "HTTP_X_ELP_TIMESTAMP": str(ts), "HTTP_X_ELP_NONCE": nonce,
+                   "HTTP_X_ELP_SEAL": signer.compute_seal(9, "GET", ts, PATH, nonce)}
+        started = time.perf_counter()
+        body = app(environ, start_response)
+        latencies.append(time.perf_counter() - started)
+        wrong += body != [b"PRIME"]
+    stop.set()
+    if thread.is_alive():
+        thread.join()
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e6
+    return {"swaps": len(builds), "p50_us": round(pick(0.50), 1), "p99_us": round(pick(0.99), 1),
+            "p999_us": round(pick(0.999), 1), "max_us": round(latencies[-1] * 1e6, 1), "not_prime": wrong,
+            "build_ms": round(sum(builds) / len(builds) * 1000, 3) if builds else None}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--swap-every-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    print(f"{'cenário':<22}{'trocas':>8}{'p50 µs':>9}{'p99 µs':>9}{'p99.9 µs':>10}{'máx µs':>9}"
+          f"{'!PRIME':>8}{'build ms':>10}")
+    for label, every in (("sem trocas", 0), (f"troca a cada {args.swap_every_ms:g} ms", args.swap_every_ms)):
+        r = run(args.requests, every)
+        print(f"{label:<22}{r['swaps']:>8}{r['p50_us']:>9}{r['p99_us']:>9}{r['p999_us']:>10}{r['max_us']:>9}"
+              f"{r['not_prime']:>8}{str(r['build_ms']):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: consultas vetorizadas sobre o armazém colunar de eventos.
+
+Gera N eventos sintéticos diretamente nas colunas (sem passar pelo middleware)
+e mede as consultas típicas de resposta a incidentes.
+
+Uso: python benchmarks/bench_eventstore.py --events 100000000 --root /tmp/elp-events
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from elp_eventstore import COLUMNS, HOUR_MS, EventStoreReader, _column_file, _partition_name
+from elp_events import Stage
+from elp_omega import Reality
+
+
+def generate(root: str, events: int, hours: int, fingerprints: int, paths: int, chunk: int = 10_000_000) -> None:
+    rng = np.random.default_rng(7)
+    os.makedirs(root, exist_ok=True)
+    for column, count in (("fingerprint", fingerprints), ("path", paths), ("method", 1)):
+        with open(os.path.join(root, f"{column}.dict"), "w") as fh:
+            if column == "method":
+                fh.write('"GET"\n')
+            else:
+                fh.writelines(f'"{column}-{i}"\n' for i in range(count))
+
+    start = (int(time.time() * 1000) // HOUR_MS - hours + 1) * HOUR_MS
+    per_hour = events // hours
+    for h in range(hours):
+        partition = os.path.join(root, _partition_name(start + h * HOUR_MS))
+        os.makedirs(partition, exist_ok=True)
+        written = 0
+        while written < per_hour:
+            n = min(chunk, per_hour - written)
+            cols = {
+                "ts": np.sort(rng.integers(0, HOUR_MS, n)) + start + h * HOUR_MS,
+                "reality": rng.choice(3, n, p=[0.90, 0.02, 0.08]),
+                "stage": rng.integers(0, 6, n),
+                "fingerprint": rng.zipf(1.5, n) % fingerprints,
+                "method": np.zeros(n),
+                "path": rng.integers(0, paths, n),
+                "latency": rng.gamma(2.0, 10.0, n),
+            }
+            for column, values in cols.items():
+                with open(_column_file(partition, column), "ab") as fh:
+                    fh.write(values.astype(COLUMNS[column]).tobytes())
+            written += n
+
+
+def timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"{label:<55} {time.perf_counter() - started:>8.2f} s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20_000_000)
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--fingerprints", type=int, default=100_000)
+    parser.add_argument("--paths", type=int, default=500)
+    parser.add_argument("--root")
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix="elp-events-")
+    if not os.path.exists(os.path.join(root, "fingerprint.dict")):
+        timed(f"geração de {args.events:,} eventos", lambda: generate(
+            root, args.events, args.hours, args.fingerprints, args.paths))
+
+    reader = EventStoreReader(root)
+    now = int(time.time() * 1000)
+    timed("count SHADOW (tudo)", lambda: reader.count(reality=Reality.SHADOW))
+    timed("replay na última hora, por fingerprint+path",
+          lambda: reader.group_count(("fingerprint", "path"), since_ms=now - HOUR_MS,
+                                     reality=Reality.SHADOW, stage=Stage.REPLAY))
+    timed("classify_incidents (24h)", lambda: reader.classify_incidents(since_ms=now - 24 * HOUR_MS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: custo de import (arranque a frio) do core e dos adaptadores.
+
+Cada medição corre num interpretador novo e desconta o arranque de um
+`python -c pass`, de modo que sobra apenas o custo dos imports pedidos.
+Também verifica que o core não arrasta nenhum framework web.
+
+Uso: python benchmarks/bench_import_time.py --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "core (elp_omega)": "import elp_omega",
+    "engine pronto": "import elp_omega; elp_omega.EntangledLogicOmegaV5(b'k')",
+    "ASGI (elp_middleware)": "import elp_middleware",
+    "adaptador lazy": "from elp_omega import ElpOmegaMiddleware",
+    "FastAPI + middleware": "import fastapi, elp_middleware",
+}
+
+FRAMEWORKS = ("fastapi", "starlette", "flask", "werkzeug", "numpy")
+
+
+def _run(code: str) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def measure(code: str, runs: int) -> float:
+    return statistics.median(_run(code) for _ in range(runs))
+
+
+def leaked_frameworks(code: str) -> list:
+    probe = f"{code}\nimport sys\nprint(','.join(m for m in {FRAMEWORKS!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, check=True, capture_output=True, text=True)
+    return [m for m in out.stdout.strip().split(",") if m]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    baseline = measure("pass", args.runs)
+    print(f"interpretador vazio: {baseline:.1f} ms (mediana de {args.runs})")
+    print(f"{'alvo':<24}{'import (ms)':>12}  frameworks carregados")
+    for name, code in TARGETS.items():
+        try:
+            elapsed = measure(code, args.runs) - baseline
+            leaked = leaked_frameworks(code)
+        except subprocess.CalledProcessError:
+            print(f"{name:<24}{'n/d':>12}  (dependência ausente)")
+            continue
+        print(f"{name:<24}{elapsed:>12.1f}  {', '.join(leaked) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
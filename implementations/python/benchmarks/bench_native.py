@@ -0,0 +1,82 @@
+"""
+Benchmark: operações quentes do engine, Python puro vs extensão nativa.
+
+Mede por operação: validação de máscara, cálculo e verificação do selo
+(com uma chave anterior no keyring), registo de nonce e geração da Shadow.
+Sem a extensão compilada mostra apenas a coluna Python.
+
+Uso: python benchmarks/bench_native.py --ops 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import elp_native
+from elp_omega import EntangledLogicOmegaV5
+
+
+def _per_op_ns(fn, ops: int) -> float:
+    started = time.perf_counter()
+    fn(ops)
+    return (time.perf_counter() - started) * 1e9 / ops
+
+
+def scenarios(engine, seal: str):
+    def masks(ops):
+        check = engine.is_valid_zeckendorf_mask
+        for i in range(ops):
+            check(i)
+
+    def compute(ops):
+        for i in range(ops):
+            engine.compute_seal(9, "GET", 1_700_000_000_000, "/api/v1/resource", "n")
+
+    def verify_previous_key(ops):
+        # Pior caso da rotação: o selo só bate na última chave do keyring
+        for i in range(ops):
+            engine.verify_seal(seal, 9, "GET", 1_700_000_000_000, "/api/v1/resource", "n")
+
+    def nonces(ops):
+        add = engine.consume_nonce
+        for i in range(ops):
+            add(f"nonce-{i}", i, i + 300_000)
+
+    def shadows(ops):
+        for i in range(ops):
+            engine.generate_shadow("STRUCT", "GET", f"/contas/{i % 1000}", f"n{i}")
+
+    return {"máscara": masks, "selo (cálculo)": compute, "selo (chave anterior)": verify_previous_key,
+            "nonce": nonces, "shadow": shadows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ops", type=int, default=200_000)
+    args = parser.parse_args()
+
+    # O selo do cenário vem da chave anterior
+    seal = EntangledLogicOmegaV5(b"old-key", native=False).compute_seal(9, "GET", 1_700_000_000_000, "/api/v1/resource", "n")
+    engines = {"python": EntangledLogicOmegaV5(b"new-key", previous_secrets=[b"old-key"], native=False)}
+    if elp_native._elp_native is not None:
+        engines["nativo"] = EntangledLogicOmegaV5(b"new-key", previous_secrets=[b"old-key"], native=True)
+    else:
+        print("extensão _elp_native não compilada: só a coluna Python")
+
+    results = {}
+    for name, engine in engines.items():
+        for label, fn in scenarios(engine, seal).items():
+            results.setdefault(label, {})[name] = _per_op_ns(fn, args.ops)
+
+    print(f"{'operação':<24}" + "".join(f"{name + ' (ns)':>14}" for name in engines) + ("   ganho" if len(engines) > 1 else ""))
+    for label, row in results.items():
+        line = f"{label:<24}" + "".join(f"{row[name]:>14,.0f}" for name in engines)
+        if len(engines) > 1:
+            line += f"{row['python'] / row['nativo']:>8.1f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
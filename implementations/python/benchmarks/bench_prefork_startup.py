@@ -0,0 +1,68 @@
+"""
+Benchmark: tempo de arranque do runner pre-fork em função do número de workers.
+
+Mede, para cada N, o tempo entre o início do runner e o momento em que todos
+os workers têm o socket SO_REUSEPORT aberto e a app construída, além do
+tempo de encerramento gracioso.
+
+Uso: python benchmarks/bench_prefork_startup.py --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+
+from elp_middleware import ElpOmegaMiddleware
+from elp_prefork import PreforkRunner
+from elp_shared import Keyring, SharedState
+
+
+def _app_factory(shared):
+    app = FastAPI()
+    app.add_middleware(ElpOmegaMiddleware, engine=shared.build_engine())
+    return app
+
+
+def _measure(workers: int, port: int, queue) -> None:
+    shared = SharedState(Keyring(b"bench-secret"))
+    runner = PreforkRunner(_app_factory, shared, host="127.0.0.1", port=port, workers=workers)
+
+    def on_ready(elapsed, pids):
+        queue.put(("ready", elapsed))
+        runner.stop()
+
+    runner.on_ready = on_ready
+    started = time.perf_counter()
+    runner.run()
+    queue.put(("total", time.perf_counter() - started))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'pronto (ms)':>12} {'pronto+stop (ms)':>17}")
+    ctx = multiprocessing.get_context("fork")
+    for n in args.workers:
+        ready, total = [], []
+        for _ in range(args.repeat):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_measure, args=(n, args.port, queue))
+            proc.start()
+            results = dict(queue.get(timeout=60) for _ in range(2))
+            proc.join()
+            ready.append(results["ready"])
+            total.append(results["total"])
+        print(f"{n:>8} {min(ready) * 1000:>12.1f} {min(total) * 1000:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
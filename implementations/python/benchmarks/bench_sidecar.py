@@ -0,0 +1,121 @@
+"""
+Benchmark: latência acrescentada pelo sidecar ELP-Ω (um salto) contra um upstream local.
+
+Sobe um upstream stub (asyncio, HTTP/1.1 keep-alive, resposta JSON fixa) e o
+sidecar (`elp_sidecar.py`, uvicorn, 1 worker) em processos separados. Um
+cliente keep-alive faz pedidos sequenciais assinados (PRIME) diretamente ao
+stub e através do sidecar; a diferença das medianas é o custo do salto:
+parsing HTTP, cascata ELP (HMAC + nonce) e o encaminhamento pelo pool.
+
+Uso: python benchmarks/bench_sidecar.py --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+
+from elp_omega import EntangledLogicOmegaV5
+
+SECRET = "bench-sidecar-secret"
+PATH = "/api/v1/resource"
+_BODY = b'{"data":"PRIME_DATA"}'
+_RESPONSE = (b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\ncontent-length: %d\r\n\r\n" % len(_BODY)) + _BODY
+
+
+async def _stub(port: int) -> None:
+    async def handle(reader, writer):
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                writer.write(_RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", port)
+    async with server:
+        await server.serve_forever()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_port(port: int, timeout: float = 15.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"porta {port} não abriu")
+
+
+async def _measure(port: int, requests: int, signed: bool, run: str = "") -> list:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    signer = EntangledLogicOmegaV5(SECRET.encode())
+    latencies = []
+    for i in range(requests):
+        head = f"GET {PATH} HTTP/1.1\r\nhost: bench\r\n"
+        if signed:
+            ts, nonce = int(time.time() * 1000), f"bench-{run}-{i}"
+            head += (f"x-elp-mask: 9\r\nx-elp-timestamp: {ts}\r\nx-elp-nonce: {nonce}\r\n"
+                     f"x-elp-seal: {signer.compute_seal(9, 'GET', ts, PATH, nonce)}\r\n")
+        started = time.perf_counter()
+        writer.write(head.encode() + b"\r\n")
+        response = await reader.readuntil(b"\r\n\r\n")
+        length = int(response.lower().split(b"content-length: ")[1].split(b"\r\n")[0])
+        await reader.readexactly(length)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    writer.close()
+    return latencies
+
+
+def _summary(latencies: list) -> str:
+    ordered = sorted(latencies)
+    return f"p50 {statistics.median(ordered):8.0f} µs | p99 {ordered[int(len(ordered) * 0.99)]:8.0f} µs"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--stub", type=int, help=argparse.SUPPRESS)  # modo interno: só o upstream
+    args = parser.parse_args()
+    if args.stub:
+        asyncio.run(_stub(args.stub))
+        return
+
+    stub_port, sidecar_port = _free_port(), _free_port()
+    env = dict(os.environ, ELP_SECRET_KEY=SECRET, PYTHONPATH=HERE)
+    procs = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--stub", str(stub_port)]),
+        subprocess.Popen([sys.executable, os.path.join(HERE, "elp_sidecar.py"), "--listen", f"127.0.0.1:{sidecar_port}",
+                          "--upstream", f"http://127.0.0.1:{stub_port}"], env=env),
+    ]
+    try:
+        _wait_port(stub_port)
+        _wait_port(sidecar_port)
+        asyncio.run(_measure(sidecar_port, 200, True, "warmup"))  # aquecimento (pool aberto)
+        direct = asyncio.run(_measure(stub_port, args.requests, False))
+        proxied = asyncio.run(_measure(sidecar_port, args.requests, True, "run"))
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+    print(f"direto ao upstream : {_summary(direct)}")
+    print(f"através do sidecar : {_summary(proxied)}")
+    print(f"custo do salto     : {statistics.median(proxied) - statistics.median(direct):.0f} µs (mediana)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Soak test: horas de tráfego simulado pelo ElpOmegaMiddleware, em processo.
+
+Conduz a app ASGI (crua ou FastAPI) com uma mistura fixa de pedidos (PRIME,
+Replay, Adjacência, selo inválido e clientes com relógio desviado -> MIRROR)
+por C corrotinas concorrentes. A cascata corre num relógio virtual
+(`guard.clock_ms`): uma hora de tráfego a R pedidos/s passa em minutos, e a
+janela de nonces (5 min) enche e esvazia como em produção. O jitter da Shadow
+continua real, na TimerWheel.
+
+A cada N minutos virtuais amostra RSS, memória rastreada (tracemalloc),
+entradas no nonce store e pausas do GC. Depois do aquecimento (2 janelas de
+frescor) a memória tem de ficar plana: se a regressão linear das amostras
+projetar um crescimento acima de `--tolerance` ao longo da fase estável, o
+teste falha (código de saída 1) e mostra os maiores alocadores que cresceram.
+
+No fim mede, por tipo de pedido, o que cada um deixa retido (bytes e blocos)
+e o pico transitório que aloca (tracemalloc.reset_peak à volta de pedidos
+sequenciais, com o jitter desligado). Em regime, o retido de PRIME/MIRROR é
+a entrada do nonce (e do drift), libertada quando a janela dela vence.
+
+Uso: python benchmarks/bench_soak.py --hours 1 --rps 300 [--app fastapi] [--hours 24 --no-tracemalloc]
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from elp_drift import ClockDriftEstimator
+from elp_guard import json_body
+from elp_middleware import ElpOmegaMiddleware
+from elp_omega import EntangledLogicOmegaV5
+
+SECRET = b"bench-soak-secret"
+# O próprio harness (gerador de tráfego, snapshots) não entra no top de alocadores
+_NOT_HARNESS = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+START_MS = 1_700_000_000_000
+MINUTE_MS = 60_000
+# Mistura de tráfego: (tipo, peso)
+MIX = (("prime", 70), ("replay", 10), ("adjacency", 8), ("seal", 6), ("mirror", 6))
+_PAYLOAD = {"data": "PRIME_DATA", "cpf": "123.456.789-10", "balance": 1520.75, "items": [1, 2, 3]}
+
+
+def raw_app():
+    body = json_body(_PAYLOAD)
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+
+def fastapi_app():
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    @app.get("/api/v1/accounts/{account}")
+    async def account(account: int):
+        return dict(_PAYLOAD, account=account)
+
+    return app
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # Sem /proc (macOS): só o pico está disponível
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class GcPauses:
+    """Pausas do coletor por geração, via gc.callbacks."""
+
+    def __init__(self):
+        self.pauses = []
+        self.collections = [0, 0, 0]
+        self._started = 0.0
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._started = time.perf_counter()
+        else:
+            self.pauses.append(time.perf_counter() - self._started)
+            self.collections[info["generation"]] += 1
+
+    def install(self):
+        gc.callbacks.append(self)
+        return self
+
+    def remove(self):
+        gc.callbacks.remove(self)
+
+    def window(self, since: int):
+        pauses = sorted(self.pauses[since:])
+        if not pauses:
+            return 0.0, 0.0
+        return pauses[int(len(pauses) * 0.99)] * 1e3, pauses[-1] * 1e3
+
+
+class Traffic:
+    """Gera scopes ASGI assinados no relógio virtual; o tipo de cada pedido segue a MIX."""
+
+    def __init__(self, rps: int, clients: int, seed: int = 7):
+        self.rng = random.Random(seed)
+        self.signer = EntangledLogicOmegaV5(SECRET)
+        self.step_ms = 1000 / rps
+        self.clients = clients
+        self.kinds = [kind for kind, weight in MIX for _ in range(weight)]
+        self.recent = deque(maxlen=512)
+        self.counter = itertools.count()
+        self.now_ms = START_MS
+
+    def clock_ms(self) -> int:
+        return int(self.now_ms)
+
+    def next(self):
+        i = next(self.counter)
+        self.now_ms = START_MS + i * self.step_ms
+        kind = self.rng.choice(self.kinds)
+        if kind == "replay" and self.recent:
+            return kind, self.rng.choice(self.recent)
+        if kind == "replay":
+            kind = "prime"
+        client = self.rng.randrange(self.clients)
+        if kind == "mirror":
+            # Relógio desviado é raro e persistente: sempre os mesmos 2% dos clientes
+            client %= max(1, self.clients // 50)
+        path = f"/api/v1/accounts/{client % 1000}"
+        ts = int(self.now_ms) - (60_000 if kind == "mirror" else self.rng.randint(0, 500))
+        mask = 3 if kind == "adjacency" else 9
+        nonce = f"{client}:{i}"
+        seal = "0" * 64 if kind == "seal" else self.signer.compute_seal(mask, "GET", ts, path, nonce)
+        headers = [(b"x-elp-mask", str(mask).encode()), (b"x-elp-timestamp", str(ts).encode()),
+                   (b"x-elp-nonce", nonce.encode()), (b"x-elp-seal", seal.encode())]
+        # Clientes "mirror" têm endereço próprio: o drift é estimado por fingerprint
+        host = f"10.{int(kind == 'mirror')}.{client // 256 % 256}.{client % 256}"
+        scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+                 "headers": headers, "client": (host, 40000), "scheme": "http", "http_version": "1.1",
+                 "server": ("soak", 80), "root_path": ""}
+        if kind == "prime":
+            self.recent.append(scope)
+        return kind, scope
+
+
+async def drive(middleware, scope) -> None:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await middleware(scope, receive, send)
+
+
+class _NoJitter:
+    async def sleep(self, delay: float) -> None:
+        return None
+
+
+def build(app_kind: str, traffic: Traffic) -> ElpOmegaMiddleware:
+    app = fastapi_app() if app_kind == "fastapi" else raw_app()
+    engine = EntangledLogicOmegaV5(SECRET)
+    middleware = ElpOmegaMiddleware(app, engine=engine, drift_estimator=ClockDriftEstimator())
+    middleware.guard.clock_ms = traffic.clock_ms
+    return middleware
+
+
+def slope_growth(samples, key: str) -> tuple:
+    """(crescimento projetado na fase estável, média) pela regressão linear de `key` no tempo virtual."""
+    xs = [s["minute"] for s in samples]
+    ys = [s[key] for s in samples]
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    var = sum((x - mean_x) ** 2 for x in xs)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var if var else 0.0
+    return slope * (xs[-1] - xs[0]), mean_y
+
+
+async def soak(args) -> int:
+    traffic = Traffic(args.rps, args.clients)
+    middleware = build(args.app, traffic)
+    store = middleware.security_engine._used_nonces
+    total = int(args.hours * 3600 * args.rps)
+    sample_every_ms = args.sample_minutes * MINUTE_MS
+    next_sample = START_MS + sample_every_ms
+    warmup_ms = 2 * middleware.security_engine.max_age_ms
+    samples, pauses = [], GcPauses().install()
+    snapshot_warm = None
+    if args.tracemalloc:
+        tracemalloc.start()
+    issued = 0
+    started = time.perf_counter()
+
+    def take_sample():
+        nonlocal snapshot_warm
+        minute = (traffic.now_ms - START_MS) / MINUTE_MS
+        p99, worst = pauses.window(samples[-1]["gc_seen"] if samples else 0)
+        traced = tracemalloc.get_traced_memory()[0] if args.tracemalloc else 0
+        # A fase estável começa na amostra seguinte ao snapshot de referência (ele próprio ocupa RSS)
+        steady = traffic.now_ms - START_MS >= warmup_ms and (snapshot_warm is not None or not args.tracemalloc)
+        samples.append({"minute": minute, "rss": rss_bytes(), "traced": traced, "nonces": len(store),
+                        "gc_p99_ms": p99, "gc_max_ms": worst, "gc_seen": len(pauses.pauses), "steady": steady})
+        if args.tracemalloc and snapshot_warm is None and traffic.now_ms - START_MS >= warmup_ms:
+            snapshot_warm = tracemalloc.take_snapshot().filter_traces(_NOT_HARNESS)
+        s = samples[-1]
+        print(f"{minute:8.0f} min {s['rss'] / 2**20:9.1f} {s['traced'] / 2**20:11.1f} {s['nonces']:>9}"
+              f" {s['gc_p99_ms']:9.2f} {s['gc_max_ms']:9.2f}  {'estável' if s['steady'] else 'aquecimento'}",
+              flush=True)
+
+    async def worker():
+        nonlocal issued, next_sample
+        while issued < total:
+            issued += 1
+            _, scope = traffic.next()
+            if traffic.now_ms >= next_sample:
+                next_sample += sample_every_ms
+                take_sample()
+            await drive(middleware, scope)
+
+    print(f"{total} pedidos ({args.hours} h virtuais a {args.rps}/s), {args.concurrency} concorrentes")
+    print(f"{'virtual':>12} {'RSS MiB':>9} {'traced MiB':>11} {'nonces':>9} {'GC p99 ms':>9} {'GC max ms':>9}")
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    take_sample()
+    elapsed = time.perf_counter() - started
+    pauses.remove()
+    print(f"\n{total / elapsed:.0f} pedidos/s em processo, {args.hours * 3600 / elapsed:.1f}x o tempo real; "
+          f"coletas do GC por geração {pauses.collections}")
+
+    steady = [s for s in samples if s["steady"]]
+    failed = False
+    if len(steady) < 3:
+        print("poucas amostras na fase estável: aumente --hours ou reduza --sample-minutes")
+    else:
+        checks = [("rss", args.rss_floor_mib)] + ([("traced", 1)] if args.tracemalloc else [])
+        for key, floor_mib in checks:
+            growth, mean = slope_growth(steady, key)
+            limit = max(args.tolerance * mean, floor_mib * 2 ** 20)
+            verdict = "FALHA" if growth > limit else "ok"
+            failed |= growth > limit
+            print(f"{key:>7}: crescimento projetado {growth / 2**20:+.2f} MiB na fase estável "
+                  f"(limite {limit / 2**20:.2f} MiB) -> {verdict}")
+    if args.tracemalloc and snapshot_warm is not None:
+        final = tracemalloc.take_snapshot().filter_traces(_NOT_HARNESS)
+        top = final.compare_to(snapshot_warm, "lineno")
+        print("\nmaiores alocadores desde o fim do aquecimento:")
+        for stat in top[:args.top]:
+            frame = stat.traceback[0]
+            print(f"  {stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8} blocos  "
+                  f"{os.path.basename(frame.filename)}:{frame.lineno}")
+    if args.tracemalloc:
+        tracemalloc.stop()
+    return 1 if failed else 0
+
+
+async def per_reality(args) -> None:
+    """Retido e pico transitório por pedido, por tipo, sem jitter (o custo do atraso está na TimerWheel)."""
+    print(f"\n{'tipo':>10} {'realidade':>10} {'retido B/ped':>13} {'blocos/ped':>11} {'pico KiB/ped':>13}")
+    for kind, _ in MIX:
+        # Poucos clientes/recursos: o aquecimento deixa ShadowWorld e drift em regime antes de medir
+        traffic = Traffic(args.rps, 100, seed=11)
+        middleware = build(args.app, traffic)
+        middleware.timer_wheel = _NoJitter()
+        scopes = []
+        while len(scopes) < args.calibration:
+            got, scope = traffic.next()
+            if got == kind or got == "prime" and kind == "replay":
+                scopes.append((got, scope))
+        if kind == "replay":
+            # Metade PRIME (regista os nonces), metade repetições medidas
+            for _, scope in scopes[:len(scopes) // 2]:
+                await drive(middleware, scope)
+            scopes = [(kind, scope) for _, scope in scopes[:len(scopes) // 2]]
+        realities = []
+
+        class _Tap:
+            def emit(self, reality, *rest):
+                realities.append(reality)
+
+        middleware.event_log = _Tap()
+        warm = len(scopes) // 4
+        for _, scope in scopes[:warm]:
+            await drive(middleware, scope)
+        measured = scopes[warm:]
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        peaks = 0
+        for _, scope in measured:
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            await drive(middleware, scope)
+            peaks += tracemalloc.get_traced_memory()[1] - current
+        retained = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        gc.collect()
+        blocks = sys.getallocatedblocks() - blocks
+        seen = realities[warm:]
+        reality = max(set(seen), key=seen.count) if seen else "?"
+        print(f"{kind:>10} {reality:>10} {retained / len(measured):>13.0f} {blocks / len(measured):>11.1f}"
+              f" {peaks / len(measured) / 1024:>13.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hours", type=float, default=1.0, help="duração do tráfego simulado (tempo virtual)")
+    parser.add_argument("--rps", type=int, default=300, help="pedidos por segundo virtual")
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--app", choices=("raw", "fastapi"), default="raw")
+    parser.add_argument("--sample-minutes", type=float, default=5.0)
+    parser.add_argument("--tolerance", type=float, default=0.05, help="crescimento máximo na fase estável (fração)")
+    parser.add_argument("--rss-floor-mib", type=float, default=4.0, help="ruído de RSS tolerado (MiB)")
+    parser.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false",
+                        help="só RSS (mais rápido; sem top de alocadores)")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--calibration", type=int, default=2000, help="pedidos por tipo na medição por realidade")
+    args = parser.parse_args()
+
+    code = asyncio.run(soak(args))
+    asyncio.run(per_reality(args))
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: conexões Shadow estacionadas no jitter, TimerWheel vs asyncio.sleep.
+
+Cria N tarefas (uma por conexão presa na Shadow), cada uma à espera de um
+atraso uniforme de 15-60 ms, e mede:
+
+- memória por conexão estacionada (tracemalloc, com todas em espera);
+- CPU por conexão (process_time do lote inteiro, criação até à última acordar);
+- acordares do event loop (TimerWheel) contra timers no heap (um por conexão).
+
+A tarefa em si (coroutine + Task) existe nos dois casos: a diferença entre
+as colunas é o custo do mecanismo de atraso.
+
+Uso: python benchmarks/bench_timerwheel.py --connections 10000 50000 100000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from elp_timerwheel import TimerWheel
+
+
+def run(connections: int, make_sleeper, traced: bool) -> float:
+    """Bytes por conexão estacionada (traced) ou µs de CPU por conexão (sem tracemalloc, que distorce o tempo)."""
+    delays = [random.uniform(0.015, 0.060) for _ in range(connections)]
+
+    async def main():
+        sleeper = make_sleeper()
+        gc.collect()
+        if traced:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        started = time.process_time()
+        tasks = [asyncio.ensure_future(sleeper(d)) for d in delays]
+        await asyncio.sleep(0)  # todas as tarefas chegaram ao await do atraso
+        parked = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        await asyncio.gather(*tasks)
+        cpu = time.process_time() - started
+        return (parked if traced else cpu * 1e6) / connections
+
+    return asyncio.run(main())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'conexões':>10}{'B/conexão sleep':>17}{'B/conexão roda':>16}{'µs CPU sleep':>14}{'µs CPU roda':>13}{'acordares':>11}")
+    for connections in args.connections:
+        wheels = []
+
+        def wheel_sleep():
+            wheels.append(TimerWheel())
+            return wheels[-1].sleep
+
+        sleep_mem, sleep_cpu = (run(connections, lambda: asyncio.sleep, traced) for traced in (True, False))
+        wheel_mem, wheel_cpu = (run(connections, wheel_sleep, traced) for traced in (True, False))
+        wheel = wheels[-1]
+        print(f"{connections:>10,}{sleep_mem:>17.0f}{wheel_mem:>16.0f}{sleep_cpu:>14.1f}{wheel_cpu:>13.1f}{wheel.wakeups:>11,}")
+
+
+if __name__ == "__main__":
+    main()
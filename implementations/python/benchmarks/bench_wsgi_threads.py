@@ -0,0 +1,93 @@
+"""
+Benchmark: vazão do adaptador WSGI de 1 a 64 threads.
+
+Chama o middleware diretamente (sem rede nem servidor) com pedidos assinados
+e válidos, de modo que cada pedido percorre a cascata inteira: parsing,
+Zeckendorf, frescor, HMAC e registo do nonce no store com faixas.
+
+No CPython com GIL a vazão fica plana a partir de 1-2 threads (o HMAC liberta
+o GIL só para mensagens grandes); num build free-threaded (3.13t+) deve
+escalar com os núcleos, limitada apenas pela contenção nas faixas do store.
+
+Uso: python benchmarks/bench_wsgi_threads.py --threads 1 2 4 8 16 32 64 --requests 200000
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from elp_omega import EntangledLogicOmegaV5, NonceStore, StripedNonceStore
+from elp_wsgi import ElpOmegaWSGIMiddleware
+
+SECRET = b"bench-secret"
+PATH = "/api/v1/resource"
+
+
+def _app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "application/json")])
+    return [b'{"data":"PRIME_DATA"}']
+
+
+def _environs(count: int, prefix: str) -> list:
+    signer = EntangledLogicOmegaV5(SECRET)
+    ts = int(time.time() * 1000)
+    return [{
+        "REQUEST_METHOD": "GET", "PATH_INFO": PATH, "REMOTE_ADDR": "10.0.0.1",
+        "HTTP_X_ELP_MASK": "9", "HTTP_X_ELP_TIMESTAMP": str(ts), "HTTP_X_ELP_NONCE": f"{prefix}-{i}",
+        "HTTP_X_ELP_SEAL": signer.compute_seal(9, "GET", ts, PATH, f"{prefix}-{i}"),
+    } for i in range(count)]
+
+
+def run(middleware, environs: list, threads: int) -> float:
+    chunk = len(environs) // threads
+    statuses = [0] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        ok = 0
+        start_response = lambda status, headers, exc_info=None: None
+        barrier.wait()
+        for environ in environs[index * chunk:(index + 1) * chunk]:
+            middleware(environ, start_response)
+            ok += 1
+        statuses[index] = ok
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in pool:
+        t.join()
+    return sum(statuses) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--stripes", type=int, default=16)
+    args = parser.parse_args()
+
+    gil = sys._is_gil_enabled() if hasattr(sys, "_is_gil_enabled") else True
+    print(f"Python {sys.version.split()[0]} | GIL {'ativo' if gil else 'desativado (free-threaded)'} | {os.cpu_count()} CPUs")
+    print(f"{'threads':>8}{'req/s':>12}{'vs 1 thread':>14}")
+    baseline = None
+    for threads in args.threads:
+        engine = EntangledLogicOmegaV5(SECRET, nonce_store=StripedNonceStore(stripes=args.stripes))
+        middleware = ElpOmegaWSGIMiddleware(_app, engine=engine)
+        rate = run(middleware, _environs(args.requests, f"t{threads}"), threads)
+        baseline = baseline or rate
+        print(f"{threads:>8}{rate:>12,.0f}{rate / baseline:>13.2f}x")
+
+    # Custo das faixas com uma única thread, face ao store sem locks
+    environs = _environs(args.requests, "plain")
+    plain = run(ElpOmegaWSGIMiddleware(_app, engine=EntangledLogicOmegaV5(SECRET, nonce_store=NonceStore())), environs, 1)
+    print(f"referência sem locks (1 thread, NonceStore): {plain:,.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
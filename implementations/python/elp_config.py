@@ -0,0 +1,245 @@
+"""
+Reconfiguração a Quente por Snapshot Imutável (copy-on-write).
+
+Janela de frescor, mapeamento de bits, rotas, políticas por rota, templates
+da Shadow e a STABILITY_SEED vivem num `ConfigSnapshot`: engine e guard já
+construídos e validados, que nunca mudam depois de publicados. Por pedido, o
+adaptador lê UMA referência (`self.snapshot`) e usa-a até ao fim; uma troca
+constrói o snapshot seguinte fora do caminho quente e publica-o numa única
+atribuição. Pedidos em curso terminam no snapshot em que entraram, os novos
+já apanham o seguinte: sem locks, sem pausa e sem pedidos perdidos.
+
+    hot = HotConfig(ElpConfig.from_file("elp.json"), Keyring.from_env())
+    app = ElpOmegaMiddleware(app, hot_config=hot)
+    hot.watch("elp.json")                      # ou hot.admin_app(token) montado à parte
+
+O nonce store e o estimador de drift passam de snapshot em snapshot: um
+nonce consumido antes da troca continua consumido depois dela. Uma
+configuração inválida é rejeitada inteira e o snapshot em vigor fica.
+"""
+import asyncio
+import hmac
+import json
+import os
+import threading
+from typing import Callable, List, Mapping, NamedTuple, Optional
+
+from elp_guard import ConfigSnapshot, ElpGuard
+from elp_omega import EntangledLogicOmegaV5
+from elp_permissions import PermissionCodec, RouteAuthorizer
+from elp_routes import RoutePolicy, RoutePolicyTable
+
+
+class ElpConfig(NamedTuple):
+    """Configuração declarativa (o formato do ficheiro JSON e do endpoint de administração)."""
+    max_age_ms: int = 300000
+    mask_width: int = 64
+    # STABILITY_SEED das shadows (None = o segredo HMAC atual)
+    shadow_seed: Optional[str] = None
+    # None = DEFAULT_SHADOW_TEMPLATES; quando dado, tem de incluir "banking"
+    shadow_templates: Optional[Mapping] = None
+    # nome -> bit de Fibonacci (PermissionCodec) e "MÉTODO /path" -> [permissões] (RouteAuthorizer)
+    permissions: Optional[Mapping] = None
+    routes: Optional[Mapping] = None
+    default_allow: bool = True
+    # padrão -> opções de RoutePolicy (RoutePolicyTable)
+    route_policies: Optional[Mapping] = None
+
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> "ElpConfig":
+        unknown = set(data) - set(cls._fields)
+        if unknown:
+            raise ValueError(f"Chaves de configuração desconhecidas: {sorted(unknown)}")
+        return cls(**data)
+
+    @classmethod
+    def from_file(cls, path: str) -> "ElpConfig":
+        with open(path, "rb") as fh:
+            data = json.load(fh)
+        if not isinstance(data, dict):
+            raise ValueError(f"Configuração deve ser um objeto JSON: {path}")
+        return cls.from_mapping(data)
+
+
+def _check_config(config: ElpConfig) -> None:
+    """Tipos e limites: um valor errado rejeita a troca em vez de falhar em cada pedido."""
+    if not isinstance(config.max_age_ms, int) or isinstance(config.max_age_ms, bool) or config.max_age_ms <= 0:
+        raise ValueError(f"max_age_ms inválido: {config.max_age_ms!r}")
+    if not isinstance(config.mask_width, int) or isinstance(config.mask_width, bool):
+        raise ValueError(f"mask_width inválido: {config.mask_width!r}")
+    if config.shadow_seed is not None and not isinstance(config.shadow_seed, str):
+        raise ValueError(f"shadow_seed deve ser texto: {config.shadow_seed!r}")
+    if not isinstance(config.default_allow, bool):
+        raise ValueError(f"default_allow deve ser booleano: {config.default_allow!r}")
+    for name in ("shadow_templates", "permissions", "routes", "route_policies"):
+        value = getattr(config, name)
+        if value is not None and not isinstance(value, Mapping):
+            raise ValueError(f"{name} deve ser um objeto: {value!r}")
+
+
+class HotConfig:
+    """
+    Dono do snapshot em vigor. `apply()` valida e constrói o seguinte e
+    publica-o com uma atribuição; os adaptadores subscrevem-se para receber
+    cada snapshot novo (e religar offloader, captura e cache da Shadow barata).
+    """
+
+    def __init__(self, config: ElpConfig, keyring, nonce_store=None, drift_estimator=None,
+                 thread_safe: bool = False, native: bool = None):
+        self.keyring = keyring
+        self.drift_estimator = drift_estimator
+        self.thread_safe = thread_safe
+        self.native = native
+        self._nonce_store = nonce_store
+        self._subscribers: List[Callable[[ConfigSnapshot], None]] = []
+        # Serializa só os escritores (watcher e admin); os leitores nunca esperam
+        self._apply_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.applied = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self.snapshot = self._build(config, keyring, 1)
+
+    def _build(self, config: ElpConfig, keyring, version: int) -> ConfigSnapshot:
+        _check_config(config)
+        templates = dict(config.shadow_templates) if config.shadow_templates is not None else None
+        if templates is not None and "banking" not in templates:
+            raise ValueError("shadow_templates precisa do template 'banking' (o padrão das rotas)")
+        seed = config.shadow_seed.encode() if config.shadow_seed is not None else None
+        engine = EntangledLogicOmegaV5(
+            keyring.current, max_age_ms=config.max_age_ms, mask_width=config.mask_width,
+            previous_secrets=keyring.previous, nonce_store=self._nonce_store, shadow_templates=templates,
+            thread_safe=self.thread_safe, native=self.native, shadow_seed=seed,
+        )
+        authorizer = None
+        if config.routes is not None:
+            authorizer = RouteAuthorizer(PermissionCodec(config.permissions or {}), config.routes,
+                                         config.default_allow)
+        policies = None
+        if config.route_policies is not None:
+            policies = RoutePolicyTable({pattern: RoutePolicy(**options)
+                                         for pattern, options in config.route_policies.items()})
+        guard = ElpGuard(engine, authorizer, self.drift_estimator, policies)
+        # O primeiro engine cria o store; os seguintes herdam-no
+        self._nonce_store = engine._used_nonces
+        return ConfigSnapshot(version, config, engine, guard)
+
+    def subscribe(self, callback: Callable[[ConfigSnapshot], None]) -> None:
+        """Chama `callback(snapshot)` já com o snapshot em vigor e depois a cada troca."""
+        self._subscribers.append(callback)
+        callback(self.snapshot)
+
+    def apply(self, config: Optional[ElpConfig] = None, keyring=None) -> ConfigSnapshot:
+        """
+        Constrói e publica um novo snapshot (config e/ou keyring; o que faltar
+        vem do atual). Qualquer erro de validação propaga e nada muda.
+        """
+        with self._apply_lock:
+            current = self.snapshot
+            try:
+                snapshot = self._build(config or current.config, keyring or self.keyring, current.version + 1)
+            except (TypeError, ValueError) as exc:
+                self.rejected += 1
+                self.last_error = str(exc)
+                raise
+            self.keyring = keyring or self.keyring
+            for callback in self._subscribers:
+                callback(snapshot)
+            # A publicação: uma única atribuição de referência
+            self.snapshot = snapshot
+            self.applied += 1
+            self.last_error = None
+            return snapshot
+
+    def apply_file(self, path: str) -> ConfigSnapshot:
+        try:
+            config = ElpConfig.from_file(path)
+        except (OSError, TypeError, ValueError) as exc:
+            self.rejected += 1
+            self.last_error = str(exc)
+            raise ValueError(f"Configuração rejeitada ({path}): {exc}") from exc
+        return self.apply(config)
+
+    def watch(self, path: str, interval: float = 1.0) -> "HotConfig":
+        """Thread que relê `path` quando o mtime/tamanho muda (escreva-o com rename atómico)."""
+        def signature():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            return stat.st_mtime_ns, stat.st_size
+
+        def loop(seen):
+            while not self._stop.wait(interval):
+                current = signature()
+                if current is None or current == seen:
+                    continue
+                seen = current
+                try:
+                    self.apply_file(path)
+                except ValueError:
+                    pass  # contado em `rejected`; o snapshot em vigor fica
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=loop, args=(signature(),), name="elp-config-watch", daemon=True)
+        self._watcher.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def stats(self) -> dict:
+        return {"version": self.snapshot.version, "applied": self.applied, "rejected": self.rejected,
+                "last_error": self.last_error}
+
+    def admin_app(self, token: str):
+        """
+        App ASGI de administração (montar fora do ELP, numa porta interna):
+        GET devolve versão e configuração; PUT/POST com o JSON completo aplica-o.
+        Exige `Authorization: Bearer <token>`; 400 deixa o snapshot em vigor.
+        """
+        if not token:
+            raise ValueError("admin_app exige um token")
+        expected = f"Bearer {token}".encode()
+
+        async def respond(send, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode()
+            await send({"type": "http.response.start", "status": status,
+                        "headers": [(b"content-length", str(len(body)).encode()),
+                                    (b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": body})
+
+        async def app(scope, receive, send):
+            if scope["type"] != "http":
+                return
+            authorization = dict(scope.get("headers", ())).get(b"authorization", b"")
+            if not hmac.compare_digest(authorization, expected):
+                return await respond(send, 401, {"error": "unauthorized"})
+            if scope["method"] == "GET":
+                snapshot = self.snapshot
+                return await respond(send, 200, {**self.stats(), "config": snapshot.config._asdict()})
+            if scope["method"] not in ("PUT", "POST"):
+                return await respond(send, 405, {"error": "method not allowed"})
+            chunks, more = [], True
+            while more:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                chunks.append(message.get("body", b""))
+                more = message.get("more_body", False)
+            try:
+                data = json.loads(b"".join(chunks))
+                if not isinstance(data, dict):
+                    raise ValueError("esperado um objeto JSON")
+                config = ElpConfig.from_mapping(data)
+                # A construção (HMAC nativo, trie, índice) corre fora do event loop
+                snapshot = await asyncio.get_running_loop().run_in_executor(None, self.apply, config)
+            except (TypeError, ValueError) as exc:
+                return await respond(send, 400, {"error": str(exc)})
+            await respond(send, 200, {"version": snapshot.version})
+
+        return app
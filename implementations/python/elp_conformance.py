@@ -0,0 +1,248 @@
+"""
+Vetores de Conformidade entre Linguagens.
+
+O corpus (`conformance/vectors.json` na raiz do repositório) é gerado por
+este módulo a partir do engine Python, que é a referência, e fixa:
+
+- seals:   payload `mask|context|timestamp|path|nonce[|body_digest]` -> hexdigest HMAC-SHA256
+- masks:   validade Zeckendorf por largura (64/128/256) e parsing do header X-ELP-Mask
+- shadows: sementes (SHA-256) e payload completo para entradas fixas
+- nonces:  sequência de operações add(nonce, now_ms, expiry_ms) -> aceite/Replay
+
+Um SDK cliente que assine os `seals` corretamente é aceite por qualquer
+servidor que também os passe. Cada implementação pode ligar-se ao
+`conformance/run_benchmarks.py` com um comando que leia o corpus e imprima
+uma linha JSON no mesmo formato de `bench --json`.
+
+Uso:
+    python elp_conformance.py generate            # reescreve o corpus
+    python elp_conformance.py check               # falha (exit 1) em qualquer divergência
+    python elp_conformance.py bench --json        # vazão sobre os mesmos vetores
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+from elp_mask import mask_format
+from elp_omega import EntangledLogicOmegaV5, NonceStore
+from elp_shadow_world import entity_of
+
+VERSION = 1
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "conformance", "vectors.json")
+
+_SECRETS = ("vortex-secret", "chave-ç-utf8", "k")
+_CONTEXTS = ("GET", "POST", "DELETE")
+_PATHS = ("/api/v1/resource", "/contas/42/extrato", "/pix/ção", "/", "/a|b")
+_RAW_MASKS = ("9", "0", "", "-1", "+9", " 9", "9 ", "0x9", "1_0", "٣", "00009",
+              "18446744073709551615", "18446744073709551616", "9" * 21)
+
+
+def _payload_without_timestamp(payload: dict) -> dict:
+    # O timestamp da Shadow é o relógio do servidor: não entra no vetor
+    return {k: v for k, v in payload.items() if k != "timestamp"}
+
+
+def _parsed(fmt, raw: str) -> Optional[str]:
+    # Máscaras viajam como texto decimal: 128/256 bits não cabem em números JSON portáveis
+    value = fmt.parse(raw)
+    return None if value is None else str(value)
+
+
+def generate_vectors(seed: int = 20251019) -> dict:
+    rng = random.Random(seed)
+    seals = []
+    for i in range(48):
+        secret = _SECRETS[i % len(_SECRETS)]
+        engine = EntangledLogicOmegaV5(secret.encode(), mask_width=128, native=False)
+        mask = rng.choice([0, 9, 1 << 63, rng.getrandbits(64), rng.getrandbits(128)])
+        case = {"secret": secret, "mask": str(mask), "context": rng.choice(_CONTEXTS),
+                "timestamp": rng.randrange(1_600_000_000_000, 1_900_000_000_000),
+                "path": rng.choice(_PATHS), "nonce": rng.choice([f"n-{i}", f"nonce-ç-{i}", f"{i}:{i * 7}"])}
+        case["payload"] = f"{case['mask']}|{case['context']}|{case['timestamp']}|{case['path']}|{case['nonce']}"
+        case["seal"] = engine.compute_seal(mask, case["context"], case["timestamp"], case["path"], case["nonce"])
+        seals.append(case)
+    # Selos com corpo vinculado (X-ELP-Body-Digest) acrescentados no fim, com RNG próprio: os anteriores não mudam
+    body_rng = random.Random(seed + 1)
+    for i in range(8):
+        secret = _SECRETS[i % len(_SECRETS)]
+        engine = EntangledLogicOmegaV5(secret.encode(), native=False)
+        body = body_rng.choice([b"", b'{"amount":100}', "ç".encode() * 3, body_rng.randbytes(64)])
+        case = {"secret": secret, "mask": str(body_rng.choice([0, 9, 1 << 63])), "context": body_rng.choice(_CONTEXTS),
+                "timestamp": body_rng.randrange(1_600_000_000_000, 1_900_000_000_000),
+                "path": body_rng.choice(_PATHS), "nonce": f"body-{i}",
+                "body_hex": body.hex(), "body_digest": hashlib.sha256(body).hexdigest()}
+        case["payload"] = engine.seal_payload(case["mask"], case["context"], case["timestamp"], case["path"],
+                                              case["nonce"], case["body_digest"])
+        case["seal"] = engine.compute_seal(int(case["mask"]), case["context"], case["timestamp"], case["path"],
+                                           case["nonce"], case["body_digest"])
+        seals.append(case)
+
+    masks = []
+    for width in (64, 128, 256):
+        fmt = mask_format(width)
+        for mask in (0, 1, 3, 5, 9, (1 << width) - 1, 1 << (width - 1), (1 << width) | 1,
+                     int("01" * (width // 2), 2), int("10" * (width // 2), 2), rng.getrandbits(width)):
+            masks.append({"width": width, "mask": str(mask), "valid": fmt.is_valid(mask)})
+    headers = [{"width": 64, "raw": raw, "parsed": _parsed(mask_format(64), raw)} for raw in _RAW_MASKS]
+
+    shadows = []
+    for i in range(24):
+        secret = _SECRETS[i % len(_SECRETS)]
+        engine = EntangledLogicOmegaV5(secret.encode(), native=False)
+        context, path, nonce = rng.choice(_CONTEXTS), rng.choice(_PATHS), f"shadow-{i}"
+        seed_input = f"{path}|{context}|{nonce}|{engine.secret}"
+        entity = entity_of(path)
+        entity_input = f"banking|{entity}|{engine.secret}"
+        shadows.append({
+            "secret": secret, "context": context, "path": path, "nonce": nonce, "template": "banking",
+            "seed_input": seed_input, "seed": engine._shadow_seed(seed_input),
+            "entity": entity, "entity_seed_input": entity_input,
+            "entity_seed": engine.shadow_world.seed_fn(entity_input),
+            "payload": _payload_without_timestamp(engine.generate_shadow("STRUCT", context, path, nonce)),
+        })
+
+    store = NonceStore(max_age_ms=1000)
+    nonce_ops, now = [], 0
+    for _ in range(120):
+        now += rng.randint(0, 120)
+        nonce = f"n{rng.randint(0, 25)}"
+        expiry = rng.choice([None, now + rng.randint(-5, 3000)])
+        nonce_ops.append({"nonce": nonce, "now_ms": now, "expiry_ms": expiry, "accepted": store.add(nonce, now, expiry)})
+
+    return {"version": VERSION, "seals": seals, "masks": masks, "mask_headers": headers, "shadows": shadows,
+            "nonces": {"max_age_ms": 1000, "ops": nonce_ops}}
+
+
+def check_vectors(vectors: dict, native: Optional[bool] = False) -> List[str]:
+    """Lista de divergências (vazia = conforme)."""
+    if vectors.get("version") != VERSION:
+        return [f"versão do corpus {vectors.get('version')} != {VERSION}"]
+    failures = []
+    for i, case in enumerate(vectors["seals"]):
+        engine = EntangledLogicOmegaV5(case["secret"].encode(), mask_width=128, native=native)
+        args = (int(case["mask"]), case["context"], case["timestamp"], case["path"], case["nonce"], case.get("body_digest"))
+        if "body_hex" in case and hashlib.sha256(bytes.fromhex(case["body_hex"])).hexdigest() != case["body_digest"]:
+            failures.append(f"seals[{i}]: body_digest diferente do SHA-256 do corpo")
+        if engine.compute_seal(*args) != case["seal"]:
+            failures.append(f"seals[{i}]: selo diferente para {case['payload']!r}")
+        elif not engine.verify_seal(case["seal"], *args):
+            failures.append(f"seals[{i}]: verify_seal rejeitou o próprio selo")
+    for i, case in enumerate(vectors["masks"]):
+        engine = EntangledLogicOmegaV5(b"k", mask_width=case["width"], native=native)
+        if engine.is_valid_zeckendorf_mask(int(case["mask"])) != case["valid"]:
+            failures.append(f"masks[{i}]: validade de {case['mask']} ({case['width']} bits) != {case['valid']}")
+    for i, case in enumerate(vectors["mask_headers"]):
+        parsed = _parsed(mask_format(case["width"]), case["raw"])
+        if parsed != case["parsed"]:
+            failures.append(f"mask_headers[{i}]: {case['raw']!r} -> {parsed} != {case['parsed']}")
+    for i, case in enumerate(vectors["shadows"]):
+        engine = EntangledLogicOmegaV5(case["secret"].encode(), native=native)
+        if engine._shadow_seed(case["seed_input"]) != case["seed"]:
+            failures.append(f"shadows[{i}]: semente diferente")
+        if engine.shadow_world.seed_fn(case["entity_seed_input"]) != case["entity_seed"]:
+            failures.append(f"shadows[{i}]: semente da entidade diferente")
+        payload = engine.generate_shadow("STRUCT", case["context"], case["path"], case["nonce"], case["template"])
+        if _payload_without_timestamp(payload) != case["payload"]:
+            failures.append(f"shadows[{i}]: payload diferente para {case['path']!r}")
+    engine = EntangledLogicOmegaV5(b"k", max_age_ms=vectors["nonces"]["max_age_ms"], native=native)
+    for i, op in enumerate(vectors["nonces"]["ops"]):
+        if engine.consume_nonce(op["nonce"], op["now_ms"], op["expiry_ms"]) != op["accepted"]:
+            failures.append(f"nonces[{i}]: {op['nonce']} em {op['now_ms']} != {op['accepted']}")
+            break  # o estado divergiu: as operações seguintes já não significam nada
+    return failures
+
+
+def bench(vectors: dict, seconds: float = 1.0, native: Optional[bool] = False) -> dict:
+    """Operações por segundo de cada família de vetores, repetindo o corpus até `seconds`."""
+    engines = {s: EntangledLogicOmegaV5(s.encode(), mask_width=128, native=native) for s in _SECRETS}
+
+    def seal_round():
+        for case in vectors["seals"]:
+            engines[case["secret"]].verify_seal(case["seal"], int(case["mask"]), case["context"],
+                                                case["timestamp"], case["path"], case["nonce"], case.get("body_digest"))
+        return len(vectors["seals"])
+
+    masks = [(int(c["mask"]), EntangledLogicOmegaV5(b"k", mask_width=c["width"], native=native)) for c in vectors["masks"]]
+
+    def mask_round():
+        for mask, engine in masks:
+            engine.is_valid_zeckendorf_mask(mask)
+        return len(masks)
+
+    def shadow_round():
+        for case in vectors["shadows"]:
+            engines[case["secret"]].generate_shadow("STRUCT", case["context"], case["path"], case["nonce"])
+        return len(vectors["shadows"])
+
+    counter = iter(range(1 << 62))
+
+    def nonce_round():
+        engine = engines["k"]
+        for _ in range(100):
+            engine.consume_nonce(f"bench-{next(counter)}", 0, 300000)
+        return 100
+
+    results = {}
+    for name, round_fn in (("seal_verify", seal_round), ("mask", mask_round),
+                           ("shadow", shadow_round), ("nonce", nonce_round)):
+        ops, started = 0, time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            ops += round_fn()
+        results[name] = round(ops / (time.perf_counter() - started))
+    return results
+
+
+def load(path: str = DEFAULT_PATH) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Vetores de conformidade ELP-Ω")
+    parser.add_argument("--vectors", default=DEFAULT_PATH)
+    parser.add_argument("--native", action="store_true", help="Usa a extensão _elp_native")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("generate")
+    sub.add_parser("check")
+    bench_parser = sub.add_parser("bench")
+    bench_parser.add_argument("--seconds", type=float, default=1.0)
+    bench_parser.add_argument("--json", action="store_true")
+    # Contrato de conformance/run_benchmarks.py: o corpus chega como último argumento
+    bench_parser.add_argument("corpus", nargs="?")
+    args = parser.parse_args(argv)
+    native = args.native
+
+    if args.command == "generate":
+        vectors = generate_vectors()
+        os.makedirs(os.path.dirname(os.path.abspath(args.vectors)), exist_ok=True)
+        with open(args.vectors, "w", encoding="utf-8") as fh:
+            json.dump(vectors, fh, ensure_ascii=False, indent=1)
+            fh.write("\n")
+        print(f"{args.vectors}: {sum(len(v) for k, v in vectors.items() if isinstance(v, list))} vetores")
+        return 0
+
+    vectors = load(getattr(args, "corpus", None) or args.vectors)
+    if args.command == "check":
+        failures = check_vectors(vectors, native)
+        for failure in failures:
+            print(failure)
+        print("conforme" if not failures else f"{len(failures)} divergência(s)")
+        return 1 if failures else 0
+
+    results = bench(vectors, args.seconds, native)
+    failures = check_vectors(vectors, native)
+    if args.json:
+        print(json.dumps({"impl": "python-native" if native else "python", "failed": len(failures), "ops_per_sec": results}))
+    else:
+        for name, rate in results.items():
+            print(f"{name:<12}{rate:>14,} ops/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
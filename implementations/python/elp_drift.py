@@ -0,0 +1,96 @@
+"""
+Janela de Frescor Sensível ao Desvio de Relógio (clock drift) por Cliente.
+
+Sem estimativa, o timestamp é aceite em ±`max_age_ms` (5 min) e cada nonce
+tem de ficar guardado durante toda essa janela. Aqui o desvio de cada
+fingerprint é estimado por EWMA a partir de requisições JÁ AUTENTICADAS
+(selo válido e nonce inédito), de modo que um atacante não consegue
+envenenar a estimativa.
+
+Classificação do timestamp:
+- FRESH:   |offset - centro| <= janela curta (segundos) -> elegível a PRIME
+- DRIFTED: fora da janela curta, mas |offset| <= max_age_ms -> MIRROR
+- STALE:   |offset| > max_age_ms -> SHADOW
+
+O centro é limitado a ±`max_drift_ms` e a meia-janela a 2x `tight_window_ms`.
+A estimativa decide só entre PRIME e MIRROR; a retenção dos nonces NÃO
+encolhe. MIRROR também executa o handler real (só a resposta é mascarada),
+por isso um nonce tem de ficar guardado enquanto o seu timestamp puder ser
+aceite em qualquer classe: até `timestamp + max_age_ms`, inclusive.
+"""
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+FRESH = "fresh"
+DRIFTED = "drifted"
+STALE = "stale"
+
+
+class ClockDriftEstimator:
+    def __init__(self, max_age_ms: int = 300000, tight_window_ms: int = 5000, max_drift_ms: int = 20000,
+                 alpha: float = 0.1, max_clients: int = 100_000):
+        self.max_age_ms = max_age_ms
+        self.tight_window_ms = tight_window_ms
+        self.max_drift_ms = max_drift_ms
+        self.alpha = alpha
+        self.max_clients = max_clients
+        # fingerprint -> [centro (ms), desvio médio absoluto (ms), amostras]
+        self._clients: "OrderedDict[str, list]" = OrderedDict()
+        # Só a escrita precisa de lock (adaptador WSGI com threads); classify lê sem bloquear
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def window(self, fingerprint: str) -> Tuple[float, float]:
+        """(centro, meia-largura) da janela curta para o cliente; desconhecido = centrado em 0."""
+        entry = self._clients.get(fingerprint)
+        if entry is None:
+            return 0.0, float(self.tight_window_ms)
+        center = max(-self.max_drift_ms, min(self.max_drift_ms, entry[0]))
+        half = self.tight_window_ms + min(4 * entry[1], self.tight_window_ms)
+        return center, half
+
+    def classify(self, fingerprint: str, offset_ms: int, max_age_ms: int = None) -> str:
+        """
+        `offset_ms` = relógio do servidor - timestamp do cliente. `max_age_ms`:
+        janela em vigor (o ElpGuard passa a do engine, que a reconfiguração a
+        quente pode mudar); None = a deste estimador.
+        """
+        if abs(offset_ms) > (max_age_ms or self.max_age_ms):
+            return STALE
+        center, half = self.window(fingerprint)
+        if abs(offset_ms - center) <= half:
+            return FRESH
+        return DRIFTED
+
+    def nonce_expiry(self, timestamp: int, verdict: str, max_age_ms: int = None) -> int:
+        """
+        Até quando guardar o nonce, qualquer que seja a classe: um FRESH repetido
+        mais tarde seria DRIFTED, e DRIFTED (MIRROR) volta a correr o handler.
+        +1 porque `classify` aceita |offset| == max_age_ms e o store descarta
+        a entrada no instante `expiry_ms`.
+        """
+        return timestamp + (max_age_ms or self.max_age_ms) + 1
+
+    def observe(self, fingerprint: str, offset_ms: int) -> None:
+        """Chamado apenas após autenticação completa (selo + nonce)."""
+        clients = self._clients
+        with self._lock:
+            entry = clients.get(fingerprint)
+            if entry is None:
+                # Parte de 0: um único pedido nunca desloca a janela de uma vez
+                entry = clients[fingerprint] = [0.0, 0.0, 0]
+                if len(clients) > self.max_clients:
+                    clients.popitem(last=False)
+            else:
+                clients.move_to_end(fingerprint)
+            error = offset_ms - entry[0]
+            entry[0] += self.alpha * error
+            entry[1] += self.alpha * (abs(error) - entry[1])
+            entry[2] += 1
+
+    def stats(self) -> dict:
+        return {"clients": len(self._clients), "max_clients": self.max_clients,
+                "nonce_retention_ms": self.max_age_ms + 1}
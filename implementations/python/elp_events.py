@@ -0,0 +1,247 @@
+"""
+Log Estruturado de Eventos de Segurança (assíncrono).
+
+O middleware regista cada decisão (realidade, estágio que falhou, fingerprint,
+latência) num anel limitado em memória. Uma thread escritora esvazia o anel
+em lotes para ficheiros NDJSON ou binários compactos, com rotação por tamanho.
+
+O caminho de requisição nunca bloqueia: `deque.append`/`popleft` são
+operações atómicas (sem locks explícitos) e, com o anel cheio, o evento é
+descartado e contabilizado em `dropped`.
+"""
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+from typing import Iterator, List, Optional
+
+from elp_omega import Reality
+
+
+class Stage:
+    """Estágio da cascata que decidiu a realidade (vazio = PRIME)."""
+    NONE = ""
+    ADJACENCY = "adjacency"
+    AUTHORIZATION = "authorization"
+    FRESHNESS = "freshness"
+    SEAL = "seal"
+    REPLAY = "replay"
+    # Desviado pelo elp_shaper antes da cascata (fingerprint acima da taxa)
+    RATE = "rate"
+    # Corpo recebido não corresponde ao X-ELP-Body-Digest assinado (veredicto no fim do stream)
+    BODY = "body"
+
+
+class Span:
+    """Estágios medidos pelo elp_profile.StageTracer (cada marca fecha o intervalo desde a anterior)."""
+    PARSE = "parse"
+    SEAL = "seal"
+    NONCE = "nonce"
+    APP = "app"
+    SHADOW = "shadow"
+    JSON = "json"
+    JITTER = "jitter"
+    CHEAP = "cheap"
+    SEND = "send"
+
+
+SecurityEvent = namedtuple("SecurityEvent", "ts_ms reality stage fingerprint method path latency_ms")
+
+# Códigos de 1 byte para o formato binário (ordem estável: só acrescentar no fim)
+REALITY_CODES = (Reality.PRIME, Reality.MIRROR, Reality.SHADOW)
+STAGE_CODES = (Stage.NONE, Stage.ADJACENCY, Stage.AUTHORIZATION, Stage.FRESHNESS, Stage.SEAL, Stage.REPLAY, Stage.RATE, Stage.BODY)
+_REALITY_INDEX = {name: i for i, name in enumerate(REALITY_CODES)}
+_STAGE_INDEX = {name: i for i, name in enumerate(STAGE_CODES)}
+
+
+class EventRing:
+    """Anel limitado de produtores múltiplos e consumidor único; descarta o evento NOVO quando cheio."""
+
+    def __init__(self, capacity: int = 65536):
+        self.capacity = capacity
+        self.dropped = 0
+        self._items = deque()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def offer(self, event) -> bool:
+        if len(self._items) >= self.capacity:
+            self.dropped += 1
+            return False
+        self._items.append(event)
+        return True
+
+    def drain(self, max_items: int) -> List:
+        items, batch = self._items, []
+        while items and len(batch) < max_items:
+            batch.append(items.popleft())
+        return batch
+
+
+class _RotatingFile:
+    """Ficheiro em modo append com rotação path -> path.1 -> ... -> path.N."""
+
+    def __init__(self, path: str, max_bytes: int, backups: int, header: bytes = b""):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.header = header
+        self._fh = None
+        self._open()
+
+    def _open(self) -> None:
+        self._fh = open(self.path, "ab")
+        if self._fh.tell() == 0 and self.header:
+            self._fh.write(self.header)
+
+    def write(self, data: bytes) -> None:
+        if self._fh.tell() + len(data) > self.max_bytes and self._fh.tell() > len(self.header):
+            self._rotate()
+        self._fh.write(data)
+
+    def _rotate(self) -> None:
+        self._fh.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def flush(self) -> None:
+        self._fh.flush()
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class NdjsonSink:
+    """Um objeto JSON por linha; legível por jq e pelas ferramentas de análise de logs."""
+
+    def __init__(self, path: str, max_bytes: int = 64 << 20, backups: int = 5):
+        self._file = _RotatingFile(path, max_bytes, backups)
+
+    def write_batch(self, events: List[SecurityEvent]) -> None:
+        lines = "".join(json.dumps(e._asdict(), separators=(",", ":")) + "\n" for e in events)
+        self._file.write(lines.encode())
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+# Cabeçalho fixo + campos de tamanho variável (fingerprint, método, path) em UTF-8
+BINARY_MAGIC = b"ELPE\x01"
+_BINARY_RECORD = struct.Struct("<qBBfHBH")
+_MAX_SHORT = 255
+_MAX_LONG = 65535
+
+
+class BinarySink:
+    """Registos binários compactos (~20 bytes + strings), ~4x menores que NDJSON."""
+
+    def __init__(self, path: str, max_bytes: int = 64 << 20, backups: int = 5):
+        self._file = _RotatingFile(path, max_bytes, backups, header=BINARY_MAGIC)
+
+    def write_batch(self, events: List[SecurityEvent]) -> None:
+        chunks = []
+        for e in events:
+            # O cliente escolhe método e path: truncados ao limite do campo, nunca descartam o lote
+            fingerprint, method = e.fingerprint.encode()[:_MAX_LONG], e.method.encode()[:_MAX_SHORT]
+            path = e.path.encode()[:_MAX_LONG]
+            chunks.append(_BINARY_RECORD.pack(
+                e.ts_ms, _REALITY_INDEX[e.reality], _STAGE_INDEX[e.stage], e.latency_ms,
+                len(fingerprint), len(method), len(path),
+            ))
+            chunks.append(fingerprint + method + path)
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_binary_events(path: str) -> Iterator[SecurityEvent]:
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if not data.startswith(BINARY_MAGIC):
+        raise ValueError(f"{path} não é um log binário ELP-Ω")
+    offset = len(BINARY_MAGIC)
+    while offset < len(data):
+        ts_ms, reality, stage, latency, fp_len, m_len, p_len = _BINARY_RECORD.unpack_from(data, offset)
+        offset += _BINARY_RECORD.size
+        # "replace": um campo truncado pode terminar a meio de um carácter UTF-8
+        fingerprint = data[offset:offset + fp_len].decode(errors="replace")
+        offset += fp_len
+        method = data[offset:offset + m_len].decode(errors="replace")
+        offset += m_len
+        path_ = data[offset:offset + p_len].decode(errors="replace")
+        offset += p_len
+        yield SecurityEvent(ts_ms, REALITY_CODES[reality], STAGE_CODES[stage], fingerprint, method, path_, latency)
+
+
+class EventLog:
+    """Emissor não-bloqueante + thread escritora em lotes."""
+
+    def __init__(self, sink, capacity: int = 65536, batch_size: int = 1024, flush_interval: float = 0.5):
+        self.sink = sink
+        self.ring = EventRing(capacity)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.write_errors = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def dropped(self) -> int:
+        return self.ring.dropped
+
+    def start(self) -> "EventLog":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="elp-event-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def emit(self, reality: str, stage: str, fingerprint: str, method: str, path: str, latency_ms: float) -> bool:
+        """Chamado no caminho quente: apenas enfileira."""
+        return self.ring.offer(SecurityEvent(
+            int(time.time() * 1000), reality, stage, fingerprint, method, path, round(latency_ms, 3),
+        ))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+
+    def _drain(self) -> None:
+        while True:
+            batch = self.ring.drain(self.batch_size)
+            if not batch:
+                return
+            try:
+                self.sink.write_batch(batch)
+                self.written += len(batch)
+            except Exception:
+                # Disco cheio, lote que o sink não consegue codificar...: perde o lote,
+                # mas a thread continua viva e o erro fica visível em stats()
+                self.write_errors += 1
+
+    def stats(self) -> dict:
+        return {"queued": len(self.ring), "written": self.written,
+                "dropped": self.ring.dropped, "write_errors": self.write_errors}
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self._drain()
+        self.sink.close()
@@ -0,0 +1,384 @@
+"""
+Armazém Colunar de Eventos de Segurança (memory-mapped) + Ferramenta de Consulta.
+
+Layout em disco (append-only, uma partição por hora UTC):
+
+    <raiz>/fingerprint.dict, path.dict, method.dict   dicionários (linha N = id N)
+    <raiz>/2025112814/ts.i8 reality.u1 stage.u1 fingerprint.u4 method.u1 path.u4 latency.f4
+
+Strings são codificadas por dicionário e cada coluna é um array NumPy
+contíguo. A consulta abre só as partições que intersectam o intervalo pedido,
+recorta-as por `searchsorted` no timestamp e aplica filtros e agregações
+vetorizadas, sem desserializar um evento sequer.
+
+Os dicionários têm teto (`limits`; por omissão 256 métodos, 100 000 paths,
+~1 M fingerprints): cheios, os valores novos ficam como "OTHER"/"<other>" em
+vez de crescerem sem limite com strings escolhidas pelo atacante.
+
+Uso (CLI):
+    python elp_eventstore.py query --root events/ --since 1h --reality SHADOW --stage replay --group-by fingerprint,path
+    python elp_eventstore.py classify --root events/ --since 24h
+    python elp_eventstore.py ingest --root events/ elp-events.ndjson elp-events.bin
+"""
+import argparse
+import calendar
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from elp_events import REALITY_CODES, STAGE_CODES, SecurityEvent, Stage, read_binary_events
+from elp_omega import Reality
+
+HOUR_MS = 3_600_000
+
+COLUMNS = {
+    "ts": np.dtype("<i8"),
+    "reality": np.dtype("u1"),
+    "stage": np.dtype("u1"),
+    "fingerprint": np.dtype("<u4"),
+    "method": np.dtype("u1"),
+    "path": np.dtype("<u4"),
+    "latency": np.dtype("<f4"),
+}
+_EXTENSIONS = {"ts": "i8", "reality": "u1", "stage": "u1", "fingerprint": "u4",
+               "method": "u1", "path": "u4", "latency": "f4"}
+DICTIONARY_COLUMNS = ("fingerprint", "method", "path")
+# Método, path e fingerprint vêm do cliente: cada dicionário tem teto e, cheio,
+# os valores novos partilham um código fixo (o método tem de caber em u1)
+OVERFLOW = {"fingerprint": "<other>", "method": "OTHER", "path": "<other>"}
+DEFAULT_LIMITS = {"fingerprint": 1 << 20, "method": 256, "path": 100_000}
+
+_REALITY_INDEX = {name: i for i, name in enumerate(REALITY_CODES)}
+_STAGE_INDEX = {name: i for i, name in enumerate(STAGE_CODES)}
+
+
+def _partition_name(ts_ms: int) -> str:
+    return time.strftime("%Y%m%d%H", time.gmtime(ts_ms // 1000))
+
+
+def _partition_start(name: str) -> int:
+    return calendar.timegm(time.strptime(name, "%Y%m%d%H")) * 1000
+
+
+def _column_file(partition_dir: str, column: str) -> str:
+    return os.path.join(partition_dir, f"{column}.{_EXTENSIONS[column]}")
+
+
+class _Dictionary:
+    """
+    Dicionário string -> id persistido como uma string JSON por linha. Com
+    `max_size`, o último id fica reservado a `overflow` e todo valor novo
+    depois disso é codificado como ele (contado em `overflowed`).
+    """
+
+    def __init__(self, path: str, writable: bool, max_size: Optional[int] = None, overflow: str = ""):
+        self.path = path
+        self.max_size = max_size
+        self.overflow = overflow
+        self.overflowed = 0
+        self.values: List[str] = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                self.values = [json.loads(line) for line in fh if line.strip()]
+        self.ids = {value: i for i, value in enumerate(self.values)}
+        self._fh = open(path, "a", encoding="utf-8") if writable else None
+
+    def encode(self, value: str) -> int:
+        code = self.ids.get(value)
+        if code is None:
+            if self.max_size is not None and len(self.values) >= self.max_size - 1 and value != self.overflow:
+                self.overflowed += 1
+                return self.encode(self.overflow)
+            code = len(self.values)
+            self.values.append(value)
+            self.ids[value] = code
+            self._fh.write(json.dumps(value) + "\n")
+        return code
+
+    def flush(self) -> None:
+        if self._fh is not None:
+            self._fh.flush()
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+
+
+class ColumnarEventStore:
+    """Escritor append-only; implementa a interface de sink do `elp_events.EventLog`."""
+
+    def __init__(self, root: str, limits: Optional[Dict[str, int]] = None):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        limits = {**DEFAULT_LIMITS, **(limits or {})}
+        if limits["method"] > DEFAULT_LIMITS["method"]:
+            raise ValueError(f"A coluna method é u1: no máximo {DEFAULT_LIMITS['method']} valores")
+        self._dicts = {col: _Dictionary(os.path.join(root, f"{col}.dict"), writable=True,
+                                        max_size=limits[col], overflow=OVERFLOW[col])
+                       for col in DICTIONARY_COLUMNS}
+
+    def overflowed(self) -> Dict[str, int]:
+        """Valores novos codificados como o código de overflow, por coluna (desde a abertura)."""
+        return {col: d.overflowed for col, d in self._dicts.items()}
+
+    def write_batch(self, events: Sequence[SecurityEvent]) -> None:
+        by_partition: Dict[str, List[SecurityEvent]] = {}
+        for event in events:
+            by_partition.setdefault(_partition_name(event.ts_ms), []).append(event)
+
+        encoded = {}
+        for name, batch in by_partition.items():
+            fp, method, path = (self._dicts[c] for c in DICTIONARY_COLUMNS)
+            encoded[name] = {
+                "ts": np.fromiter((e.ts_ms for e in batch), COLUMNS["ts"], len(batch)),
+                "reality": np.fromiter((_REALITY_INDEX[e.reality] for e in batch), COLUMNS["reality"], len(batch)),
+                "stage": np.fromiter((_STAGE_INDEX[e.stage] for e in batch), COLUMNS["stage"], len(batch)),
+                "fingerprint": np.fromiter((fp.encode(e.fingerprint) for e in batch), COLUMNS["fingerprint"], len(batch)),
+                "method": np.fromiter((method.encode(e.method) for e in batch), COLUMNS["method"], len(batch)),
+                "path": np.fromiter((path.encode(e.path) for e in batch), COLUMNS["path"], len(batch)),
+                "latency": np.fromiter((e.latency_ms for e in batch), COLUMNS["latency"], len(batch)),
+            }
+        # Dicionários primeiro: um leitor nunca vê um id sem o seu valor
+        for d in self._dicts.values():
+            d.flush()
+
+        for name, columns in encoded.items():
+            partition_dir = os.path.join(self.root, name)
+            os.makedirs(partition_dir, exist_ok=True)
+            for column, values in columns.items():
+                with open(_column_file(partition_dir, column), "ab") as fh:
+                    fh.write(values.tobytes())
+
+    def close(self) -> None:
+        for d in self._dicts.values():
+            d.close()
+
+
+class EventStoreReader:
+    """Leitor vetorizado sobre uma ou mais raízes (ex.: uma por worker)."""
+
+    def __init__(self, *roots: str):
+        self.roots = roots
+        self._dicts: Dict[Tuple[str, str], _Dictionary] = {}
+
+    def _partitions(self, root: str, since_ms: Optional[int], until_ms: Optional[int]) -> List[str]:
+        names = sorted(n for n in os.listdir(root) if n.isdigit() and len(n) == 10)
+        selected = []
+        for name in names:
+            start = _partition_start(name)
+            if since_ms is not None and start + HOUR_MS <= since_ms:
+                continue
+            if until_ms is not None and start > until_ms:
+                continue
+            selected.append(os.path.join(root, name))
+        return selected
+
+    @staticmethod
+    def _load_partition(partition_dir: str) -> Dict[str, np.ndarray]:
+        arrays = {}
+        for column, dtype in COLUMNS.items():
+            path = _column_file(partition_dir, column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            rows = size // dtype.itemsize
+            arrays[column] = (np.memmap(path, dtype=dtype, mode="r", shape=(rows,)) if rows
+                              else np.empty(0, dtype=dtype))
+        # Escrita interrompida pode deixar colunas desalinhadas: vale o menor comprimento
+        rows = min(len(a) for a in arrays.values())
+        return {column: a[:rows] for column, a in arrays.items()}
+
+    def scan(self, since_ms: Optional[int] = None, until_ms: Optional[int] = None):
+        """Gera (raiz, colunas) por partição, já recortadas ao intervalo."""
+        for root in self.roots:
+            for partition_dir in self._partitions(root, since_ms, until_ms):
+                cols = self._load_partition(partition_dir)
+                ts = cols["ts"]
+                # Appends chegam em ordem temporal; se não, cai para máscara booleana
+                if len(ts) and np.all(ts[:-1] <= ts[1:]):
+                    lo = np.searchsorted(ts, since_ms, "left") if since_ms is not None else 0
+                    hi = np.searchsorted(ts, until_ms, "right") if until_ms is not None else len(ts)
+                    cols = {c: a[lo:hi] for c, a in cols.items()}
+                elif len(ts):
+                    keep = np.ones(len(ts), dtype=bool)
+                    if since_ms is not None:
+                        keep &= ts >= since_ms
+                    if until_ms is not None:
+                        keep &= ts <= until_ms
+                    cols = {c: a[keep] for c, a in cols.items()}
+                yield root, cols
+
+    def _dictionary(self, root: str, column: str) -> _Dictionary:
+        key = (root, column)
+        if key not in self._dicts:
+            self._dicts[key] = _Dictionary(os.path.join(root, f"{column}.dict"), writable=False)
+        return self._dicts[key]
+
+    def _selection(self, root, cols, reality, stage, fingerprint, path) -> np.ndarray:
+        keep = np.ones(len(cols["ts"]), dtype=bool)
+        if reality is not None:
+            keep &= cols["reality"] == _REALITY_INDEX[reality]
+        if stage is not None:
+            keep &= cols["stage"] == _STAGE_INDEX[stage]
+        for column, value in (("fingerprint", fingerprint), ("path", path)):
+            if value is not None:
+                code = self._dictionary(root, column).ids.get(value)
+                keep &= (cols[column] == code) if code is not None else False
+        return keep
+
+    def count(self, since_ms=None, until_ms=None, reality=None, stage=None, fingerprint=None, path=None) -> int:
+        return int(sum(np.count_nonzero(self._selection(root, cols, reality, stage, fingerprint, path))
+                       for root, cols in self.scan(since_ms, until_ms)))
+
+    def group_count(self, by: Sequence[str], since_ms=None, until_ms=None, reality=None, stage=None,
+                    fingerprint=None, path=None) -> Counter:
+        """Contagem agrupada; o agrupamento é `np.unique` sobre chaves empacotadas em uint64."""
+        if not 1 <= len(by) <= 2:
+            raise ValueError("Agrupamento suporta 1 ou 2 colunas")
+        for column in by:
+            if column not in ("fingerprint", "path", "method", "stage", "reality"):
+                raise ValueError(f"Coluna de agrupamento inválida: {column}")
+        totals: Counter = Counter()
+        for root, cols in self.scan(since_ms, until_ms):
+            keep = self._selection(root, cols, reality, stage, fingerprint, path)
+            if not keep.any():
+                continue
+            key = np.zeros(np.count_nonzero(keep), dtype=np.uint64)
+            for column in by:
+                key = (key << np.uint64(32)) | cols[column][keep].astype(np.uint64)
+            uniques, counts = np.unique(key, return_counts=True)
+            decoders = [self._decoder(root, column) for column in by]
+            for packed, n in zip(uniques.tolist(), counts.tolist()):
+                parts = []
+                for i, decode in enumerate(reversed(decoders)):
+                    parts.append(decode((packed >> (32 * i)) & 0xFFFFFFFF))
+                totals[tuple(reversed(parts))] += n
+        return totals
+
+    def _decoder(self, root: str, column: str):
+        if column == "reality":
+            return lambda code: REALITY_CODES[code]
+        if column == "stage":
+            return lambda code: STAGE_CODES[code]
+        values = self._dictionary(root, column).values
+        return lambda code: values[code]
+
+    def classify_incidents(self, since_ms=None, until_ms=None, rotate_threshold: int = 10_000) -> List[dict]:
+        """
+        Classificação do docs/operations.md por fingerprint: Violação de Adjacência,
+        Replay Attack e Seal Mismatch, com a ação sugerida.
+        """
+        counts = self.group_count(("fingerprint", "stage"), since_ms, until_ms, reality=Reality.SHADOW)
+        per_fp: Dict[str, Counter] = {}
+        for (fp, stage), n in counts.items():
+            per_fp.setdefault(fp, Counter())[stage] += n
+
+        labels = {Stage.ADJACENCY: "adjacency_violation", Stage.REPLAY: "replay_attack",
+                  Stage.SEAL: "seal_mismatch"}
+        incidents = []
+        for fp, stages in per_fp.items():
+            total = sum(stages.values())
+            relevant = {s: stages[s] for s in labels}
+            dominant = max(relevant, key=relevant.get)
+            incidents.append({
+                "fingerprint": fp,
+                "adjacency_violation": stages[Stage.ADJACENCY],
+                "replay_attack": stages[Stage.REPLAY],
+                "seal_mismatch": stages[Stage.SEAL],
+                "other": total - sum(relevant.values()),
+                "total": total,
+                "classification": labels[dominant] if relevant[dominant] else "other",
+                # Quem já consumiu muito da sombra pode tê-la mapeado: hora de trocar a STABILITY_SEED
+                "suggestion": "rotate_shadow_seed" if total >= rotate_threshold else "watchlist",
+            })
+        incidents.sort(key=lambda i: i["total"], reverse=True)
+        return incidents
+
+
+def _load_log_file(path: str) -> Iterable[SecurityEvent]:
+    with open(path, "rb") as fh:
+        head = fh.read(4)
+    if head == b"ELPE":
+        yield from read_binary_events(path)
+        return
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield SecurityEvent(**json.loads(line))
+
+
+def _parse_time(value: Optional[str], now_ms: int) -> Optional[int]:
+    """'1h', '30m', '2d' (relativo a agora) ou epoch em ms."""
+    if value is None:
+        return None
+    units = {"s": 1000, "m": 60_000, "h": HOUR_MS, "d": 24 * HOUR_MS}
+    if value[-1] in units and value[:-1].isdigit():
+        return now_ms - int(value[:-1]) * units[value[-1]]
+    return int(value)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Consulta de eventos de segurança ELP-Ω")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("query", "classify"):
+        p = sub.add_parser(name)
+        p.add_argument("--root", action="append", required=True)
+        p.add_argument("--since")
+        p.add_argument("--until")
+    query = sub.choices["query"]
+    query.add_argument("--reality", choices=REALITY_CODES)
+    query.add_argument("--stage", choices=[s for s in STAGE_CODES if s])
+    query.add_argument("--fingerprint")
+    query.add_argument("--path")
+    query.add_argument("--group-by", default="")
+    query.add_argument("--top", type=int, default=50)
+
+    ingest = sub.add_parser("ingest")
+    ingest.add_argument("--root", required=True)
+    ingest.add_argument("files", nargs="+")
+    ingest.add_argument("--batch", type=int, default=100_000)
+
+    args = parser.parse_args(argv)
+    now_ms = int(time.time() * 1000)
+
+    if args.command == "ingest":
+        store = ColumnarEventStore(args.root)
+        total, batch = 0, []
+        for path in args.files:
+            for event in _load_log_file(path):
+                batch.append(event)
+                if len(batch) >= args.batch:
+                    store.write_batch(batch)
+                    total, batch = total + len(batch), []
+        if batch:
+            store.write_batch(batch)
+            total += len(batch)
+        store.close()
+        print(f"{total} eventos importados para {args.root}")
+        return 0
+
+    reader = EventStoreReader(*args.root)
+    since, until = _parse_time(args.since, now_ms), _parse_time(args.until, now_ms)
+    started = time.perf_counter()
+
+    if args.command == "classify":
+        for incident in reader.classify_incidents(since, until):
+            print(json.dumps(incident, ensure_ascii=False))
+    else:
+        filters = dict(reality=args.reality, stage=args.stage, fingerprint=args.fingerprint, path=args.path)
+        by = [c for c in args.group_by.split(",") if c]
+        if by:
+            for key, n in reader.group_count(by, since, until, **filters).most_common(args.top):
+                print(f"{n:>10}  " + "  ".join(key))
+        else:
+            print(reader.count(since, until, **filters))
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
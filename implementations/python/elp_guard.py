@@ -0,0 +1,219 @@
+"""
+Cascata de Validação ELP-Ω independente de framework.
+
+Os adaptadores (ASGI em `elp_middleware`, WSGI em `elp_wsgi`) só extraem os
+headers e entregam a resposta; a decisão de realidade vive aqui, partida em
+duas etapas à volta do selo HMAC, que é o único passo que o adaptador ASGI
+pode querer despachar para fora do event loop (elp_offload):
+
+    check = guard.precheck(method, path, headers, fingerprint)   # Adjacência, Autorização, Frescor
+    seal_ok = engine.verify_seal(...)                             # inline ou offload
+    reality, stage = guard.finish(check, seal_ok)                 # Selo, Replay
+
+Com `X-ELP-Body-Digest` o selo cobre também o SHA-256 do corpo: o selo é
+verificado contra o digest declarado e o corpo é conferido depois, em
+streaming, por um `BodyDigest` que o adaptador alimenta à medida que a app lê.
+
+A política da rota (elp_routes) é resolvida pelo adaptador antes de tudo
+(`guard.policy(path)`): rotas em bypass nem chegam ao precheck; as restantes
+podem apertar a janela de frescor e exigir bits na máscara.
+"""
+import hashlib
+import hmac
+import json
+import time
+from typing import Optional, Tuple
+
+from elp_drift import DRIFTED, FRESH, STALE
+from elp_events import Stage
+from elp_mask import TIMESTAMP_MAX_DIGITS, parse_bounded_int
+from elp_omega import Reality
+from elp_routes import DEFAULT_POLICY, RoutePolicy
+
+
+class RequestCheck:
+    """Estado de um pedido entre `precheck` e `finish`."""
+    __slots__ = ("mask", "seal", "timestamp", "nonce", "body_digest", "method", "path", "fingerprint",
+                 "now_ms", "offset_ms", "freshness", "failed_stage", "policy")
+
+    def seal_args(self) -> tuple:
+        """Argumentos de `verify_seal` na ordem do engine."""
+        return self.seal, self.mask, self.method, self.timestamp, self.path, self.nonce, self.body_digest
+
+
+class BodyDigest:
+    """
+    SHA-256 incremental do corpo contra o digest assinado. `update` não copia
+    os chunks; `finish` dá o veredicto (True/False) quando o stream termina.
+    """
+    __slots__ = ("expected", "verdict", "_hash")
+
+    def __init__(self, expected: str):
+        self.expected = expected.lower()
+        self.verdict: Optional[bool] = None
+        self._hash = hashlib.sha256()
+
+    def update(self, chunk) -> None:
+        self._hash.update(chunk)
+
+    def finish(self) -> bool:
+        self.verdict = hmac.compare_digest(self._hash.hexdigest(), self.expected)
+        return self.verdict
+
+
+def _wall_clock_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class ElpGuard:
+    def __init__(self, engine, route_authorizer=None, drift_estimator=None, route_policies=None):
+        self.engine = engine
+        # Índice rota -> bits exigidos (elp_permissions.RouteAuthorizer), opcional
+        self.route_authorizer = route_authorizer
+        # Janela curta por cliente (elp_drift.ClockDriftEstimator); sem ela vale ±max_age_ms
+        self.drift_estimator = drift_estimator
+        # Trie de políticas por rota (elp_routes.RoutePolicyTable), opcional
+        self.route_policies = route_policies
+        # Relógio da cascata em ms; o soak test (benchmarks/bench_soak.py) troca-o por um virtual
+        self.clock_ms = _wall_clock_ms
+        if route_policies is not None:
+            # Template inexistente falha no arranque, não na primeira Shadow dessa rota
+            unknown = {p.shadow_template for p in route_policies.policies()} - set(engine.shadow_templates)
+            if unknown:
+                raise ValueError(f"Templates de Shadow desconhecidos: {sorted(unknown)}")
+
+    def policy(self, path: str) -> RoutePolicy:
+        """Política da rota; sem tabela, a cascata completa com os valores do engine."""
+        if self.route_policies is None:
+            return DEFAULT_POLICY
+        return self.route_policies.resolve(path)
+
+    def max_age_for(self, policy: RoutePolicy) -> int:
+        """Janela de frescor da rota: a política só aperta a do engine, nunca a alarga."""
+        if policy.max_age_ms is None:
+            return self.engine.max_age_ms
+        return min(policy.max_age_ms, self.engine.max_age_ms)
+
+    def precheck(self, method: str, path: str, headers: dict, fingerprint: str,
+                 now_ms: Optional[int] = None, policy: Optional[RoutePolicy] = None) -> RequestCheck:
+        """
+        Etapas baratas, sem criptografia. `headers` traz as chaves
+        mask/seal/timestamp/nonce (e body_digest, opcional) já extraídas pelo adaptador;
+        `policy` é a já resolvida pelo adaptador (senão é resolvida aqui).
+        """
+        engine = self.engine
+        check = RequestCheck()
+        check.policy = policy = self.policy(path) if policy is None else policy
+        # 1. Extração (tamanho limitado ANTES de int(); malformado vira -1/0 e cai na Shadow)
+        mask = engine.mask_format.parse(headers.get("mask"))
+        check.mask = -1 if mask is None else mask
+        check.seal = headers.get("seal", "")
+        check.timestamp = parse_bounded_int(headers.get("timestamp"), TIMESTAMP_MAX_DIGITS) or 0
+        check.nonce = headers.get("nonce", "")
+        check.body_digest = headers.get("body_digest") or None
+        check.method = method
+        check.path = path
+        check.fingerprint = fingerprint
+
+        # Variável de decisão: estágio que falhou (None = todos passaram)
+        failed_stage = None
+
+        # A. Validação Zeckendorf (Topológica)
+        if not engine.is_valid_zeckendorf_mask(check.mask):
+            failed_stage = Stage.ADJACENCY
+
+        # A2. Autorização por Rota (um AND contra o índice pré-computado)
+        if failed_stage is None and self.route_authorizer is not None:
+            if not self.route_authorizer.authorize(method, path, check.mask):
+                failed_stage = Stage.AUTHORIZATION
+        required = policy.required_mask
+        if failed_stage is None and (check.mask & required) != required:
+            failed_stage = Stage.AUTHORIZATION
+
+        # B. Validação Timestamp (Freshness - max_age_ms do engine, 5 min por padrão,
+        # ou o da política da rota, nunca maior do que a janela do drift)
+        check.now_ms = self.clock_ms() if now_ms is None else now_ms
+        check.offset_ms = check.now_ms - check.timestamp
+        check.freshness = FRESH
+        if failed_stage is None:
+            if self.drift_estimator is not None:
+                # A janela é a do engine deste guard: o estimador sobrevive às trocas de configuração
+                check.freshness = self.drift_estimator.classify(fingerprint, check.offset_ms, engine.max_age_ms)
+            if abs(check.offset_ms) > self.max_age_for(policy):
+                check.freshness = STALE
+            if check.freshness == STALE:
+                failed_stage = Stage.FRESHNESS
+
+        check.failed_stage = failed_stage
+        return check
+
+    def finish(self, check: RequestCheck, seal_ok: bool) -> Tuple[str, str]:
+        """(realidade, estágio que falhou ou Stage.NONE) depois do selo."""
+        failed_stage = check.failed_stage
+
+        # C. Validação HMAC (Integridade)
+        if failed_stage is None and not seal_ok:
+            failed_stage = Stage.SEAL
+
+        # D. Validação Nonce (Anti-Replay)
+        # O nonce vive enquanto o timestamp ainda puder ser aceite (não apenas now + janela)
+        if failed_stage is None:
+            if self.drift_estimator is not None:
+                expiry_ms = self.drift_estimator.nonce_expiry(check.timestamp, check.freshness,
+                                                              self.max_age_for(check.policy))
+            else:
+                # +1: |offset| == max_age_ms ainda é aceite e o store descarta a entrada no instante expiry_ms
+                expiry_ms = check.timestamp + self.max_age_for(check.policy) + 1
+            if not self.engine.consume_nonce(check.nonce, check.now_ms, expiry_ms):
+                failed_stage = Stage.REPLAY
+            elif self.drift_estimator is not None:
+                # Só pedidos autenticados alimentam a estimativa de desvio
+                self.drift_estimator.observe(check.fingerprint, check.offset_ms)
+
+        # 3. Decisão de Realidade
+        if failed_stage is not None:
+            return Reality.SHADOW, failed_stage
+        # Cliente autenticado mas com relógio fora da sua janela: degradação graciosa
+        if check.freshness == DRIFTED:
+            return Reality.MIRROR, Stage.FRESHNESS
+        return Reality.PRIME, Stage.NONE
+
+    def evaluate(self, method: str, path: str, headers: dict, fingerprint: str,
+                 policy: Optional[RoutePolicy] = None) -> Tuple[str, str]:
+        """Cascata completa, síncrona (adaptadores sem event loop)."""
+        check = self.precheck(method, path, headers, fingerprint, policy=policy)
+        seal_ok = check.failed_stage is None and self.engine.verify_seal(*check.seal_args())
+        return self.finish(check, seal_ok)
+
+
+def json_body(content) -> bytes:
+    # Mesma serialização compacta do JSONResponse do Starlette
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def mirror_body(engine, content_type: str, body: bytes) -> Optional[bytes]:
+    """Corpo JSON real mascarado; None quando não é JSON (o adaptador cai na Shadow)."""
+    if "application/json" not in content_type:
+        return None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    return json_body(engine.generate_mirror(data))
+
+
+class ConfigSnapshot:
+    """Engine e guard de uma versão da configuração (elp_config.HotConfig); imutável depois de construído."""
+    __slots__ = ("version", "config", "engine", "guard")
+
+    def __init__(self, version: int, config: Optional["ElpConfig"], engine: "EntangledLogicOmegaV5", guard: ElpGuard):
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "config", config)
+        object.__setattr__(self, "engine", engine)
+        object.__setattr__(self, "guard", guard)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot é imutável: publique um novo snapshot")
+
+    def __repr__(self) -> str:
+        return f"ConfigSnapshot(version={self.version})"
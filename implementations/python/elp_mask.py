@@ -0,0 +1,107 @@
+"""
+Máscaras Zeckendorf de Largura Fixa (64/128/256 bits).
+
+O header `X-ELP-Mask` chega como texto decimal controlado pelo cliente.
+Sem limite, um atacante envia 100k dígitos e paga-se a conversão quadrática
+de `int()` e deslocamentos em inteiros gigantes. Aqui o tamanho é verificado
+ANTES da conversão, e toda máscara aceita cabe num número fixo de palavras
+de 64 bits, o que torna o custo da validação constante.
+"""
+from typing import Optional, Sequence, Tuple
+
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+SUPPORTED_WIDTHS = (64, 128, 256)
+
+# Timestamps em ms cabem com folga em 20 dígitos (uint64)
+TIMESTAMP_MAX_DIGITS = 20
+
+
+def parse_bounded_int(raw: Optional[str], max_digits: int) -> Optional[int]:
+    """
+    Converte texto decimal não-negativo com teto de tamanho.
+    Devolve None para ausente, vazio, sinal, espaços, '_' ou excesso de dígitos.
+    """
+    if not raw or len(raw) > max_digits:
+        return None
+    # isascii() barra dígitos Unicode que int() aceitaria
+    if not (raw.isascii() and raw.isdigit()):
+        return None
+    return int(raw)
+
+
+class FixedWidthMask:
+    """Formato de máscara com largura fixa; uma instância por largura suportada."""
+
+    __slots__ = ("width", "words", "max_value", "max_digits")
+
+    def __init__(self, width: int):
+        if width not in SUPPORTED_WIDTHS:
+            raise ValueError(f"Largura de máscara não suportada: {width} (use {SUPPORTED_WIDTHS})")
+        self.width = width
+        self.words = width // WORD_BITS
+        self.max_value = (1 << width) - 1
+        self.max_digits = len(str(self.max_value))
+
+    def parse(self, raw: Optional[str]) -> Optional[int]:
+        """Header -> máscara, ou None se malformada ou fora da largura."""
+        value = parse_bounded_int(raw, self.max_digits)
+        if value is None or value > self.max_value:
+            return None
+        return value
+
+    def is_valid(self, mask: int) -> bool:
+        """Restrição de Zeckendorf limitada à largura: nunca opera sobre inteiros maiores que `width` bits."""
+        if mask < 0 or mask > self.max_value:
+            return False
+        return (mask & (mask >> 1)) == 0
+
+    def to_words(self, mask: int) -> Tuple[int, ...]:
+        """Decompõe em palavras de 64 bits (palavra 0 = bits menos significativos)."""
+        if mask < 0 or mask > self.max_value:
+            raise ValueError(f"Máscara fora da largura de {self.width} bits")
+        return tuple((mask >> (i * WORD_BITS)) & WORD_MASK for i in range(self.words))
+
+    def from_words(self, words: Sequence[int]) -> int:
+        if len(words) != self.words:
+            raise ValueError(f"Esperadas {self.words} palavras, recebidas {len(words)}")
+        mask = 0
+        for i, word in enumerate(words):
+            if word < 0 or word > WORD_MASK:
+                raise ValueError(f"Palavra {i} fora de 64 bits")
+            mask |= word << (i * WORD_BITS)
+        return mask
+
+    def is_valid_words(self, words: Sequence[int]) -> bool:
+        """
+        Validação palavra a palavra para quem já transporta a máscara em words
+        (protocolos binários, extensão nativa): além da adjacência interna,
+        o bit 63 de uma palavra não pode coexistir com o bit 0 da seguinte.
+        """
+        if len(words) != self.words:
+            return False
+        carry = 0
+        for word in words:
+            if word < 0 or word > WORD_MASK:
+                return False
+            if (word & (word >> 1)) or (carry and (word & 1)):
+                return False
+            carry = word >> (WORD_BITS - 1)
+        return True
+
+    def __repr__(self) -> str:
+        return f"FixedWidthMask({self.width})"
+
+
+MASK64 = FixedWidthMask(64)
+MASK128 = FixedWidthMask(128)
+MASK256 = FixedWidthMask(256)
+
+_FORMATS = {fmt.width: fmt for fmt in (MASK64, MASK128, MASK256)}
+
+
+def mask_format(width: int) -> FixedWidthMask:
+    try:
+        return _FORMATS[width]
+    except KeyError:
+        raise ValueError(f"Largura de máscara não suportada: {width} (use {SUPPORTED_WIDTHS})") from None
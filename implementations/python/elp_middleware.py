@@ -1,84 +1,300 @@
+"""
+Middleware ELP-Ω em ASGI puro.
+
+Não importa FastAPI nem Starlette: serve diretamente qualquer app ASGI
+(Starlette, FastAPI, Quart, ...) e continua a ser registado com
+`app.add_middleware(ElpOmegaMiddleware, ...)`. O arranque a frio paga só a
+biblioteca padrão e o core do ELP.
+"""
 import time
-import hmac
 import random
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
-# Ajuste o import conforme sua estrutura de pastas
-from elp_omega import EntangledLogicOmegaV5
-
-class ElpOmegaMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, secret_key: str):
-        super().__init__(app)
-        self.security_engine = EntangledLogicOmegaV5(secret=secret_key.encode())
-
-    async def dispatch(self, request: Request, call_next):
-        # 1. Extração
-        mask = int(request.headers.get("X-ELP-Mask", -1))
-        seal = request.headers.get("X-ELP-Seal", "")
-        timestamp = int(request.headers.get("X-ELP-Timestamp", 0))
-        nonce = request.headers.get("X-ELP-Nonce", "")
-        path = request.url.path
-        context = request.method 
-        
-        # Variável de decisão
-        is_shadow_candidate = False
-
-        # 2. Validações em Cascata (Fail Fast vs Fail Silent)
-        
-        # A. Validação Zeckendorf (Topológica)
-        if not self.security_engine.is_valid_zeckendorf_mask(mask):
-            is_shadow_candidate = True
-        
-        # B. Validação Timestamp (Freshness - 5 min tolerance)
-        now_ms = int(time.time() * 1000)
-        if not is_shadow_candidate:
-             # Tolerância ajustada para 5 minutos (300000ms)
-             if abs(now_ms - timestamp) > 300000: 
-                 is_shadow_candidate = True
-
-        # C. Validação HMAC (Integridade)
-        if not is_shadow_candidate:
-            expected_seal = self.security_engine.compute_seal(mask, context, timestamp, path, nonce)
-            # compare_digest evita Timing Attacks na comparação de strings
-            if not hmac.compare_digest(seal, expected_seal):
-                is_shadow_candidate = True
-
-        # D. Validação Nonce (Anti-Replay)
-        if not is_shadow_candidate:
-            if nonce in self.security_engine._used_nonces:
-                is_shadow_candidate = True
+from elp_omega import EntangledLogicOmegaV5, Reality
+from elp_guard import BodyDigest, ConfigSnapshot, ElpGuard, json_body, mirror_body
+from elp_events import Span, Stage
+from elp_timerwheel import TimerWheel
+
+# Headers lidos pelo middleware (nomes ASGI: bytes em minúsculas)
+_ELP_HEADERS = {b"x-elp-mask": "mask", b"x-elp-seal": "seal",
+                b"x-elp-timestamp": "timestamp", b"x-elp-nonce": "nonce",
+                b"x-elp-body-digest": "body_digest"}
+
+_DISCONNECT = {"type": "http.disconnect"}
+
+
+def _elp_headers(scope) -> dict:
+    """Só os headers X-ELP-*; o primeiro valor de cada um vence (como em Request.headers.get)."""
+    found = {}
+    for name, value in scope.get("headers", ()):
+        key = _ELP_HEADERS.get(name.lower())
+        if key is not None and key not in found:
+            found[key] = value.decode("latin-1")
+    return found
+
+
+def _digest_receive(receive, digest: BodyDigest):
+    """
+    `receive` que alimenta o SHA-256 com cada chunk a caminho da app (sem
+    buffer nem cópia). Se o digest não confere, o último chunk não é entregue:
+    para a app o cliente desligou e o corpo adulterado nunca chega inteiro.
+    """
+    async def wrapped():
+        if digest.verdict is False:
+            return _DISCONNECT
+        message = await receive()
+        if message["type"] == "http.request" and digest.verdict is None:
+            digest.update(message.get("body", b""))
+            if not message.get("more_body", False) and not digest.finish():
+                return _DISCONNECT
+        return message
+    return wrapped
+
+
+class _VerdictSend:
+    """`send` da app que deixa de transmitir assim que o veredicto do corpo é negativo."""
+    __slots__ = ("send", "digest", "started")
+
+    def __init__(self, send, digest: BodyDigest):
+        self.send = send
+        self.digest = digest
+        self.started = False
+
+    async def __call__(self, message) -> None:
+        if self.digest.verdict is False:
+            return
+        if message["type"] == "http.response.start":
+            self.started = True
+        await self.send(message)
+
+
+async def _send_json(send, body: bytes, status: int = 200) -> None:
+    # NÃO incluímos headers reveladores.
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-length", str(len(body)).encode()), (b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class ElpOmegaMiddleware:
+    def __init__(self, app, secret_key: str = None, route_authorizer=None, mask_width: int = 64,
+                 engine: EntangledLogicOmegaV5 = None, offloader=None, event_log=None,
+                 drift_estimator=None, shaper=None, timer_wheel=None, route_policies=None, capture=None,
+                 hot_config=None, tracer=None):
+        self.app = app
+        # Offload adaptativo de HMAC/Shadow (elp_offload.AdaptiveOffloader), opcional
+        self.offloader = offloader
+        # Log de eventos de segurança (elp_events.EventLog), opcional e não-bloqueante
+        self.event_log = event_log
+        # Trace amostrado para simulação offline (elp_trace.TraceCapture), opcional
+        self.capture = capture
+        # Spans por estágio em 1 de cada N pedidos (elp_profile.StageTracer), opcional
+        self.tracer = tracer
+        # Jitter da Shadow em baldes de 1 ms com um único timer no loop (elp_timerwheel)
+        self.timer_wheel = timer_wheel if timer_wheel is not None else TimerWheel()
+        # Modelagem de taxa por fingerprint (elp_shaper.GcraShaper), opcional: acima da taxa
+        # o pedido recebe uma Shadow de cache antes de qualquer parsing ou HMAC
+        self.shaper = shaper
+        if shaper is not None:
+            from elp_shaper import CoalescedDelay
+            self._cheap_delay = CoalescedDelay()
+        # Reconfiguração a quente (elp_config.HotConfig): cada troca chega por install()
+        if hot_config is not None:
+            hot_config.subscribe(self.install)
+            return
+        # Um engine pronto (ex.: montado pelo runner pre-fork com estado partilhado) tem precedência
+        if engine is None:
+            engine = EntangledLogicOmegaV5(secret=secret_key.encode(), mask_width=mask_width)
+        # Cascata de validação partilhada com o adaptador WSGI (autorização por rota, drift e
+        # políticas por rota opcionais)
+        self.install(ConfigSnapshot(0, None, engine, ElpGuard(engine, route_authorizer, drift_estimator,
+                                                              route_policies)))
+
+    def install(self, snapshot: ConfigSnapshot) -> None:
+        """
+        Publica um snapshot de configuração. Cada pedido lê `self.snapshot` uma
+        única vez à entrada, por isso os pedidos em curso terminam no anterior.
+        """
+        engine = snapshot.engine
+        if self.offloader is not None:
+            self.offloader.rebind(engine)
+        if self.capture is not None:
+            self.capture.bind(engine)
+        if self.shaper is not None:
+            from elp_shaper import CheapShadowCache
+            # Cache nova: corpos do template/semente anteriores não sobrevivem à troca
+            self._cheap_shadow = CheapShadowCache(engine)
+        self.snapshot = snapshot
+
+    @property
+    def security_engine(self) -> EntangledLogicOmegaV5:
+        return self.snapshot.engine
+
+    @property
+    def guard(self) -> ElpGuard:
+        return self.snapshot.guard
+
+    def _fingerprint(self, scope) -> str:
+        """Identidade do cliente para logs e estatísticas (sobrescreva para usar headers do proxy)."""
+        client = scope.get("client")
+        return client[0] if client else ""
+
+    async def __call__(self, scope, receive, send):
+        # lifespan e websocket passam direto: o protocolo só protege pedidos HTTP
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Uma única leitura: o pedido inteiro corre sobre este snapshot, mesmo que outro seja publicado
+        snapshot = self.snapshot
+        guard, engine = snapshot.guard, snapshot.engine
+        # Rotas em bypass (health checks, estáticos) não pagam nada da cascata
+        policy = guard.policy(scope["path"])
+        if policy.bypass:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        spans = self.tracer.begin() if self.tracer is not None else None
+        fingerprint = self._fingerprint(scope)
+        if self.shaper is not None and not self.shaper.allow(fingerprint):
+            await self._cheap_delay.wait()
+            if spans is not None:
+                spans.mark(Span.JITTER)
+            await _send_json(send, self._cheap_shadow.body(scope["method"], scope["path"],
+                                                           template=policy.shadow_template))
+            if spans is not None:
+                spans.mark(Span.CHEAP)
+                self.tracer.end(spans, Reality.SHADOW, Stage.RATE, scope["method"], scope["path"])
+            self._emit(Reality.SHADOW, Stage.RATE, scope, fingerprint, started)
+            return
+        check = guard.precheck(scope["method"], scope["path"], _elp_headers(scope), fingerprint, policy=policy)
+        if spans is not None:
+            spans.mark(Span.PARSE)
+
+        # C. Validação HMAC (Integridade): o único passo que pode sair do event loop
+        seal_ok = False
+        if check.failed_stage is None:
+            # Aceita a chave atual e as anteriores (rotação sem janela de falhas)
+            if self.offloader is not None:
+                seal_ok = await self.offloader.verify_seal(*check.seal_args(), engine=engine)
+            else:
+                seal_ok = engine.verify_seal(*check.seal_args())
+            if spans is not None:
+                spans.mark(Span.SEAL)
+        reality, stage = guard.finish(check, seal_ok)
+        if spans is not None:
+            spans.mark(Span.NONCE)
+
+        if reality == Reality.SHADOW:
+            await self._serve_shadow_reality(send, check.method, check.path, check.nonce, policy.shadow_template,
+                                             engine, spans)
+        elif check.body_digest is not None:
+            # Corpo vinculado ao selo: o veredicto final só existe quando a app acabar de o ler
+            reality, stage = await self._serve_bound_body(scope, receive, send, check, reality, stage, engine)
+        elif reality == Reality.MIRROR:
+            await self._serve_mirror_reality(scope, receive, send, check.method, check.path, check.nonce,
+                                             policy.shadow_template, engine)
+        else:
+            # 4. Prime Reality (Acesso Concedido)
+            # O processamento real acontece aqui
+            await self.app(scope, receive, send)
+        if spans is not None:
+            if reality != Reality.SHADOW or stage == Stage.BODY:
+                spans.mark(Span.APP)
+            self.tracer.end(spans, reality, stage, check.method, check.path)
+        self._emit(reality, stage, scope, fingerprint, started, check, seal_ok if check.failed_stage is None else None)
+
+    async def _serve_bound_body(self, scope, receive, send, check, reality, stage, engine=None):
+        """
+        PRIME/MIRROR com X-ELP-Body-Digest: o corpo é conferido em streaming
+        (memória constante). Se não confere, a app recebe http.disconnect no
+        lugar do último chunk, a sua resposta é descartada e o cliente recebe
+        a Shadow (ou o fim da resposta, se a app já a tinha começado).
+        """
+        digest = BodyDigest(check.body_digest)
+        app_send = _VerdictSend(send, digest)
+        template = check.policy.shadow_template
+        try:
+            if reality == Reality.MIRROR:
+                await self._serve_mirror_reality(scope, _digest_receive(receive, digest), app_send,
+                                                 check.method, check.path, check.nonce, template, engine)
             else:
-                # Armazena o nonce (Em produção, use Redis com TTL)
-                self.security_engine._used_nonces[nonce] = now_ms
+                await self.app(scope, _digest_receive(receive, digest), app_send)
+        except Exception:
+            # A app pode reagir ao http.disconnect com uma exceção (ex.: ClientDisconnect)
+            if digest.verdict is not False:
+                raise
+        if digest.verdict is not False:
+            return reality, stage
+        if app_send.started:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            await self._serve_shadow_reality(send, check.method, check.path, check.nonce, template, engine)
+        return Reality.SHADOW, Stage.BODY
 
-        # 3. Decisão de Realidade
-        if is_shadow_candidate:
-            return self._serve_shadow_reality(context, path, nonce)
+    async def _serve_mirror_reality(self, scope, receive, send, context, path, nonce, template="banking",
+                                    engine=None):
+        """
+        Entrega a resposta real com o conteúdo mascarado (generate_mirror).
+        Respostas não-JSON não podem ser mascaradas com segurança: seguem para a Shadow.
+        """
+        start = {}
+        chunks = []
 
-        # 4. Prime Reality (Acesso Concedido)
-        # O processamento real acontece aqui
-        response = await call_next(request)
-        return response
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
 
-    def _serve_shadow_reality(self, context, path, nonce):
+        await self.app(scope, receive, capture)
+        content_type = dict(start.get("headers", ())).get(b"content-type", b"").decode("latin-1")
+        body = mirror_body(engine or self.snapshot.engine, content_type, b"".join(chunks))
+        if body is None:
+            return await self._serve_shadow_reality(send, context, path, nonce, template, engine)
+        await _send_json(send, body, start.get("status", 200))
+
+    def _emit(self, reality, stage, scope, fingerprint, started, check=None, seal_ok=None):
+        if self.event_log is None and self.capture is None:
+            return
+        latency_ms = (time.perf_counter() - started) * 1000
+        if self.event_log is not None:
+            self.event_log.emit(reality, stage, fingerprint, scope["method"], scope["path"], latency_ms)
+        if self.capture is not None and self.capture.sample(fingerprint):
+            if check is None:
+                # Nível de taxa: headers crus, sem precheck nem HMAC no caminho do pedido
+                self.capture.record_rate_limited(fingerprint, scope["method"], scope["path"], _elp_headers(scope),
+                                                 reality, stage, latency_ms)
+            else:
+                self.capture.record(check, seal_ok, reality, stage, latency_ms)
+
+    async def _serve_shadow_reality(self, send, context, path, nonce, template="banking", engine=None, spans=None):
         """
         Entrega a realidade simulada.
         O objetivo é imitar o tempo de resposta da Prime Reality (que agora tem um sleep de 10-50ms).
         """
         # Gera o payload falso mas realista (Bancário)
-        shadow_payload = self.security_engine.generate_shadow("STRUCT", context, path, nonce)
-        
+        engine = engine or self.snapshot.engine
+        if self.offloader is not None:
+            shadow_payload = await self.offloader.generate_shadow(context, path, nonce, template, engine)
+        else:
+            shadow_payload = engine.generate_shadow("STRUCT", context, path, nonce, template)
+        if spans is not None:
+            spans.mark(Span.SHADOW)
+
         # JITTERING ESTRATÉGICO:
         # A Prime Reality demora entre 10ms e 50ms (simulado no endpoint).
         # A Shadow Reality deve demorar algo parecido para ser indistinguível.
         # Vamos configurar para 15ms a 60ms.
-        latency = random.uniform(0.015, 0.060) 
-        time.sleep(latency)
+        # O atraso não pode bloquear o event loop dos demais pedidos; a roda de
+        # temporização agrupa as conexões em espera em vez de um timer por conexão.
+        latency = random.uniform(0.015, 0.060)
+        await self.timer_wheel.sleep(latency)
+        if spans is not None:
+            spans.mark(Span.JITTER)
 
         # Retorna 200 OK.
-        # NÃO incluímos headers reveladores.
-        return JSONResponse(
-            content=shadow_payload,
-            status_code=200
-        )
\ No newline at end of file
+        body = json_body(shadow_payload)
+        if spans is not None:
+            spans.mark(Span.JSON)
+        await _send_json(send, body)
+        if spans is not None:
+            spans.mark(Span.SEND)
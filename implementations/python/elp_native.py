@@ -0,0 +1,75 @@
+"""
+Aceleração Nativa Opcional (extensão `_elp_native`, compilada a partir do crate Rust).
+
+    cd implementations/rust && maturin develop --release
+
+Sem a extensão (ou com ELP_NATIVE=0) tudo corre nas implementações Python
+deste módulo, que são a referência: a extensão tem de produzir exatamente
+os mesmos selos, as mesmas sementes da Shadow e a mesma semântica de
+nonces (test_elp_native.py compara as duas quando a extensão existe).
+"""
+import hashlib
+import hmac
+import os
+
+try:
+    import _elp_native
+except ImportError:
+    _elp_native = None
+
+AVAILABLE = _elp_native is not None and os.environ.get("ELP_NATIVE", "1") != "0"
+
+# A extensão trabalha com máscaras até 128 bits; 256 fica sempre no Python
+NATIVE_MAX_MASK_WIDTH = 128
+
+
+class PySealer:
+    """HMAC-SHA256 em hexdigest com a chave atual; verificação contra atual + anteriores."""
+
+    def __init__(self, secrets):
+        self.secrets = tuple(secrets)
+
+    def compute(self, payload: str) -> str:
+        return hmac.new(self.secrets[0], payload.encode(), hashlib.sha256).hexdigest()
+
+    def verify(self, seal: str, payload: str) -> bool:
+        data = payload.encode()
+        for secret in self.secrets:
+            expected = hmac.new(secret, data, hashlib.sha256).hexdigest()
+            # compare_digest evita Timing Attacks na comparação de strings
+            if hmac.compare_digest(seal, expected):
+                return True
+        return False
+
+
+def py_shadow_seed(seed_str: str) -> int:
+    return int(hashlib.sha256(seed_str.encode()).hexdigest(), 16) % (10**8)
+
+
+def py_entity_seed(seed_str: str) -> int:
+    return int.from_bytes(hashlib.sha256(seed_str.encode()).digest()[:8], "big")
+
+
+def sealer(secrets, native: bool = AVAILABLE):
+    return _elp_native.Sealer(list(secrets)) if native else PySealer(secrets)
+
+
+def shadow_seed_fn(native: bool = AVAILABLE):
+    return _elp_native.shadow_seed if native else py_shadow_seed
+
+
+def entity_seed_fn(native: bool = AVAILABLE):
+    return _elp_native.entity_seed if native else py_entity_seed
+
+
+def mask_validator(mask_format, native: bool = AVAILABLE):
+    """Função mask -> bool; nativa só quando a largura cabe na extensão."""
+    if native and mask_format.width <= NATIVE_MAX_MASK_WIDTH:
+        max_value, check = mask_format.max_value, _elp_native.is_valid_mask
+        return lambda mask: check(mask, max_value)
+    return mask_format.is_valid
+
+
+def nonce_table(max_age_ms: int):
+    """Tabela de nonces nativa (expiração por nonce, lanes de TTL, Mutex interno)."""
+    return _elp_native.NonceTable(max_age_ms)
@@ -0,0 +1,170 @@
+"""
+Snapshot Persistente de Nonces (arranque a quente sem janela de Replay).
+
+Quando um worker reinicia, os nonces em memória perdem-se e tudo o que foi
+visto nos últimos `max_age_ms` volta a ser reutilizável. O store é gravado
+periodicamente num ficheiro compacto (digests de 16 bytes ordenados + expiração)
+e, no arranque, esse ficheiro é mapeado com mmap: não há desserialização, a
+consulta é uma busca binária directamente sobre as páginas do ficheiro.
+
+Formato: b"ELPN\\x01" + u32 contagem + u64 maior expiração + registos <16sq> ordenados pelo digest.
+"""
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+logger = logging.getLogger("elp_omega.nonce_snapshot")
+
+MAGIC = b"ELPN\x01"
+_HEADER = struct.Struct("<5sIq")
+_RECORD = struct.Struct("<16sq")
+
+
+def write_snapshot(entries: Iterable[Tuple[bytes, int]], path: str) -> int:
+    """Grava atomicamente (tmp + fsync + rename); devolve o número de registos."""
+    pack = _RECORD.pack
+    max_expiry = 0
+    records = []
+    for digest, expiry in entries:
+        records.append(pack(digest, expiry))
+        if expiry > max_expiry:
+            max_expiry = expiry
+    # O digest abre cada registo: ordenar os bytes é ordenar pelo digest (memcmp, sem tuplas)
+    records.sort()
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".elp-nonces-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(_HEADER.pack(MAGIC, len(records), max_expiry))
+            fh.write(b"".join(records))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return len(records)
+
+
+class NonceSnapshot:
+    """Visão só-de-leitura, memory-mapped, de um snapshot gravado por `write_snapshot`."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            size = os.fstat(fh.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"Snapshot truncado: {path}")
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.max_expiry = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or size < _HEADER.size + self.count * _RECORD.size:
+            self._mm.close()
+            raise ValueError(f"Snapshot inválido: {path}")
+
+    @classmethod
+    def open(cls, path: str, now_ms: int) -> Optional["NonceSnapshot"]:
+        """Carrega se existir, for válido e ainda cobrir algum nonce vivo; senão None."""
+        try:
+            snapshot = cls(path)
+        except (OSError, ValueError):
+            return None
+        if snapshot.max_expiry <= now_ms:
+            snapshot.close()
+            return None
+        return snapshot
+
+    def contains(self, digest: bytes, now_ms: int) -> bool:
+        mm, lo, hi = self._mm, 0, self.count
+        base, size = _HEADER.size, _RECORD.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = base + mid * size
+            key = mm[offset:offset + 16]
+            if key < digest:
+                lo = mid + 1
+            elif key > digest:
+                hi = mid
+            else:
+                _, expiry = _RECORD.unpack_from(mm, offset)
+                return expiry > now_ms
+        return False
+
+    def live_entries(self, now_ms: int):
+        """Registos ainda válidos; entram no próximo snapshot para sobreviver a reinícios seguidos."""
+        if self._mm.closed:
+            return []
+        end = _HEADER.size + self.count * _RECORD.size
+        return [(d, exp) for d, exp in _RECORD.iter_unpack(self._mm[_HEADER.size:end]) if exp > now_ms]
+
+    def close(self) -> None:
+        if not self._mm.closed:
+            self._mm.close()
+
+
+def load_into(store, path: str, now_ms: Optional[int] = None) -> Optional[NonceSnapshot]:
+    """Anexa o snapshot ao store (NonceStore ou SharedNonceTable), se houver um utilizável."""
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    snapshot = NonceSnapshot.open(path, now_ms)
+    if snapshot is not None:
+        store.attach_snapshot(snapshot)
+    return snapshot
+
+
+class NonceSnapshotter:
+    """
+    Thread que grava o store a cada `interval` s e uma última vez no `close()`.
+    Nonces aceites entre o último snapshot e um crash não são cobertos:
+    `interval` é o limite superior dessa lacuna. Cada gravação custa ~2-3 µs
+    por nonce vivo (digest + ordenação), fora do caminho de requisição.
+    """
+
+    def __init__(self, store, path: str, interval: float = 10.0):
+        self.store = store
+        self.path = path
+        self.interval = interval
+        self.snapshots = 0
+        self.last_count = 0
+        self.last_duration_ms = 0.0
+        self.write_errors = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "NonceSnapshotter":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="elp-nonce-snapshot", daemon=True)
+            self._thread.start()
+        return self
+
+    def snapshot_now(self, now_ms: Optional[int] = None) -> int:
+        started = time.perf_counter()
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        self.last_count = write_snapshot(self.store.live_entries(now_ms), self.path)
+        self.last_duration_ms = (time.perf_counter() - started) * 1000
+        self.snapshots += 1
+        return self.last_count
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.snapshot_now()
+            except Exception:
+                # Disco cheio, mmap fechado numa troca do store...: mantém o snapshot
+                # anterior e a próxima volta tenta de novo, com o erro visível em stats()
+                self.write_errors += 1
+                logger.exception("Snapshot de nonces falhou (%s)", self.path)
+
+    def stats(self) -> dict:
+        return {"snapshots": self.snapshots, "last_count": self.last_count,
+                "last_duration_ms": round(self.last_duration_ms, 3), "write_errors": self.write_errors}
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.snapshot_now()
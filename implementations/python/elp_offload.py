@@ -0,0 +1,232 @@
+"""
+Offload Adaptativo de HMAC e Shadow Reality.
+
+Em QPS alto, `verify_seal` e `generate_shadow` executados inline no event loop
+atrasam todo o I/O do worker. Este módulo mede o atraso do loop (loop lag) e,
+só quando ele ultrapassa um limiar, agrupa as operações pendentes em lotes e
+despacha-as para um pool de threads (selos) ou de processos (shadows).
+
+Abaixo do limiar tudo continua inline: para cargas normais o custo de trocar
+de thread seria maior do que o próprio HMAC.
+"""
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from elp_omega import EntangledLogicOmegaV5
+
+
+class LoopLagMonitor:
+    """Agenda um tick a cada `interval` s e mede quanto o loop acordou atrasado."""
+
+    def __init__(self, interval: float = 0.05, alpha: float = 0.2):
+        self.interval = interval
+        self.alpha = alpha
+        self.last_ms = 0.0
+        self.ewma_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def ensure_started(self) -> None:
+        """Chamado dentro de uma corrotina: inicia a sonda no loop corrente uma única vez."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._probe())
+
+    async def _probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - started - self.interval) * 1000)
+            self.last_ms = lag_ms
+            self.ewma_ms += self.alpha * (lag_ms - self.ewma_ms)
+            self.max_ms = max(self.max_ms, lag_ms)
+            self.samples += 1
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "lag_ms": round(self.last_ms, 3),
+            "lag_ewma_ms": round(self.ewma_ms, 3),
+            "lag_max_ms": round(self.max_ms, 3),
+            "samples": self.samples,
+        }
+
+
+class _Batcher:
+    """Acumula itens durante uma volta do loop e envia o lote inteiro ao executor numa única submissão."""
+
+    def __init__(self, executor: Executor, run_batch: Callable[[List[tuple]], list], max_batch: int):
+        self.executor = executor
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.batches = 0
+        self.items = 0
+        self._pending: List[tuple] = []
+        self._futures: List[asyncio.Future] = []
+
+    def submit(self, item: tuple) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending:
+            loop.call_soon(self._flush)
+        self._pending.append(item)
+        self._futures.append(future)
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        return future
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        items, futures = self._pending, self._futures
+        self._pending, self._futures = [], []
+        self.batches += 1
+        self.items += len(items)
+        done = asyncio.get_running_loop().run_in_executor(self.executor, self.run_batch, items)
+        done.add_done_callback(lambda fut: self._resolve(fut, futures))
+
+    @staticmethod
+    def _resolve(done: asyncio.Future, futures: List[asyncio.Future]) -> None:
+        if done.cancelled() or done.exception() is not None:
+            error = done.exception() if not done.cancelled() else asyncio.CancelledError()
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, result in zip(futures, done.result()):
+            if not future.done():
+                future.set_result(result)
+
+
+# --- Execução em processos: o engine é reconstruído uma vez por processo filho ---
+
+_process_engine: Optional[EntangledLogicOmegaV5] = None
+
+
+def _init_shadow_process(secret: bytes, shadow_templates: dict, shadow_seed: bytes = None) -> None:
+    global _process_engine
+    _process_engine = EntangledLogicOmegaV5(secret, shadow_templates=shadow_templates, shadow_seed=shadow_seed)
+
+
+def _shadow_batch_in_process(items: List[tuple]) -> list:
+    return [_process_engine.generate_shadow("STRUCT", *item) for item in items]
+
+
+class AdaptiveOffloader:
+    """
+    Decide por requisição entre execução inline e em lote num executor.
+
+    Nota: para payloads curtos o hashlib não liberta o GIL, por isso o pool de
+    threads serve sobretudo para devolver fatias de tempo ao I/O do loop; o
+    paralelismo real de CPU vem do pool de processos (`shadow_processes`).
+    """
+
+    def __init__(self, engine: Optional[EntangledLogicOmegaV5] = None, lag_threshold_ms: float = 20.0,
+                 max_threads: int = 4, shadow_processes: int = 0, max_batch: int = 64,
+                 monitor: Optional[LoopLagMonitor] = None):
+        self.lag_threshold_ms = lag_threshold_ms
+        self.max_threads = max_threads
+        self.shadow_processes = shadow_processes
+        self.max_batch = max_batch
+        self.monitor = monitor or LoopLagMonitor()
+        self.inline = 0
+        self.offloaded = 0
+        self.engine = None
+        if engine is not None:
+            self.bind(engine)
+
+    def bind(self, engine: EntangledLogicOmegaV5) -> "AdaptiveOffloader":
+        """Associa o engine (o middleware faz isto quando o offloader é criado sem engine)."""
+        self.engine = engine
+        self._threads = ThreadPoolExecutor(self.max_threads, thread_name_prefix="elp-offload")
+        self._seals = _Batcher(self._threads, self._verify_batch, self.max_batch)
+        self._processes = None
+        self._start_shadows(engine)
+        return self
+
+    def _start_shadows(self, engine: EntangledLogicOmegaV5) -> None:
+        if self.shadow_processes:
+            self._processes = ProcessPoolExecutor(
+                self.shadow_processes, initializer=_init_shadow_process,
+                initargs=(engine.secret, engine.shadow_templates, engine.shadow_seed),
+            )
+            self._shadows = _Batcher(self._processes, _shadow_batch_in_process, self.max_batch)
+        else:
+            self._shadows = _Batcher(self._threads, self._shadow_batch, self.max_batch)
+
+    def rebind(self, engine: EntangledLogicOmegaV5) -> None:
+        """
+        Troca de engine em funcionamento (reconfiguração a quente). Os lotes já
+        submetidos terminam no engine anterior; os processos de shadows, que
+        copiaram segredo e templates no arranque, são substituídos por um pool novo.
+        """
+        if self.engine is None:
+            self.bind(engine)
+            return
+        if engine is self.engine:
+            return
+        old = self._processes
+        self.engine = engine
+        if old is not None:
+            self._start_shadows(engine)
+            old.shutdown(wait=False)
+
+    @property
+    def active(self) -> bool:
+        self.monitor.ensure_started()
+        return self.monitor.ewma_ms >= self.lag_threshold_ms
+
+    @staticmethod
+    def _verify_batch(items: List[tuple]) -> list:
+        # Cada item leva o engine do snapshot em que o pedido entrou
+        return [engine.verify_seal(*args) for engine, args in items]
+
+    @staticmethod
+    def _shadow_batch(items: List[tuple]) -> list:
+        return [engine.generate_shadow("STRUCT", *args) for engine, args in items]
+
+    async def verify_seal(self, seal: str, mask: int, context: str, timestamp: int, path: str, nonce: str,
+                          body_digest: str = None, engine: Optional[EntangledLogicOmegaV5] = None) -> bool:
+        engine = engine or self.engine
+        if not self.active:
+            self.inline += 1
+            return engine.verify_seal(seal, mask, context, timestamp, path, nonce, body_digest)
+        self.offloaded += 1
+        return await self._seals.submit((engine, (seal, mask, context, timestamp, path, nonce, body_digest)))
+
+    async def generate_shadow(self, context: str, path: str, nonce: str, template: str = "banking",
+                              engine: Optional[EntangledLogicOmegaV5] = None) -> dict:
+        engine = engine or self.engine
+        if not self.active:
+            self.inline += 1
+            return engine.generate_shadow("STRUCT", context, path, nonce, template)
+        self.offloaded += 1
+        if self._processes is not None:
+            return await self._shadows.submit((context, path, nonce, template))
+        return await self._shadows.submit((engine, (context, path, nonce, template)))
+
+    def telemetry(self) -> dict:
+        """Métricas para afinar `lag_threshold_ms`."""
+        batches = self._seals.batches + self._shadows.batches
+        items = self._seals.items + self._shadows.items
+        return {
+            **self.monitor.snapshot(),
+            "threshold_ms": self.lag_threshold_ms,
+            "active": self.monitor.ewma_ms >= self.lag_threshold_ms,
+            "inline": self.inline,
+            "offloaded": self.offloaded,
+            "batches": batches,
+            "avg_batch": round(items / batches, 2) if batches else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        self.monitor.stop()
+        self._threads.shutdown(wait=False)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False)
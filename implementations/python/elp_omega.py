@@ -1,8 +1,20 @@
+"""
+Core do ELP-Ω: só biblioteca padrão.
+
+Os adaptadores de framework são carregados sob demanda, na primeira vez que
+o atributo é lido (`from elp_omega import ElpOmegaMiddleware`): quem usa
+apenas o engine não paga o import de nenhum deles.
+"""
 import hashlib
-import hmac
+import importlib
 import time
 import random
-import uuid
+import re
+import threading
+from collections import deque
+import elp_native
+from elp_mask import mask_format
+from elp_shadow_world import ShadowWorld
 
 # Enumeração para clareza
 class Reality:
@@ -10,49 +22,313 @@ class Reality:
     MIRROR = "MIRROR"
     SHADOW = "SHADOW"
 
+# Formato dos payloads sintéticos. Cada template descreve apenas as partes
+# estáticas; os valores variáveis saem do RNG semeado pela requisição.
+DEFAULT_SHADOW_TEMPLATES = {
+    "banking": {
+        "account_types": ("checking", "savings", "investment"),
+        "balance_range": (1000.00, 500000.00),
+        "currency": "BRL",
+        "flags": ("verified", "secure"),
+        "region": "us-east-1",
+    },
+}
+
+_ALNUM = re.compile(r"[0-9A-Za-z]")
+
+# Nome público -> módulo do adaptador (ASGI serve Starlette/FastAPI e qualquer app ASGI)
+_ADAPTERS = {
+    "ElpOmegaMiddleware": "elp_middleware",
+    "ElpOmegaWSGIMiddleware": "elp_wsgi",
+}
+
+def __getattr__(name):
+    module = _ADAPTERS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
+
+def _uuid_str(value: int) -> str:
+    """Mesmo texto de str(uuid.UUID(int=value)), sem importar uuid (e platform) no arranque."""
+    h = "%032x" % value
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+def nonce_digest(nonce: str) -> bytes:
+    """Digest de 16 bytes usado pelas tabelas partilhadas e pelos snapshots de nonces."""
+    return hashlib.blake2b(nonce.encode(), digest_size=16).digest()
+
+class NonceStore:
+    """
+    Nonces vistos dentro da janela de frescor.
+
+    Cada nonce tem a sua própria expiração. As filas são separadas por faixa de
+    TTL (lanes de 30 s), para que nonces de vida longa não atrasem a limpeza dos
+    de vida curta. A limpeza só corre quando a expiração mais próxima já passou
+    (uma comparação por inserção no caso comum).
+    """
+    LANE_MS = 30000
+
+    def __init__(self, max_age_ms: int = 300000):
+        self.max_age_ms = max_age_ms
+        self._expiry = {}
+        self._lanes = {}
+        self._next_purge = float("inf")
+        # Snapshot do processo anterior (elp_nonce_snapshot.NonceSnapshot), só até a janela dele vencer
+        self._snapshot = None
+
+    def attach_snapshot(self, snapshot) -> None:
+        self._snapshot = snapshot
+
+    def _seen_before_restart(self, nonce: str, now_ms: int) -> bool:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return False
+        if now_ms >= snapshot.max_expiry:
+            # Janela do processo anterior encerrada: o snapshot deixa de custar qualquer coisa
+            self._snapshot = None
+            snapshot.close()
+            return False
+        return snapshot.contains(nonce_digest(nonce), now_ms)
+
+    def live_entries(self, now_ms: int):
+        """(digest, expiração) dos nonces ainda válidos, para snapshot."""
+        entries = [(nonce_digest(n), exp) for n, exp in list(self._expiry.items()) if exp > now_ms]
+        snapshot = self._snapshot
+        if snapshot is not None:
+            entries.extend(snapshot.live_entries(now_ms))
+        return entries
+
+    def __contains__(self, nonce: str) -> bool:
+        return nonce in self._expiry
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def add(self, nonce: str, now_ms: int, expiry_ms: int = None) -> bool:
+        """Registra o nonce até `expiry_ms` (padrão: agora + max_age). False se já visto (Replay)."""
+        if now_ms >= self._next_purge:
+            self.purge(now_ms)
+        if nonce in self._expiry or self._seen_before_restart(nonce, now_ms):
+            return False
+        if expiry_ms is None:
+            expiry_ms = now_ms + self.max_age_ms
+        self._expiry[nonce] = expiry_ms
+        lane = (expiry_ms - now_ms) // self.LANE_MS
+        queue = self._lanes.get(lane)
+        if queue is None:
+            queue = self._lanes[lane] = deque()
+        queue.append(nonce)
+        if expiry_ms < self._next_purge:
+            self._next_purge = expiry_ms
+        return True
+
+    def purge(self, now_ms: int) -> int:
+        expiry = self._expiry
+        removed = 0
+        next_purge = float("inf")
+        for lane, queue in list(self._lanes.items()):
+            while queue and expiry[queue[0]] <= now_ms:
+                del expiry[queue.popleft()]
+                removed += 1
+            if queue:
+                # Dentro de uma lane as expirações são quase monótonas: a cabeça dita a próxima limpeza
+                next_purge = min(next_purge, expiry[queue[0]])
+            else:
+                del self._lanes[lane]
+        self._next_purge = next_purge
+        return removed
+
+class _SharedSnapshotGate:
+    """Consulta ao snapshot do processo anterior para stores acedidos por várias threads."""
+    _snapshot = None
+
+    def attach_snapshot(self, snapshot) -> None:
+        self._snapshot = snapshot
+
+    def _seen_before_restart(self, nonce: str, now_ms: int) -> bool:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return False
+        if now_ms >= snapshot.max_expiry:
+            # Só larga a referência: outra thread pode estar a meio de uma consulta ao mmap
+            self._snapshot = None
+            return False
+        return snapshot.contains(nonce_digest(nonce), now_ms)
+
+class StripedNonceStore(_SharedSnapshotGate):
+    """
+    NonceStore seguro entre threads (WSGI com gunicorn threaded, CPython free-threaded).
+
+    O espaço de nonces é dividido em faixas, cada uma um NonceStore com o seu
+    próprio lock: threads só disputam o lock quando os nonces caem na mesma
+    faixa, e a limpeza de uma faixa nunca bloqueia as outras.
+    """
+
+    def __init__(self, max_age_ms: int = 300000, stripes: int = 16):
+        self.max_age_ms = max_age_ms
+        self.stripes = stripes
+        self._stores = [NonceStore(max_age_ms) for _ in range(stripes)]
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def add(self, nonce: str, now_ms: int, expiry_ms: int = None) -> bool:
+        if self._seen_before_restart(nonce, now_ms):
+            return False
+        stripe = hash(nonce) % self.stripes
+        with self._locks[stripe]:
+            return self._stores[stripe].add(nonce, now_ms, expiry_ms)
+
+    def live_entries(self, now_ms: int):
+        entries = []
+        for lock, store in zip(self._locks, self._stores):
+            with lock:
+                entries.extend(store.live_entries(now_ms))
+        snapshot = self._snapshot
+        if snapshot is not None:
+            entries.extend(snapshot.live_entries(now_ms))
+        return entries
+
+    def __contains__(self, nonce: str) -> bool:
+        return nonce in self._stores[hash(nonce) % self.stripes]
+
+    def __len__(self) -> int:
+        return sum(len(store) for store in self._stores)
+
+class NativeNonceStore(_SharedSnapshotGate):
+    """Mesma semântica do NonceStore sobre a tabela da extensão nativa (já segura entre threads)."""
+
+    def __init__(self, max_age_ms: int = 300000):
+        self.max_age_ms = max_age_ms
+        self._table = elp_native.nonce_table(max_age_ms)
+
+    def add(self, nonce: str, now_ms: int, expiry_ms: int = None) -> bool:
+        if self._seen_before_restart(nonce, now_ms):
+            return False
+        return self._table.add(nonce, now_ms, expiry_ms)
+
+    def purge(self, now_ms: int) -> int:
+        return self._table.purge(now_ms)
+
+    def live_entries(self, now_ms: int):
+        entries = [(nonce_digest(n), exp) for n, exp in self._table.live_items(now_ms)]
+        snapshot = self._snapshot
+        if snapshot is not None:
+            entries.extend(snapshot.live_entries(now_ms))
+        return entries
+
+    def __contains__(self, nonce: str) -> bool:
+        return nonce in self._table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
 class EntangledLogicOmegaV5:
-    def __init__(self, secret: bytes, max_age_ms: int = 300000):
+    def __init__(self, secret: bytes, max_age_ms: int = 300000, mask_width: int = 64,
+                 previous_secrets=(), nonce_store=None, shadow_templates=None, shadow_world=None,
+                 thread_safe: bool = False, native: bool = None, shadow_seed: bytes = None):
+        # native: None = usa a extensão _elp_native se estiver instalada (e ELP_NATIVE != 0)
+        if native is None:
+            native = elp_native.AVAILABLE
+        elif native and elp_native._elp_native is None:
+            raise ImportError("Extensão _elp_native não instalada (maturin develop em implementations/rust)")
+        self.native = native
         self.secret = secret
         self.max_age_ms = max_age_ms
-        self._used_nonces = {} # Em prod: usar Redis com TTL
-        self._lock = None # Simplificação para demo sem threading complexo
+        # Largura fixa (64/128/256): limita o custo de parsing e validação
+        self.mask_format = mask_format(mask_width)
+        self._mask_is_valid = elp_native.mask_validator(self.mask_format, native)
+        # Chaves anteriores continuam a validar selos durante a rotação
+        self.previous_secrets = tuple(previous_secrets)
+        self._sealer = elp_native.sealer((secret,) + self.previous_secrets, native)
+        self._shadow_seed = elp_native.shadow_seed_fn(native)
+        # Qualquer objeto com add(nonce, now_ms) -> bool (ex.: tabela partilhada entre processos)
+        # thread_safe: faixas com lock próprio (adaptador WSGI / servidores com threads);
+        # a tabela nativa já é segura entre threads
+        if nonce_store is None:
+            if native:
+                nonce_store = NativeNonceStore(max_age_ms)
+            else:
+                nonce_store = StripedNonceStore(max_age_ms) if thread_safe else NonceStore(max_age_ms)
+        self._used_nonces = nonce_store
+        self.shadow_templates = shadow_templates or DEFAULT_SHADOW_TEMPLATES
+        # STABILITY_SEED das shadows; por omissão o próprio segredo (trocar a semente muda o universo falso)
+        self.shadow_seed = secret if shadow_seed is None else shadow_seed
+        # Entidades falsas estáveis por recurso: repetir o scraping mostra sempre o mesmo universo
+        self.shadow_world = shadow_world or ShadowWorld(self.shadow_seed, self.shadow_templates,
+                                                        seed_fn=elp_native.entity_seed_fn(native))
 
     def is_valid_zeckendorf_mask(self, mask: int) -> bool:
-        """Validação Topológica O(1)"""
-        return (mask & (mask >> 1)) == 0
+        """Validação Topológica O(1) (limitada à largura da máscara)"""
+        return self._mask_is_valid(mask)
 
-    def compute_seal(self, mask: int, context: str, timestamp: int, path: str, nonce: str) -> str:
-        """Gera assinatura HMAC-SHA256"""
+    @staticmethod
+    def seal_payload(mask: int, context: str, timestamp: int, path: str, nonce: str, body_digest: str = None) -> str:
+        """`mask|context|timestamp|path|nonce`, mais `|body_digest` quando o cliente vincula o corpo."""
         payload = f"{mask}|{context}|{timestamp}|{path}|{nonce}"
-        return hmac.new(self.secret, payload.encode(), hashlib.sha256).hexdigest()
+        return f"{payload}|{body_digest}" if body_digest else payload
+
+    def compute_seal(self, mask: int, context: str, timestamp: int, path: str, nonce: str,
+                     body_digest: str = None) -> str:
+        """Gera assinatura HMAC-SHA256 (body_digest: hex SHA-256 do corpo, opcional)"""
+        return self._sealer.compute(self.seal_payload(mask, context, timestamp, path, nonce, body_digest))
 
-    def generate_shadow(self, real_data_structure: str, context: str, path: str, nonce: str) -> dict:
+    def verify_seal(self, seal: str, mask: int, context: str, timestamp: int, path: str, nonce: str,
+                    body_digest: str = None) -> bool:
+        """Compara em tempo constante contra a chave atual e as anteriores."""
+        return self._sealer.verify(seal, self.seal_payload(mask, context, timestamp, path, nonce, body_digest))
+
+    def consume_nonce(self, nonce: str, now_ms: int, expiry_ms: int = None) -> bool:
+        """
+        Anti-Replay: True se o nonce é inédito (e passa a ficar registado).
+        `expiry_ms` deve cobrir o último instante em que o timestamp do pedido
+        ainda seria aceite (ex.: timestamp + max_age_ms).
+        """
+        return self._used_nonces.add(nonce, now_ms, expiry_ms)
+
+    def generate_mirror(self, data):
+        """
+        Mirror Reality: mesma estrutura, conteúdo mascarado.
+        Strings mantêm só os 4 últimos caracteres alfanuméricos (ex: ***-**-1234);
+        números viram 0 do mesmo tipo.
+        """
+        if isinstance(data, dict):
+            return {key: self.generate_mirror(value) for key, value in data.items()}
+        if isinstance(data, list):
+            return [self.generate_mirror(value) for value in data]
+        if isinstance(data, bool) or data is None:
+            return data
+        if isinstance(data, (int, float)):
+            return type(data)(0)
+        if isinstance(data, str):
+            positions = [m.start() for m in _ALNUM.finditer(data)]
+            # Até 4 caracteres não há o que preservar sem revelar tudo
+            hidden = set(positions[:-4] if len(positions) > 4 else positions)
+            return "".join("*" if i in hidden else ch for i, ch in enumerate(data))
+        return data
+
+    def generate_shadow(self, real_data_structure: str, context: str, path: str, nonce: str,
+                        template: str = "banking") -> dict:
         """
         Gera um Payload Sintético Indistinguível do Real.
-        Usa o nonce e o path como semente para garantir determinismo:
-        Mesma entrada = Mesma mentira.
+        Os dados da entidade vêm do ShadowWorld (mesmo recurso = mesma mentira,
+        qualquer que seja o nonce); só os campos por-pedido usam o nonce como semente.
         """
         # Cria uma semente determinística baseada na requisição do atacante
-        seed_str = f"{path}|{context}|{nonce}|{self.secret}"
-        seed_int = int(hashlib.sha256(seed_str.encode()).hexdigest(), 16) % (10**8)
-        
+        seed_int = self._shadow_seed(f"{path}|{context}|{nonce}|{self.shadow_seed}")
+
         # Configura o gerador aleatório com essa semente
         rng = random.Random(seed_int)
+        shape = self.shadow_templates[template]
+        entity = self.shadow_world.entity(path, template)
 
         # Gera dados que PARECEM reais (sem marcadores 'SHADOW')
         # Simula uma estrutura de resposta financeira padrão
         return {
             "status": "success",
-            "transaction_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "transaction_id": _uuid_str(rng.getrandbits(128)),
             "timestamp": int(time.time() * 1000),
-            "data": {
-                "account_type": rng.choice(["checking", "savings", "investment"]),
-                "balance": round(rng.uniform(1000.00, 500000.00), 2),
-                "currency": "BRL",
-                "flags": ["verified", "secure"]
-            },
+            "data": entity,
             "meta": {
                 "processing_time_ms": rng.randint(10, 150),
-                "region": "us-east-1"
+                "region": shape["region"]
             }
         }
\ No newline at end of file
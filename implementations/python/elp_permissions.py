@@ -0,0 +1,138 @@
+"""
+Codec de Permissões Zeckendorf e Índice de Autorização por Rota.
+
+Cada permissão ocupa um bit de Fibonacci. Como os bits do mapeamento nunca
+são adjacentes, qualquer combinação de permissões gera uma máscara válida
+pela restrição de Zeckendorf `(M & (M >> 1)) == 0`.
+
+A autorização é pré-computada: cada rota recebe a sua máscara exigida no
+momento da construção do índice, e a verificação por requisição é um único
+AND contra um dicionário já pronto.
+"""
+from typing import Dict, FrozenSet, Iterable, Mapping, Optional, Tuple
+
+# Rota sem método explícito vale para qualquer método HTTP
+ANY_METHOD = "*"
+
+
+class PermissionCodec:
+    """Mapeamento imutável permissão -> bit de Fibonacci."""
+
+    def __init__(self, bits: Mapping[str, int]):
+        ordered = sorted(bits.items(), key=lambda item: item[1])
+        for name, bit in ordered:
+            if not isinstance(bit, int) or bit < 0:
+                raise ValueError(f"Bit inválido para a permissão {name!r}: {bit!r}")
+        for (prev_name, prev_bit), (name, bit) in zip(ordered, ordered[1:]):
+            # Bits iguais ou vizinhos quebrariam a unicidade de Zeckendorf
+            if bit - prev_bit < 2:
+                raise ValueError(
+                    f"Permissões {prev_name!r} e {name!r} ocupam bits adjacentes ({prev_bit}, {bit})"
+                )
+
+        self._bits: Dict[str, int] = dict(bits)
+        self._masks: Dict[str, int] = {name: 1 << bit for name, bit in self._bits.items()}
+        self._names: Dict[int, str] = {m: name for name, m in self._masks.items()}
+
+    @property
+    def bits(self) -> Dict[str, int]:
+        return dict(self._bits)
+
+    def bit_of(self, permission: str) -> int:
+        return self._bits[permission]
+
+    def encode(self, permissions: Iterable[str]) -> int:
+        """Converte um conjunto de permissões numa máscara Zeckendorf."""
+        mask = 0
+        for name in permissions:
+            try:
+                mask |= self._masks[name]
+            except KeyError:
+                raise ValueError(f"Permissão desconhecida: {name!r}") from None
+        return mask
+
+    def decode(self, mask: int) -> FrozenSet[str]:
+        """Converte uma máscara no conjunto de permissões mapeadas (bits órfãos são ignorados)."""
+        names = []
+        while mask > 0:
+            low = mask & -mask
+            name = self._names.get(low)
+            if name is not None:
+                names.append(name)
+            mask ^= low
+        return frozenset(names)
+
+    def remap(self, **changes: int) -> "PermissionCodec":
+        """
+        Devolve um novo codec com bits realocados.
+        Ex.: codec.remap(READ=2) move READ do bit 0 para o bit 2 (docs/operations.md).
+        """
+        unknown = set(changes) - set(self._bits)
+        if unknown:
+            raise ValueError(f"Permissões desconhecidas: {sorted(unknown)}")
+        bits = dict(self._bits)
+        bits.update(changes)
+        return PermissionCodec(bits)
+
+    def __repr__(self) -> str:
+        return f"PermissionCodec({self._bits!r})"
+
+
+def _route_key(route) -> Tuple[str, str]:
+    # Aceita "GET /api/x", "/api/x" ou a tupla (método, path)
+    if isinstance(route, tuple):
+        method, path = route
+    else:
+        method, _, path = route.strip().rpartition(" ")
+        method = method.strip() or ANY_METHOD
+    return method.upper(), path
+
+
+class RouteAuthorizer:
+    """
+    Índice pré-computado rota -> máscara exigida.
+
+    O estado (codec, índice) é trocado por atribuição de uma única referência,
+    portanto um novo mapeamento de bits entra em vigor sem locks e sem
+    reconstrução por requisição.
+    """
+
+    def __init__(self, codec: PermissionCodec, routes: Mapping, default_allow: bool = True):
+        self.default_allow = default_allow
+        self._routes: Dict[Tuple[str, str], FrozenSet[str]] = {
+            _route_key(route): frozenset(perms) for route, perms in routes.items()
+        }
+        self._state = self._build(codec, self._routes)
+
+    @staticmethod
+    def _build(codec: PermissionCodec, routes) -> Tuple[PermissionCodec, Dict[Tuple[str, str], int]]:
+        # encode() valida as permissões: um nome desconhecido falha aqui, não em produção
+        index = {key: codec.encode(perms) for key, perms in routes.items()}
+        return codec, index
+
+    @property
+    def codec(self) -> PermissionCodec:
+        return self._state[0]
+
+    def swap_codec(self, codec: PermissionCodec) -> None:
+        """Reconstrói o índice fora do caminho quente e publica-o atomicamente."""
+        self._state = self._build(codec, self._routes)
+
+    def update_routes(self, routes: Mapping) -> None:
+        new_routes = {_route_key(route): frozenset(perms) for route, perms in routes.items()}
+        self._state = self._build(self._state[0], new_routes)
+        self._routes = new_routes
+
+    def required_mask(self, method: str, path: str) -> Optional[int]:
+        index = self._state[1]
+        required = index.get((method, path))
+        if required is None:
+            required = index.get((ANY_METHOD, path))
+        return required
+
+    def authorize(self, method: str, path: str, mask: int) -> bool:
+        """Autorização O(1): a máscara deve conter todos os bits exigidos pela rota."""
+        required = self.required_mask(method, path)
+        if required is None:
+            return self.default_allow
+        return (mask & required) == required
@@ -0,0 +1,279 @@
+"""
+Runner Pre-Fork Multi-Core para APIs protegidas pelo ELP-Ω.
+
+O processo pai inicializa o estado partilhado (keyring, tabela de nonces,
+templates da Shadow Reality) uma única vez e faz fork de N workers uvicorn.
+Cada worker abre o próprio socket com SO_REUSEPORT e o kernel distribui as
+conexões entre eles, sem accept() disputado.
+
+Sinais no processo pai:
+- SIGHUP: recarrega o keyring e substitui os workers graciosamente (a nova
+  geração sobe antes de a antiga receber SIGTERM).
+- SIGTERM/SIGINT: encerra todos os workers, esperando as requisições em curso.
+
+Um worker que morre é substituído; se o substituto não ficar pronto a tempo,
+é abatido e a substituição volta a ser tentada com backoff exponencial, sem
+derrubar o pai nem os workers que continuam a servir.
+"""
+import logging
+import os
+import select
+import signal
+import socket
+import struct
+import time
+from typing import Callable, Dict, List, Optional
+
+from elp_shared import Keyring, SharedState
+
+logger = logging.getLogger("elp_omega.prefork")
+
+_READY = struct.Struct("<i")
+
+
+def bind_reuseport(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+class PreforkRunner:
+    # Backoff (s) entre tentativas de substituir um worker que não ficou pronto
+    RESPAWN_BACKOFF = 0.5
+    RESPAWN_BACKOFF_MAX = 30.0
+
+    def __init__(self, app_factory: Callable[[SharedState], object], shared: SharedState,
+                 host: str = "0.0.0.0", port: int = 8000, workers: Optional[int] = None,
+                 keyring_loader: Optional[Callable[[], Keyring]] = None,
+                 graceful_timeout: float = 30.0, ready_timeout: float = 30.0, log_level: str = "error",
+                 on_ready: Optional[Callable[[float, List[int]], None]] = None):
+        self.app_factory = app_factory
+        self.shared = shared
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.keyring_loader = keyring_loader
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+        self.log_level = log_level
+        self.on_ready = on_ready
+        self._pids: Dict[int, int] = {}  # pid -> geração
+        self._generation = 0
+        self._stopping = False
+        self._reload_requested = False
+        self._missing = 0  # workers da geração atual por substituir
+        self._respawn_at = 0.0
+        self._backoff = 0.0
+
+    # --- Processo pai ---
+
+    def run(self) -> None:
+        signal.signal(signal.SIGHUP, lambda *_: self.request_reload())
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        signal.signal(signal.SIGINT, lambda *_: self.stop())
+
+        started = time.perf_counter()
+        # Pré-carrega o servidor no pai: os workers herdam os módulos via copy-on-write
+        import uvicorn  # noqa: F401
+        pids = self._spawn_generation()
+        elapsed = time.perf_counter() - started
+        logger.info("%d workers prontos em %.1f ms", len(pids), elapsed * 1000)
+        if self.on_ready:
+            self.on_ready(elapsed, pids)
+
+        while not self._stopping:
+            if self._reload_requested:
+                self._reload_requested = False
+                self._reload()
+            self._reap()
+            time.sleep(0.2)
+        self._shutdown(list(self._pids))
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    def request_reload(self) -> None:
+        self._reload_requested = True
+
+    def _spawn_generation(self) -> List[int]:
+        """
+        Sobe uma geração completa. `_generation` só avança quando todos os
+        workers estão prontos; se algum falhar, os já criados são abatidos.
+        """
+        generation = self._generation + 1
+        ready_r, ready_w = os.pipe()
+        pids = []
+        try:
+            try:
+                for _ in range(self.workers):
+                    pids.append(self._spawn(ready_r, ready_w, generation))
+            finally:
+                os.close(ready_w)
+        except BaseException:
+            os.close(ready_r)
+            self._kill_all(pids)
+            raise
+        try:
+            self._await_ready(ready_r, len(pids))
+        except BaseException:
+            self._kill_all(pids)
+            raise
+        self._generation = generation
+        return pids
+
+    def _spawn(self, ready_r: int, ready_w: int, generation: int) -> int:
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            code = 1
+            try:
+                self._worker_main(ready_w)
+                code = 0
+            except BaseException:
+                logger.exception("Worker %d terminou com erro", os.getpid())
+            finally:
+                os._exit(code)
+        self._pids[pid] = generation
+        return pid
+
+    def _await_ready(self, ready_r: int, expected: int) -> None:
+        deadline = time.monotonic() + self.ready_timeout
+        got = 0
+        try:
+            while got < expected:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Apenas {got}/{expected} workers ficaram prontos")
+                readable, _, _ = select.select([ready_r], [], [], remaining)
+                if not readable:
+                    continue
+                chunk = os.read(ready_r, _READY.size * expected)
+                if not chunk:
+                    raise RuntimeError(f"Workers terminaram antes de ficarem prontos ({got}/{expected})")
+                got += len(chunk) // _READY.size
+        finally:
+            os.close(ready_r)
+
+    def _reload(self) -> None:
+        """
+        Rotação de chave: sobe a nova geração e só então dispensa a antiga.
+        Qualquer falha (keyring ilegível, workers que não ficam prontos) deixa
+        o keyring e a geração em vigor intactos.
+        """
+        keyring = self.shared.keyring
+        old = [pid for pid, gen in self._pids.items() if gen == self._generation]
+        try:
+            if self.keyring_loader is not None:
+                self.shared.keyring = self.keyring_loader()
+            self._spawn_generation()
+        except Exception:
+            self.shared.keyring = keyring
+            logger.exception("Recarga falhou; a geração %d continua ativa", self._generation)
+            return
+        # A geração nova nasce completa: substituições pendentes da anterior caducam
+        self._missing = 0
+        self._backoff = 0.0
+        logger.info("Nova geração %d ativa; encerrando %d workers antigos", self._generation, len(old))
+        self._shutdown(old)
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            generation = self._pids.pop(pid, None)
+            if generation == self._generation and not self._stopping:
+                logger.warning("Worker %d saiu (status %d); substituindo", pid, status)
+                self._missing += 1
+        self._respawn_missing()
+
+    def _respawn_missing(self) -> None:
+        while self._missing and not self._stopping and time.monotonic() >= self._respawn_at:
+            try:
+                self._respawn()
+            except (OSError, RuntimeError) as exc:  # TimeoutError é um OSError
+                self._backoff = min(self.RESPAWN_BACKOFF_MAX, self._backoff * 2 or self.RESPAWN_BACKOFF)
+                self._respawn_at = time.monotonic() + self._backoff
+                logger.error("Substituição de worker falhou (%s); nova tentativa em %.1f s", exc, self._backoff)
+                return
+            self._missing -= 1
+            self._backoff = 0.0
+
+    def _respawn(self) -> None:
+        ready_r, ready_w = os.pipe()
+        try:
+            pid = self._spawn(ready_r, ready_w, self._generation)
+        except OSError:
+            os.close(ready_r)
+            raise
+        finally:
+            os.close(ready_w)
+        try:
+            self._await_ready(ready_r, 1)
+        except (TimeoutError, RuntimeError):
+            # Um substituto preso não fica a meio: a próxima tentativa começa do zero
+            self._kill(pid)
+            raise
+
+    def _kill(self, pid: int) -> None:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+        self._pids.pop(pid, None)
+
+    def _kill_all(self, pids: List[int]) -> None:
+        for pid in pids:
+            self._kill(pid)
+
+    def _shutdown(self, pids: List[int]) -> None:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self._pids.pop(pid, None)
+        deadline = time.monotonic() + self.graceful_timeout
+        pending = set(pids)
+        while pending and time.monotonic() < deadline:
+            for pid in list(pending):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    pending.discard(pid)
+                    self._pids.pop(pid, None)
+            time.sleep(0.05)
+        for pid in pending:
+            logger.warning("Worker %d não encerrou a tempo; SIGKILL", pid)
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self._pids.pop(pid, None)
+
+    # --- Worker ---
+
+    def _worker_main(self, ready_w: int) -> None:
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_DFL)
+        import uvicorn
+
+        sock = bind_reuseport(self.host, self.port)
+        app = self.app_factory(self.shared)
+        config = uvicorn.Config(app, log_level=self.log_level,
+                                timeout_graceful_shutdown=int(self.graceful_timeout))
+        server = uvicorn.Server(config)
+        os.write(ready_w, _READY.pack(os.getpid()))
+        os.close(ready_w)
+        server.run(sockets=[sock])
@@ -0,0 +1,244 @@
+"""
+Tracing por Estágio e Profiler por Amostragem (opt-in).
+
+Quando o p99 piora, a pergunta é onde está o tempo: parsing dos headers,
+HMAC do selo, consulta ao nonce store, geração da Shadow, codificação JSON
+ou o jitter. Com `tracer=StageTracer("spans.json", sample_every=100)` nos
+adaptadores, 1 em cada N pedidos leva marcas nas fronteiras dos estágios:
+
+    parse    headers X-ELP-* + adjacência, autorização e frescor (guard.precheck)
+    seal     verify_seal (inline ou no offloader)
+    nonce    consulta/registo do nonce e drift (guard.finish)
+    app      app real (PRIME), resposta mascarada (MIRROR) ou corpo vinculado
+    shadow   generate_shadow;  json  codificação do corpo;  jitter  atraso 15-60 ms
+    cheap    corpo da Shadow barata (nível de taxa);  send  envio da resposta
+
+Sem tracer, o custo é um `is not None` por estágio. Os spans saem pela
+thread escritora do EventLog para um ficheiro no Trace Event Format (JSON do
+chrome://tracing, aberto pelo Perfetto e pelo speedscope), cada pedido na sua
+própria faixa. `python elp_profile.py summary spans.json` resume p50/p99 por
+estágio.
+
+`profiler_app(token)` é uma app ASGI (porta interna) que, por pedido, amostra
+as pilhas de todas as threads do worker durante alguns segundos e devolve-as
+no formato "folded" (flamegraph.pl, speedscope).
+"""
+import argparse
+import asyncio
+import hmac
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from elp_events import EventLog, Span, _RotatingFile
+
+
+class RequestSpans:
+    """Marcas de um pedido amostrado; só existe para 1 em cada N pedidos."""
+    __slots__ = ("track", "wall_us", "started", "last", "spans")
+
+    def __init__(self, track: int):
+        self.track = track
+        self.wall_us = time.time_ns() // 1000
+        self.started = self.last = time.perf_counter_ns()
+        self.spans: List[tuple] = []
+
+    def mark(self, name: str) -> None:
+        """Fecha o estágio `name`: vai da marca anterior até agora."""
+        now = time.perf_counter_ns()
+        self.spans.append((name, self.last, now))
+        self.last = now
+
+
+class ChromeTraceSink:
+    """
+    Trace Event Format em modo array: "[" no início de cada ficheiro e um
+    evento por linha terminado em vírgula. O "]" final é opcional no formato,
+    por isso o ficheiro é válido a qualquer momento, mesmo depois de rotação.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 << 20, backups: int = 5):
+        self._file = _RotatingFile(path, max_bytes, backups, header=b"[\n")
+        self._pid = os.getpid()
+
+    def write_batch(self, requests: List[tuple]) -> None:
+        lines = []
+        for spans, reality, stage, method, path in requests:
+            base, started = spans.wall_us, spans.started
+            common = {"pid": self._pid, "tid": spans.track, "cat": "elp", "ph": "X"}
+            lines.append(json.dumps({
+                "name": "request", "ts": base, "dur": (spans.last - started) / 1000, **common,
+                "args": {"method": method, "path": path, "reality": reality, "stage": stage},
+            }, separators=(",", ":")))
+            for name, begin, end in spans.spans:
+                lines.append(json.dumps({"name": name, "ts": base + (begin - started) / 1000,
+                                         "dur": (end - begin) / 1000, **common}, separators=(",", ":")))
+        self._file.write("".join(line + ",\n" for line in lines).encode())
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_chrome_trace(path: str) -> List[dict]:
+    """Eventos de um ficheiro escrito pelo ChromeTraceSink (sem o "]" final)."""
+    with open(path, "rb") as fh:
+        text = fh.read().decode().rstrip().rstrip(",")
+    if not text.startswith("["):
+        raise ValueError(f"{path} não é um trace no Trace Event Format")
+    return json.loads(text if text.endswith("]") else text + "]")
+
+
+class StageTracer(EventLog):
+    """
+    Amostragem determinística 1-em-N (contador, não aleatória) e exportação
+    pela thread escritora do EventLog; com o anel cheio o pedido é descartado.
+    """
+
+    def __init__(self, path: str, sample_every: int = 100, capacity: int = 16384, batch_size: int = 256,
+                 flush_interval: float = 0.5, max_bytes: int = 64 << 20, backups: int = 5):
+        if not isinstance(sample_every, int) or sample_every < 1:
+            raise ValueError(f"sample_every deve ser um inteiro >= 1: {sample_every!r}")
+        super().__init__(ChromeTraceSink(path, max_bytes, backups), capacity, batch_size, flush_interval)
+        self.sample_every = sample_every
+        self._counter = itertools.count()
+
+    def begin(self) -> Optional[RequestSpans]:
+        """None para os pedidos não amostrados (o adaptador não marca nada)."""
+        n = next(self._counter)
+        if n % self.sample_every:
+            return None
+        return RequestSpans(n // self.sample_every)
+
+    def end(self, spans: RequestSpans, reality: str, stage: str, method: str, path: str) -> bool:
+        return self.ring.offer((spans, reality, stage, method, path))
+
+
+def summarize(events: List[dict]) -> Dict[str, dict]:
+    """count, mean, p50, p99 e total (µs) por estágio, mais o pedido inteiro ("request")."""
+    durations = defaultdict(list)
+    for event in events:
+        if event.get("ph") == "X":
+            durations[event["name"]].append(event["dur"])
+    request_total = sum(durations.get("request", ())) or 1.0
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+        summary[name] = {"count": len(values), "mean_us": round(sum(values) / len(values), 2),
+                         "p50_us": round(pick(0.50), 2), "p99_us": round(pick(0.99), 2),
+                         "share": round(sum(values) / request_total, 4)}
+    return summary
+
+
+# --- Profiler por amostragem -------------------------------------------------
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Amostra `sys._current_frames()` a cada `interval` s durante `duration` s,
+    a partir de uma thread própria: o worker continua a servir e não é
+    instrumentado. O resultado são pilhas "folded" (raiz;...;folha contagem).
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        if interval <= 0:
+            raise ValueError(f"interval deve ser > 0: {interval!r}")
+        self.interval = interval
+        self.max_depth = max_depth
+
+    def run(self, duration: float) -> Counter:
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < self.max_depth:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, str(ident)))
+                stacks[";".join(reversed(labels))] += 1
+            time.sleep(self.interval)
+        return stacks
+
+    @staticmethod
+    def folded(stacks: Counter) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def profiler_app(token: str, max_seconds: float = 30.0, interval: float = 0.005):
+    """
+    App ASGI (monte-a numa porta interna, fora do ELP): `GET /?seconds=5`
+    amostra o worker pelo tempo pedido (limitado a `max_seconds`) e devolve as
+    pilhas folded em text/plain. Exige `Authorization: Bearer <token>`; um
+    segundo perfil em simultâneo recebe 409.
+    """
+    if not token:
+        raise ValueError("profiler_app exige um token")
+    expected = f"Bearer {token}".encode()
+    profiler = SamplingProfiler(interval)
+    busy = threading.Lock()
+
+    async def respond(send, status: int, body: bytes, content_type: bytes = b"text/plain; charset=utf-8"):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-length", str(len(body)).encode()), (b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        authorization = dict(scope.get("headers", ())).get(b"authorization", b"")
+        if not hmac.compare_digest(authorization, expected):
+            return await respond(send, 401, b"unauthorized\n")
+        if scope["method"] != "GET":
+            return await respond(send, 405, b"method not allowed\n")
+        try:
+            seconds = float(parse_qs(scope.get("query_string", b"").decode()).get("seconds", ["5"])[0])
+        except ValueError:
+            return await respond(send, 400, b"seconds invalido\n")
+        if not 0 < seconds <= max_seconds:
+            return await respond(send, 400, f"seconds deve estar em (0, {max_seconds:g}]\n".encode())
+        if not busy.acquire(blocking=False):
+            return await respond(send, 409, b"perfil em curso\n")
+        try:
+            # A amostragem corre numa thread: o event loop deste worker continua a servir (e a ser amostrado)
+            stacks = await asyncio.get_running_loop().run_in_executor(None, profiler.run, seconds)
+        finally:
+            busy.release()
+        await respond(send, 200, SamplingProfiler.folded(stacks).encode())
+
+    return app
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Resumo por estágio de traces do StageTracer.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary = commands.add_parser("summary", help="count/mean/p50/p99 por estágio")
+    summary.add_argument("files", nargs="+", help="spans.json e rotações (spans.json.1, ...)")
+    args = parser.parse_args(argv)
+    events = []
+    for path in args.files:
+        events.extend(read_chrome_trace(path))
+    print(f"{'estágio':<10}{'n':>9}{'média µs':>11}{'p50 µs':>10}{'p99 µs':>10}{'fração':>9}")
+    for name, row in sorted(summarize(events).items(), key=lambda item: -item[1]["share"]):
+        print(f"{name:<10}{row['count']:>9}{row['mean_us']:>11}{row['p50_us']:>10}{row['p99_us']:>10}"
+              f"{row['share']:>9.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Anti-Replay por Janela Deslizante (estilo IPsec, RFC 6479).
+
+Alternativa ao `NonceStore` para clientes que numeram os pedidos: o nonce
+passa a ser `<client_id>:<seq>`, com `seq` monotónico por cliente. Em vez de
+guardar cada nonce durante a janela de frescor, o store guarda por cliente
+um bitmap de `window` bits à volta do maior `seq` visto:
+
+- seq acima do topo: a janela avança (zera os blocos de 64 bits que entram);
+- seq dentro da janela: aceite uma única vez (um bit);
+- seq abaixo da janela: rejeitado, como um Replay.
+
+Todos os bitmaps vivem num único `array('Q')` (anel de blocos por cliente,
+sem deslocar bits ao avançar), e a memória cresce com o número de clientes,
+não com a taxa de pedidos. Um cliente só é despejado depois da última
+expiração que recebeu: a partir daí nenhum pedido antigo dele passa no
+Frescor, logo esquecer a janela é seguro. Com a tabela cheia de clientes
+ainda ativos, clientes novos são recusados (falha fechada).
+
+    engine = EntangledLogicOmegaV5(secret, nonce_store=SequenceWindowStore())
+"""
+import sys
+import threading
+from array import array
+from typing import Optional, Tuple
+
+# seq cabe em 64 bits (20 dígitos decimais, como elp_mask.parse_bounded_int)
+_SEQ_MAX_DIGITS = 20
+_CLIENT_MAX_LEN = 128
+
+
+def split_sequence_nonce(nonce: str) -> Optional[Tuple[str, int]]:
+    """`client:seq` -> (client, seq); None se malformado."""
+    client, _, raw_seq = nonce.rpartition(":")
+    # Mesmas regras de parse_bounded_int, em linha: este parsing corre em todos os pedidos
+    if not client or len(client) > _CLIENT_MAX_LEN or not raw_seq or len(raw_seq) > _SEQ_MAX_DIGITS \
+            or not (raw_seq.isascii() and raw_seq.isdigit()):
+        return None
+    seq = int(raw_seq)
+    return None if seq >> 64 else (client, seq)
+
+
+class SequenceWindowStore:
+    def __init__(self, max_age_ms: int = 300000, window: int = 1024, max_clients: int = 100_000):
+        self.max_age_ms = max_age_ms
+        # Um bloco extra de folga (RFC 6479): a janela efetiva é de `window` bits completos
+        self._blocks = -(-window // 64) + 1
+        self.window = (self._blocks - 1) * 64
+        self.max_clients = max_clients
+        self._slots = {}                # client_id -> slot (ordem = uso mais recente no fim)
+        self._free = []                 # slots de clientes despejados, reutilizáveis
+        self._bits = array("Q")         # `_blocks` palavras por slot
+        self._top = array("Q")          # maior seq aceite por slot
+        self._expiry = array("q")       # última expiração recebida por slot
+        self._zero = array("Q", [0]) * self._blocks
+        self._lock = threading.Lock()
+        self.rejected_full = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, nonce: str) -> bool:
+        parsed = split_sequence_nonce(nonce)
+        if parsed is None:
+            return False
+        slot = self._slots.get(parsed[0])
+        return slot is not None and self._seen(slot, parsed[1])
+
+    def _seen(self, slot: int, seq: int) -> bool:
+        top = self._top[slot]
+        if seq > top:
+            return False
+        if top - seq >= self.window:
+            return True
+        word = slot * self._blocks + (seq >> 6) % self._blocks
+        return bool(self._bits[word] >> (seq & 63) & 1)
+
+    def _allocate(self, client: str, now_ms: int) -> Optional[int]:
+        slots = self._slots
+        if len(slots) >= self.max_clients:
+            # O cliente menos recente só sai se nenhum pedido dele ainda puder ser fresco
+            oldest = next(iter(slots))
+            if now_ms < self._expiry[slots[oldest]]:
+                return None
+            self._free.append(slots.pop(oldest))
+        if self._free:
+            slot = self._free.pop()
+            base = slot * self._blocks
+            self._bits[base:base + self._blocks] = self._zero
+        else:
+            slot = len(self._top)
+            self._bits.extend(self._zero)
+            self._top.append(0)
+            self._expiry.append(0)
+        slots[client] = slot
+        return slot
+
+    def add(self, nonce: str, now_ms: int, expiry_ms: int = None) -> bool:
+        """Aceita `client:seq` uma única vez dentro da janela. False = Replay, demasiado antigo ou malformado."""
+        parsed = split_sequence_nonce(nonce)
+        if parsed is None:
+            return False
+        client, seq = parsed
+        if expiry_ms is None:
+            expiry_ms = now_ms + self.max_age_ms
+        blocks, bits = self._blocks, self._bits
+        with self._lock:
+            slot = self._slots.pop(client, None)
+            if slot is None:
+                slot = self._allocate(client, now_ms)
+                if slot is None:
+                    self.rejected_full += 1
+                    return False
+                self._top[slot] = seq
+            else:
+                self._slots[client] = slot  # move para o fim (mais recente)
+            base = slot * blocks
+            top = self._top[slot]
+            if seq > top:
+                # Avança a janela zerando só os blocos que entram no anel
+                first, last = (top >> 6) + 1, seq >> 6
+                if last - first >= blocks:
+                    bits[base:base + blocks] = self._zero
+                else:
+                    for block in range(first, last + 1):
+                        bits[base + block % blocks] = 0
+                self._top[slot] = seq
+            elif top - seq >= self.window:
+                return False
+            word = base + (seq >> 6) % blocks
+            flag = 1 << (seq & 63)
+            if bits[word] & flag:
+                return False
+            bits[word] |= flag
+            if expiry_ms > self._expiry[slot]:
+                self._expiry[slot] = expiry_ms
+            return True
+
+    def stats(self) -> dict:
+        clients = len(self._slots)
+        table = self._bits.itemsize * len(self._bits) + self._top.itemsize * len(self._top) * 2
+        index = sys.getsizeof(self._slots)
+        return {"clients": clients, "max_clients": self.max_clients, "window": self.window,
+                "rejected_full": self.rejected_full,
+                "bytes_per_client": round((table + index) / clients) if clients else 0}
@@ -0,0 +1,136 @@
+"""
+Tabela de Políticas por Rota, compilada numa trie de segmentos.
+
+Cada rota pode saltar a proteção (health checks, estáticos), apertar a janela
+de frescor, escolher o template da Shadow ou exigir bits na máscara. A tabela
+é compilada uma vez no arranque; por pedido, a resolução percorre os
+segmentos do path uma única vez (O(comprimento do path)), qualquer que seja o
+número de rotas.
+
+    policies = RoutePolicyTable({
+        "/health": {"bypass": True},
+        "/static/*": {"bypass": True},
+        "/api/v1/transfers/*": {"max_age_ms": 30_000, "required_mask": 0b101},
+    })
+
+Um padrão terminado em `/*` cobre o prefixo e tudo abaixo dele; os restantes
+são exatos. Ganha o padrão exato e, sem ele, o prefixo mais longo. Barras
+repetidas ou finais não mudam a rota ("//health/" resolve como "/health");
+um path com segmentos "." ou ".." fica sempre com a política padrão.
+"""
+from typing import Dict, Mapping, Optional
+
+# Sufixo que transforma o padrão numa rota de prefixo
+PREFIX_WILDCARD = "/*"
+_DOT_SEGMENTS = (".", "..")
+
+
+class RoutePolicy:
+    """Ajustes da cascata para uma rota (None = vale o do engine)."""
+    __slots__ = ("bypass", "max_age_ms", "shadow_template", "required_mask")
+
+    def __init__(self, bypass: bool = False, max_age_ms: Optional[int] = None,
+                 shadow_template: str = "banking", required_mask: int = 0):
+        if max_age_ms is not None and (not isinstance(max_age_ms, int) or max_age_ms <= 0):
+            raise ValueError(f"max_age_ms inválido: {max_age_ms!r}")
+        # Bits vizinhos nunca cabem numa máscara Zeckendorf: a rota ficaria inalcançável
+        if not isinstance(required_mask, int) or required_mask < 0 or required_mask & (required_mask >> 1):
+            raise ValueError(f"required_mask inválida: {required_mask!r}")
+        self.bypass = bypass
+        self.max_age_ms = max_age_ms
+        self.shadow_template = shadow_template
+        self.required_mask = required_mask
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"RoutePolicy({fields})"
+
+
+# Rota sem política: cascata completa com os valores do engine
+DEFAULT_POLICY = RoutePolicy()
+
+
+class _Node:
+    __slots__ = ("children", "exact", "prefix")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.exact: Optional[RoutePolicy] = None
+        self.prefix: Optional[RoutePolicy] = None
+
+
+def _policy(value) -> RoutePolicy:
+    return value if isinstance(value, RoutePolicy) else RoutePolicy(**value)
+
+
+class RoutePolicyTable:
+    """
+    Trie de segmentos pré-compilada. Como o `RouteAuthorizer`, a raiz é trocada
+    por atribuição de uma única referência: `update_routes` publica a nova
+    tabela sem locks e sem reconstrução por pedido.
+    """
+
+    def __init__(self, routes: Mapping, default: RoutePolicy = DEFAULT_POLICY):
+        self.default = default
+        self._root = self._compile(routes)
+        self._routes = dict(routes)
+
+    @staticmethod
+    def _compile(routes: Mapping) -> _Node:
+        root = _Node()
+        for pattern, value in routes.items():
+            if not pattern.startswith("/"):
+                raise ValueError(f"Padrão de rota deve começar por '/': {pattern!r}")
+            policy = _policy(value)
+            is_prefix = pattern.endswith(PREFIX_WILDCARD)
+            if is_prefix:
+                pattern = pattern[:-len(PREFIX_WILDCARD)]
+            if "*" in pattern:
+                raise ValueError(f"Só é suportado '/*' no fim do padrão: {pattern!r}")
+            node = root
+            # "/" e "/*" ficam na raiz; "/a/b" desce pelos segmentos "a" e "b"
+            for segment in filter(None, pattern.split("/")):
+                if segment in _DOT_SEGMENTS:
+                    raise ValueError(f"Segmento inválido no padrão: {pattern!r}")
+                node = node.children.setdefault(segment, _Node())
+            if is_prefix:
+                node.prefix = policy
+            else:
+                node.exact = policy
+        return root
+
+    @property
+    def routes(self) -> dict:
+        return dict(self._routes)
+
+    def update_routes(self, routes: Mapping) -> None:
+        """Compila fora do caminho quente e publica atomicamente."""
+        self._root = self._compile(routes)
+        self._routes = dict(routes)
+
+    def policies(self):
+        """Todas as políticas compiladas (para validação no arranque)."""
+        pending = [self._root]
+        while pending:
+            node = pending.pop()
+            for policy in (node.exact, node.prefix):
+                if policy is not None:
+                    yield policy
+            pending.extend(node.children.values())
+
+    def resolve(self, path: str) -> RoutePolicy:
+        """Política do pedido: exata, senão o prefixo mais longo, senão `default`."""
+        node = self._root
+        found = node.prefix
+        for segment in path.split("/"):
+            if not segment:
+                continue
+            if segment in _DOT_SEGMENTS:
+                # O servidor ASGI/WSGI não normaliza "..": nada de bypass nem de atalhos por aqui
+                return self.default
+            node = node.children.get(segment)
+            if node is None:
+                return found or self.default
+            if node.prefix is not None:
+                found = node.prefix
+        return node.exact or found or self.default
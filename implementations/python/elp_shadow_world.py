@@ -0,0 +1,90 @@
+"""
+Mundo Shadow Consistente (entidades determinísticas por recurso).
+
+Semeada por `path|context|nonce`, a Shadow mudava a cada pedido: a mesma
+"conta" devolvia um saldo diferente a cada nonce novo, e o atacante notava
+de imediato. Aqui os atributos estáveis de uma entidade (tipo de conta,
+saldo, ...) derivam apenas do segredo, do template e do id do recurso
+extraído do path. Cada entidade é materializada na primeira consulta e
+memorizada numa LRU limitada; uma entidade despejada volta a ser gerada
+exatamente igual, portanto a LRU é só cache e nunca altera o universo falso.
+
+Só os campos por-pedido (transaction_id, timestamp, tempo de processamento)
+continuam a depender do nonce.
+"""
+import random
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from elp_native import py_entity_seed
+
+# Segmento que parece um identificador: só dígitos (123) ou >= 4 caracteres com
+# algum dígito (acc-9f2, UUID). Versões de API ("v1", "v10") não contam.
+_ID_SEGMENT = re.compile(r"^\d+$|^(?=.*\d)[\w.-]{4,}$")
+
+
+def entity_of(path: str) -> str:
+    """
+    Chave da entidade: o path até ao último segmento com cara de id.
+    /api/v1/accounts/123/transactions -> /api/v1/accounts/123 (mesma conta, mesmo saldo).
+    Sem id no path, o próprio path (sem query) é a entidade.
+    """
+    path = path.split("?", 1)[0].rstrip("/")
+    segments = path.split("/")
+    for i in range(len(segments) - 1, 0, -1):
+        if _ID_SEGMENT.match(segments[i]):
+            return "/".join(segments[:i + 1])
+    return path or "/"
+
+
+class ShadowWorld:
+    """Entidades falsas memorizadas por (template, entidade), com retenção LRU limitada."""
+
+    def __init__(self, secret: bytes, shadow_templates: dict, max_entities: int = 10_000,
+                 entity_key: Optional[Callable[[str], str]] = None,
+                 seed_fn: Optional[Callable[[str], int]] = None):
+        self.secret = secret
+        # sha256 -> inteiro de 64 bits; a extensão nativa fornece uma versão equivalente
+        self.seed_fn = seed_fn or py_entity_seed
+        self.shadow_templates = shadow_templates
+        self.max_entities = max_entities
+        self.entity_key = entity_key or entity_of
+        self.materialized = 0
+        self._entities: "OrderedDict[tuple, dict]" = OrderedDict()
+        # O offloader pode gerar Shadows em várias threads ao mesmo tempo
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def entity(self, path: str, template: str = "banking") -> dict:
+        """Atributos estáveis da entidade do `path`. Devolve sempre uma cópia."""
+        key = (template, self.entity_key(path))
+        with self._lock:
+            entity = self._entities.get(key)
+            if entity is not None:
+                self._entities.move_to_end(key)
+                return dict(entity, flags=list(entity["flags"]))
+        entity = self._materialize(*key)
+        with self._lock:
+            self._entities[key] = entity
+            self.materialized += 1
+            if len(self._entities) > self.max_entities:
+                self._entities.popitem(last=False)
+        return dict(entity, flags=list(entity["flags"]))
+
+    def _materialize(self, template: str, entity: str) -> dict:
+        rng = random.Random(self.seed_fn(f"{template}|{entity}|{self.secret}"))
+        shape = self.shadow_templates[template]
+        return {
+            "account_type": rng.choice(shape["account_types"]),
+            "balance": round(rng.uniform(*shape["balance_range"]), 2),
+            "currency": shape["currency"],
+            "flags": tuple(shape["flags"]),
+        }
+
+    def stats(self) -> dict:
+        return {"entities": len(self._entities), "max_entities": self.max_entities,
+                "materialized": self.materialized}
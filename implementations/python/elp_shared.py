@@ -0,0 +1,182 @@
+"""
+Estado Partilhado entre Workers (pre-fork).
+
+Tudo aqui é criado UMA vez no processo pai, antes do fork, e herdado pelos
+filhos: o keyring, a tabela de nonces em memória partilhada (mmap anónimo
+MAP_SHARED) e os templates da Shadow Reality. Um nonce consumido num worker
+é visto como Replay em todos os outros.
+"""
+import mmap
+import multiprocessing
+import os
+import struct
+from typing import Iterable, Optional, Tuple
+
+from elp_omega import DEFAULT_SHADOW_TEMPLATES, EntangledLogicOmegaV5, nonce_digest
+
+# Slot: digest de 16 bytes do nonce + expiração em ms (0 = slot nunca usado)
+_SLOT = struct.Struct("<16sq")
+_COUNTER = struct.Struct("<q")
+
+
+class Keyring:
+    """Chave atual (assina e valida) e chaves anteriores (só validam, durante a rotação)."""
+
+    def __init__(self, current: bytes, previous: Iterable[bytes] = ()):
+        if not current:
+            raise ValueError("Keyring sem chave atual")
+        self.current = current
+        self.previous: Tuple[bytes, ...] = tuple(previous)
+
+    @classmethod
+    def from_env(cls, var: str = "ELP_SECRET_KEY", previous_var: str = "ELP_PREVIOUS_KEYS") -> "Keyring":
+        current = os.environ.get(var, "")
+        previous = [k for k in os.environ.get(previous_var, "").split(",") if k]
+        return cls(current.encode(), [k.encode() for k in previous])
+
+    @classmethod
+    def from_file(cls, path: str) -> "Keyring":
+        """Uma chave por linha; a primeira é a atual."""
+        with open(path, "rb") as fh:
+            keys = [line.strip() for line in fh if line.strip()]
+        if not keys:
+            raise ValueError(f"Keyring vazio: {path}")
+        return cls(keys[0], keys[1:])
+
+    def rotate(self, new_key: bytes, keep: int = 1) -> "Keyring":
+        return Keyring(new_key, ((self.current,) + self.previous)[:keep])
+
+
+class SharedNonceTable:
+    """
+    Tabela hash de endereçamento aberto sobre mmap partilhado.
+
+    Dividida em faixas (stripes), cada uma com o seu próprio lock de processo
+    e sondagem linear confinada à faixa: workers concorrentes só disputam o
+    lock quando os nonces caem na mesma faixa. Slots vencidos são reutilizados
+    no lugar, sem necessidade de limpeza periódica.
+
+    A sondagem para em MAX_PROBE slots: se todos estiverem vivos, o nonce novo
+    é recusado (fail-closed) e o pedido, mesmo legítimo, cai na Shadow como
+    Replay. Acontece quando a tabela está subdimensionada para a taxa de
+    nonces na janela (ou por azar de hash num bairro cheio); cada recusa conta
+    em `rejected_full`, partilhado entre workers, e visível em `stats()`.
+    """
+    MAX_PROBE = 64
+
+    def __init__(self, capacity: int = 1 << 20, max_age_ms: int = 300000, stripes: int = 16, ctx=None):
+        ctx = ctx or multiprocessing.get_context("fork")
+        self.max_age_ms = max_age_ms
+        self.stripes = stripes
+        self.stripe_slots = max(1, capacity // stripes)
+        self.capacity = self.stripe_slots * stripes
+        self._buf = mmap.mmap(-1, self.capacity * _SLOT.size)
+        # Um contador de recusas por faixa, atualizado sob o lock da faixa
+        self._full = mmap.mmap(-1, stripes * _COUNTER.size)
+        self._locks = [ctx.Lock() for _ in range(stripes)]
+        self._snapshot = None
+
+    _digest = staticmethod(nonce_digest)
+
+    def attach_snapshot(self, snapshot) -> None:
+        """Snapshot carregado no pai antes do fork: as páginas do mmap ficam partilhadas."""
+        self._snapshot = snapshot
+
+    def _locate(self, digest: bytes):
+        h = int.from_bytes(digest[:8], "little")
+        stripe = h % self.stripes
+        return stripe, stripe * self.stripe_slots, (h >> 16) % self.stripe_slots
+
+    def add(self, nonce: str, now_ms: int, expiry_ms: Optional[int] = None) -> bool:
+        """Registra o nonce. False se já visto na janela ou se a faixa estiver cheia (fail-closed)."""
+        digest = self._digest(nonce)
+        snapshot = self._snapshot
+        if snapshot is not None and now_ms < snapshot.max_expiry and snapshot.contains(digest, now_ms):
+            return False
+        stripe, base, start = self._locate(digest)
+        buf, slots = self._buf, self.stripe_slots
+        with self._locks[stripe]:
+            free = -1
+            for i in range(min(self.MAX_PROBE, slots)):
+                offset = (base + (start + i) % slots) * _SLOT.size
+                seen, expiry = _SLOT.unpack_from(buf, offset)
+                if expiry == 0:
+                    if free < 0:
+                        free = offset
+                    break
+                if expiry <= now_ms:
+                    if free < 0:
+                        free = offset
+                    continue
+                if seen == digest:
+                    return False
+            if free < 0:
+                offset = stripe * _COUNTER.size
+                _COUNTER.pack_into(self._full, offset, _COUNTER.unpack_from(self._full, offset)[0] + 1)
+                return False
+            _SLOT.pack_into(buf, free, digest, expiry_ms if expiry_ms is not None else now_ms + self.max_age_ms)
+            return True
+
+    def contains(self, nonce: str, now_ms: int) -> bool:
+        digest = self._digest(nonce)
+        _, base, start = self._locate(digest)
+        for i in range(min(self.MAX_PROBE, self.stripe_slots)):
+            seen, expiry = _SLOT.unpack_from(self._buf, (base + (start + i) % self.stripe_slots) * _SLOT.size)
+            if expiry == 0:
+                return False
+            if expiry > now_ms and seen == digest:
+                return True
+        return False
+
+    def live_entries(self, now_ms: int):
+        """(digest, expiração) dos slots vivos, para snapshot."""
+        entries = [(d, exp) for d, exp in _SLOT.iter_unpack(self._buf) if exp > now_ms]
+        if self._snapshot is not None:
+            entries.extend(self._snapshot.live_entries(now_ms))
+        return entries
+
+    def live_count(self, now_ms: int) -> int:
+        """Contagem O(n) para telemetria, nunca no caminho quente."""
+        return sum(1 for _, expiry in _SLOT.iter_unpack(self._buf) if expiry > now_ms)
+
+    @property
+    def rejected_full(self) -> int:
+        """Nonces recusados por sondagem cheia, somados em todos os workers."""
+        return sum(count for (count,) in _COUNTER.iter_unpack(self._full))
+
+    def stats(self, now_ms: int) -> dict:
+        """Inclui `live_count` (O(n)): para telemetria, nunca no caminho quente."""
+        live = self.live_count(now_ms)
+        return {"capacity": self.capacity, "live": live, "load": round(live / self.capacity, 4),
+                "rejected_full": self.rejected_full}
+
+
+class SharedState:
+    """Componentes do engine inicializados no pai e herdados pelos workers."""
+
+    def __init__(self, keyring: Keyring, nonce_table: Optional[SharedNonceTable] = None,
+                 shadow_templates: Optional[dict] = None, max_age_ms: int = 300000, mask_width: int = 64):
+        self.keyring = keyring
+        self.max_age_ms = max_age_ms
+        self.mask_width = mask_width
+        self.nonce_table = nonce_table or SharedNonceTable(max_age_ms=max_age_ms)
+        self.shadow_templates = shadow_templates or DEFAULT_SHADOW_TEMPLATES
+
+    def enable_nonce_snapshots(self, path: str, interval: float = 10.0):
+        """
+        Carrega o snapshot anterior na tabela partilhada e inicia a gravação periódica
+        no processo pai (que vê todos os workers). Devolve o NonceSnapshotter.
+        """
+        from elp_nonce_snapshot import NonceSnapshotter, load_into
+        load_into(self.nonce_table, path)
+        return NonceSnapshotter(self.nonce_table, path, interval).start()
+
+    def build_engine(self) -> EntangledLogicOmegaV5:
+        return EntangledLogicOmegaV5(
+            self.keyring.current,
+            max_age_ms=self.max_age_ms,
+            mask_width=self.mask_width,
+            previous_secrets=self.keyring.previous,
+            nonce_store=self.nonce_table,
+            shadow_templates=self.shadow_templates,
+        )
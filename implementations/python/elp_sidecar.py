@@ -0,0 +1,396 @@
+"""
+Sidecar Reverse-Proxy ELP-Ω.
+
+Protege serviços que não são Python (ou onde não se pode embutir o
+middleware): o sidecar fica à frente do serviço e corre a cascata completa
+do `ElpOmegaMiddleware` (Zeckendorf, autorização, frescor, selo, replay,
+corpo vinculado, modelagem de taxa):
+
+- PRIME: o pedido segue em streaming para o upstream por conexões HTTP/1.1
+  keep-alive reutilizadas (`UpstreamPool`), sem bufferizar corpos;
+- SHADOW: respondido localmente, o upstream nunca vê o pedido;
+- MIRROR: a resposta do upstream é mascarada localmente.
+
+    ELP_SECRET_KEY=... python elp_sidecar.py --listen 0.0.0.0:8080 --upstream http://127.0.0.1:9000 --workers 4
+
+Os headers X-ELP-* (credenciais do pedido) e os hop-by-hop não são
+repassados. O upstream é HTTP simples: TLS termina no sidecar (ou na malha).
+Requer uvicorn (extra `server`) apenas para servir; `UpstreamProxy` é ASGI puro.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from collections import deque
+from typing import Optional
+from urllib.parse import urlsplit
+
+from elp_middleware import ElpOmegaMiddleware
+
+# Headers hop-by-hop (RFC 9110 §7.6.1) e os que o proxy reescreve
+_HOP_BY_HOP = frozenset((b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+                         b"proxy-connection", b"te", b"trailer", b"transfer-encoding", b"upgrade", b"expect"))
+# Únicos métodos repetidos numa conexão reaproveitada que fecha sem resposta
+_RETRY_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+_CHUNK = 65536
+_MAX_HEAD = 65536
+_BAD_GATEWAY = b'{"detail":"Bad Gateway"}'
+
+
+class UpstreamError(Exception):
+    """Upstream inacessível ou resposta inválida (o proxy responde 502 se ainda puder)."""
+
+
+class UpstreamPool:
+    """Conexões keep-alive para um único upstream, no máximo `max_connections` em uso ou ociosas."""
+
+    def __init__(self, host: str, port: int, max_connections: int = 64, idle_timeout: float = 30.0,
+                 connect_timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self._loop = None
+        self._idle = deque()  # (reader, writer, ocioso desde)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.opened = 0
+        self.reused = 0
+
+    def _bind(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Conexões de outro event loop não podem ser usadas
+            self._loop = loop
+            self._idle.clear()
+            self._slots = asyncio.Semaphore(self.max_connections)
+
+    async def acquire(self):
+        """(reader, writer, reutilizada)."""
+        self._bind()
+        await self._slots.acquire()
+        now = self._loop.time()
+        idle = self._idle
+        while idle and now - idle[0][2] >= self.idle_timeout:
+            idle.popleft()[1].close()
+        while idle:
+            # LIFO: a conexão usada mais recentemente é a que menos provavelmente o upstream fechou
+            reader, writer, _ = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                self.reused += 1
+                return reader, writer, True
+            writer.close()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, limit=_MAX_HEAD), self.connect_timeout)
+        except (OSError, asyncio.TimeoutError) as exc:
+            self._slots.release()
+            raise UpstreamError(f"upstream {self.host}:{self.port} inacessível: {exc!r}") from exc
+        self.opened += 1
+        return reader, writer, False
+
+    def release(self, reader, writer, reusable: bool) -> None:
+        if reusable and not writer.is_closing():
+            self._idle.append((reader, writer, self._loop.time()))
+        else:
+            writer.close()
+        self._slots.release()
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+class _ClientGone(Exception):
+    """O cliente desligou (ou o veredicto do corpo foi negativo) a meio do pedido."""
+
+
+class UpstreamProxy:
+    """App ASGI que encaminha cada pedido HTTP ao upstream, em streaming nos dois sentidos."""
+
+    def __init__(self, upstream: str, max_connections: int = 64, timeout: float = 30.0):
+        url = urlsplit(upstream)
+        if url.scheme != "http" or not url.hostname:
+            raise ValueError(f"upstream deve ser http://host[:porta][/prefixo], recebido {upstream!r}")
+        self.pool = UpstreamPool(url.hostname, url.port or 80, max_connections)
+        self.authority = url.netloc.encode("latin-1")
+        self.prefix = url.path.rstrip("/").encode("latin-1")
+        self.timeout = timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return  # websocket não é suportado pelo sidecar
+        # Corpo: Content-Length do cliente passa tal e qual; sem ele, um único chunk
+        # ganha Content-Length e um stream vira Transfer-Encoding: chunked
+        first = None
+        content_length = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                content_length = value
+        if content_length is None:
+            first = await receive()
+            if first["type"] == "http.disconnect":
+                return
+        retried = False
+        while True:
+            reader, writer, reused = await self._acquire(send)
+            if reader is None:
+                return
+            try:
+                reusable = await self._exchange(scope, receive, send, reader, writer, first, content_length)
+            except _ClientGone:
+                self.pool.release(reader, writer, False)
+                return
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                    UpstreamError) as exc:
+                self.pool.release(reader, writer, False)
+                # Conexão ociosa que o upstream fechou: um fecho sem resposta não prova que o
+                # pedido não foi processado, por isso só se repetem métodos sem efeitos
+                stale = (reused and not retried and isinstance(exc, _StaleConnection)
+                         and scope["method"] in _RETRY_METHODS)
+                if stale:
+                    retried = True
+                    continue
+                if not getattr(exc, "response_started", False):
+                    await _send_bad_gateway(send)
+                return
+            self.pool.release(reader, writer, reusable)
+            return
+
+    async def _acquire(self, send):
+        try:
+            return await self.pool.acquire()
+        except UpstreamError:
+            await _send_bad_gateway(send)
+            return None, None, False
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.pool.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _request_head(self, scope, framing: bytes) -> bytes:
+        target = self.prefix + (scope.get("raw_path") or scope["path"].encode("utf-8"))
+        if scope.get("query_string"):
+            target += b"?" + scope["query_string"]
+        lines = [scope["method"].encode("latin-1") + b" " + target + b" HTTP/1.1"]
+        forwarded_for = None
+        has_host = False
+        for name, value in scope["headers"]:
+            if name in _HOP_BY_HOP or name == b"content-length" or name.startswith(b"x-elp-"):
+                continue
+            if name == b"x-forwarded-for":
+                forwarded_for = value
+                continue
+            has_host = has_host or name == b"host"
+            lines.append(name + b": " + value)
+        if not has_host:
+            lines.append(b"host: " + self.authority)
+        client = scope.get("client")
+        if client:
+            ip = client[0].encode("latin-1")
+            lines.append(b"x-forwarded-for: " + (forwarded_for + b", " + ip if forwarded_for else ip))
+        lines.append(b"x-forwarded-proto: " + scope.get("scheme", "http").encode("latin-1"))
+        if framing:
+            lines.append(framing)
+        return b"\r\n".join(lines) + b"\r\n\r\n"
+
+    async def _exchange(self, scope, receive, send, reader, writer, first, content_length) -> bool:
+        """Um pedido/resposta na conexão dada. Devolve se a conexão pode voltar ao pool."""
+        # --- Pedido ---
+        if content_length is not None:
+            writer.write(self._request_head(scope, b"content-length: " + content_length))
+            await _stream_request(receive, writer, chunked=False)
+        elif not first.get("more_body", False):
+            body = first.get("body", b"")
+            framing = b"content-length: %d" % len(body) if body or scope["method"] not in ("GET", "HEAD") else b""
+            writer.write(self._request_head(scope, framing) + body)
+        else:
+            writer.write(self._request_head(scope, b"transfer-encoding: chunked"))
+            _write_chunk(writer, first.get("body", b""))
+            await _stream_request(receive, writer, chunked=True)
+
+        # --- Resposta ---
+        try:
+            await writer.drain()
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.timeout)
+            while head[9:10] == b"1":  # 1xx informativo (100 Continue): descartado
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.timeout)
+        except asyncio.IncompleteReadError as exc:
+            if not exc.partial and first is not None and not first.get("more_body", False):
+                # Nenhum byte de resposta e o pedido cabe num chunk já lido: pode ser repetido
+                raise _StaleConnection() from exc
+            raise
+        except ConnectionError as exc:
+            if first is not None and not first.get("more_body", False):
+                raise _StaleConnection() from exc
+            raise
+        status, headers, keep_alive, framing, length = _parse_response_head(head)
+        if scope["method"] == "HEAD" or status in (204, 304):
+            framing = "none"
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        try:
+            if framing == "none":
+                await send({"type": "http.response.body", "body": b""})
+            elif framing == "length":
+                remaining = length
+                while remaining > 0:
+                    chunk = await reader.read(min(remaining, _CHUNK))
+                    if not chunk:
+                        raise asyncio.IncompleteReadError(b"", remaining)
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if length == 0:
+                    await send({"type": "http.response.body", "body": b""})
+            elif framing == "chunked":
+                while True:
+                    size = int((await reader.readuntil(b"\r\n"))[:-2].split(b";", 1)[0], 16)
+                    if size == 0:
+                        while await reader.readuntil(b"\r\n") != b"\r\n":
+                            pass  # trailers descartados
+                        break
+                    chunk = await reader.readexactly(size)
+                    await reader.readexactly(2)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                await send({"type": "http.response.body", "body": b""})
+            else:
+                # Sem tamanho: o corpo termina quando o upstream fecha a conexão
+                keep_alive = False
+                while True:
+                    chunk = await reader.read(_CHUNK)
+                    if not chunk:
+                        break
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                await send({"type": "http.response.body", "body": b""})
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError) as exc:
+            error = UpstreamError(f"resposta do upstream interrompida: {exc!r}")
+            error.response_started = True
+            raise error from exc
+        return keep_alive
+
+
+class _StaleConnection(UpstreamError):
+    """A conexão reutilizada estava fechada do lado do upstream antes de qualquer resposta."""
+
+
+async def _stream_request(receive, writer, chunked: bool) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise _ClientGone()
+        body = message.get("body", b"")
+        if chunked:
+            _write_chunk(writer, body)
+        elif body:
+            writer.write(body)
+        await writer.drain()
+        if not message.get("more_body", False):
+            break
+    if chunked:
+        writer.write(b"0\r\n\r\n")
+
+
+def _write_chunk(writer, body: bytes) -> None:
+    if body:
+        writer.writelines((b"%x\r\n" % len(body), body, b"\r\n"))
+
+
+def _parse_response_head(head: bytes):
+    """(status, headers ASGI, keep-alive, framing, tamanho) de uma resposta HTTP/1.x."""
+    lines = head[:-4].split(b"\r\n")
+    parts = lines[0].split(b" ", 2)
+    if len(parts) < 2 or not parts[0].startswith(b"HTTP/1.") or not parts[1].isdigit():
+        raise UpstreamError(f"linha de status inválida: {lines[0][:80]!r}")
+    status = int(parts[1])
+    keep_alive = parts[0] == b"HTTP/1.1"
+    framing, length = "close", None
+    headers = []
+    for line in lines[1:]:
+        name, sep, value = line.partition(b":")
+        if not sep:
+            raise UpstreamError(f"header inválido: {line[:80]!r}")
+        name, value = name.strip().lower(), value.strip()
+        if name == b"connection":
+            tokens = value.lower()
+            keep_alive = b"close" not in tokens and (keep_alive or b"keep-alive" in tokens)
+        elif name == b"transfer-encoding":
+            framing = "chunked" if value.lower().endswith(b"chunked") else "close"
+        elif name == b"content-length":
+            if framing != "chunked":
+                if not value.isdigit():
+                    raise UpstreamError(f"Content-Length inválido: {value[:40]!r}")
+                framing, length = "length", int(value)
+            headers.append((name, value))
+        elif name not in _HOP_BY_HOP:
+            headers.append((name, value))
+    if framing == "chunked":
+        # O servidor ASGI define o próprio framing para o cliente
+        headers = [(n, v) for n, v in headers if n != b"content-length"]
+    return status, headers, keep_alive, framing, length
+
+
+async def _send_bad_gateway(send) -> None:
+    await send({"type": "http.response.start", "status": 502,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", b"%d" % len(_BAD_GATEWAY))]})
+    await send({"type": "http.response.body", "body": _BAD_GATEWAY})
+
+
+def create_sidecar(upstream: str, shared=None, secret_key: str = None, max_connections: int = 64,
+                   timeout: float = 30.0, **middleware_options) -> ElpOmegaMiddleware:
+    """ElpOmegaMiddleware à frente de um UpstreamProxy (com `shared`, estado do runner pre-fork)."""
+    engine = shared.build_engine() if shared is not None else None
+    proxy = UpstreamProxy(upstream, max_connections=max_connections, timeout=timeout)
+    return ElpOmegaMiddleware(proxy, secret_key=secret_key, engine=engine, **middleware_options)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sidecar reverse-proxy ELP-Ω")
+    parser.add_argument("--listen", default="127.0.0.1:8080", help="host:porta")
+    parser.add_argument("--upstream", required=True, help="http://host:porta[/prefixo] do serviço protegido")
+    parser.add_argument("--workers", type=int, default=1, help="> 1 ativa o runner pre-fork (SO_REUSEPORT)")
+    parser.add_argument("--keyring-file", help="Uma chave por linha; senão ELP_SECRET_KEY/ELP_PREVIOUS_KEYS")
+    parser.add_argument("--max-connections", type=int, default=64, help="Conexões ao upstream por worker")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Espera máxima pelos headers do upstream (s)")
+    parser.add_argument("--rate", type=float, default=0, help="Pedidos/s por fingerprint antes da Shadow barata (0 = sem limite)")
+    parser.add_argument("--log-level", default="error")
+    args = parser.parse_args(argv)
+
+    from elp_shared import Keyring, SharedState
+
+    if args.keyring_file:
+        load_keyring = lambda: Keyring.from_file(args.keyring_file)
+    elif os.environ.get("ELP_SECRET_KEY"):
+        load_keyring = Keyring.from_env
+    else:
+        parser.error("defina --keyring-file ou ELP_SECRET_KEY")
+    host, _, port = args.listen.rpartition(":")
+    shared = SharedState(load_keyring())
+
+    def factory(shared_state):
+        options = {}
+        if args.rate > 0:
+            from elp_shaper import GcraShaper
+            options["shaper"] = GcraShaper(rate=args.rate, burst=int(args.rate * 2))
+        return create_sidecar(args.upstream, shared_state, max_connections=args.max_connections,
+                              timeout=args.timeout, **options)
+
+    if args.workers > 1:
+        from elp_prefork import PreforkRunner
+        PreforkRunner(factory, shared, host=host, port=int(port), workers=args.workers,
+                      keyring_loader=load_keyring, log_level=args.log_level).run()
+    else:
+        import uvicorn
+        uvicorn.run(factory(shared), host=host, port=int(port), log_level=args.log_level)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
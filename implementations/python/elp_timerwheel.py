@@ -0,0 +1,129 @@
+"""
+Roda de Temporização Hierárquica para as respostas Shadow atrasadas.
+
+Com `asyncio.sleep` cada conexão em jitter custa um TimerHandle no heap do
+event loop (inserção/remoção O(log n)) e um future próprio. Com dezenas de
+milhares de conexões presas na Shadow, o heap domina. A `TimerWheel`:
+
+- agrupa os atrasos em baldes de 1 ms: todas as conexões do mesmo balde
+  esperam pelo MESMO future, resolvido de uma só vez;
+- guarda os baldes numa roda de `levels` níveis de 256 posições (1 ms,
+  256 ms, 65 s), com cascata para o nível de baixo quando a roda dá a volta;
+- mantém um único `call_at` no loop, para o próximo balde ocupado.
+
+O cancelamento de uma conexão (cliente desligou) não cancela o balde
+partilhado: a tarefa termina quando o balde dispara, no máximo o atraso
+que já tinha pedido.
+"""
+import asyncio
+import math
+from typing import Optional
+
+
+class _Bucket(asyncio.Future):
+    """Future partilhado por um balde: só a roda o resolve."""
+
+    def cancel(self, msg=None) -> bool:
+        return False
+
+
+class TimerWheel:
+    def __init__(self, tick: float = 0.001, bits: int = 8, levels: int = 3):
+        self.tick = tick
+        self._bits = bits
+        self._mask = (1 << bits) - 1
+        self._levels = levels
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reset()
+        self.wakeups = 0
+
+    def _reset(self, loop=None) -> None:
+        self._loop = loop
+        self._wheel = [[[] for _ in range(1 << self._bits)] for _ in range(self._levels)]
+        self._buckets = {}  # tick de vencimento -> _Bucket
+        self._cursor: Optional[int] = None  # último tick já processado
+        self._handle = None
+        self._armed_at: Optional[int] = None
+        self.parked = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def sleep(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Roda nova por event loop: futures de outro loop não podem ser aguardados
+            self._reset(loop)
+        now_tick = int(loop.time() / self.tick)
+        if self._cursor is None:
+            self._cursor = now_tick
+        due = max(now_tick + max(1, math.ceil(delay / self.tick)), self._cursor + 1)
+        bucket = self._buckets.get(due)
+        if bucket is None:
+            bucket = self._buckets[due] = _Bucket(loop=loop)
+            self._place(due)
+            self._arm(due)
+        self.parked += 1
+        try:
+            await bucket
+        finally:
+            self.parked -= 1
+
+    def _place(self, due: int) -> None:
+        delta, level = due - self._cursor, 0
+        while level < self._levels - 1 and delta >> (self._bits * (level + 1)):
+            level += 1
+        # Vencido ou na volta atual do nível 0: posição do próprio tick
+        slot = (max(due, self._cursor) >> (self._bits * level)) & self._mask
+        self._wheel[level][slot].append(due)
+
+    def _arm(self, due: int) -> None:
+        target = self._next_wakeup() if due is None else due
+        if target is None or (self._armed_at is not None and self._armed_at <= target):
+            return
+        if self._handle is not None:
+            self._handle.cancel()
+        self._armed_at = target
+        self._handle = self._loop.call_at(target * self.tick, self._run)
+
+    def _next_wakeup(self) -> Optional[int]:
+        if not self._buckets:
+            return None
+        # Primeiro balde ocupado até ao fim da volta atual do nível 0; senão, a próxima cascata
+        level0, cursor = self._wheel[0], self._cursor
+        boundary = (cursor | self._mask) + 1
+        for tick in range(cursor + 1, boundary):
+            if level0[tick & self._mask]:
+                return tick
+        return boundary
+
+    def _run(self) -> None:
+        self.wakeups += 1
+        self._handle = None
+        target = max(int(self._loop.time() / self.tick), self._armed_at)
+        self._armed_at = None
+        wheel, bits, mask = self._wheel, self._bits, self._mask
+        while self._cursor < target and self._buckets:
+            self._cursor += 1
+            cursor = self._cursor
+            # Cascata: ao dar a volta num nível, o slot correspondente do nível de cima desce
+            level = 1
+            while level < self._levels and (cursor >> (bits * (level - 1))) & mask == 0:
+                slot = wheel[level][(cursor >> (bits * level)) & mask]
+                if slot:
+                    wheel[level][(cursor >> (bits * level)) & mask] = []
+                    for due in slot:
+                        self._place(due)
+                level += 1
+            slot = wheel[0][cursor & mask]
+            if slot:
+                wheel[0][cursor & mask] = []
+                for due in slot:
+                    bucket = self._buckets.pop(due, None)
+                    if bucket is not None:
+                        bucket.set_result(None)
+        if self._buckets:
+            self._arm(None)
+        else:
+            # Roda vazia: o próximo sleep reposiciona o cursor sem percorrer o tempo ocioso
+            self._cursor = None
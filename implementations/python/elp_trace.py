@@ -0,0 +1,366 @@
+"""
+Captura de Tráfego e Simulador Offline para Planeamento de Capacidade.
+
+Captura: com `capture=TraceCapture("trace.bin", sample_rate=0.01)` nos
+adaptadores, uma amostra de fingerprints (todos os pedidos de ~1% dos
+clientes, escolhidos por hash) é gravada num trace binário compacto: headers
+X-ELP-* já interpretados, veredicto do selo, realidade, estágio e latência.
+Amostrar por cliente, e não por pedido, preserva o que interessa aos stores
+por cliente (nonces, GCRA, drift). O caminho de requisição só enfileira; a
+escrita é a mesma thread em lotes do `elp_events.EventLog`.
+
+Simulação: o trace é reproduzido contra os componentes reais do engine
+(ElpGuard, nonce store, GcraShaper, ClockDriftEstimator, CheapShadowCache)
+sem HTTP e com relógio virtual (o `ts_ms` de cada registo), muitas vezes
+mais rápido que o tempo real. O HMAC é calculado de verdade (custo), mas o
+veredicto vem do trace. Para cada configuração candidata sai o pico de
+memória, os picos de entradas por store, as taxas de acerto e a vazão de
+decisões, já escalados pela taxa de amostragem.
+
+Uso (CLI):
+    python elp_trace.py info trace.bin
+    python elp_trace.py simulate trace.bin trace.bin.1 --candidate "" --candidate "nonce_store=window,drift=1"
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import struct
+import sys
+import time
+import tracemalloc
+import zlib
+from collections import Counter, namedtuple
+from typing import List, Tuple
+
+from elp_events import REALITY_CODES, STAGE_CODES, EventLog, Stage, _RotatingFile
+from elp_guard import ElpGuard, json_body
+from elp_mask import TIMESTAMP_MAX_DIGITS, parse_bounded_int
+from elp_omega import EntangledLogicOmegaV5, Reality, nonce_digest
+
+TraceRecord = namedtuple("TraceRecord",
+                         "ts_ms fingerprint method path mask timestamp nonce body seal_ok reality stage latency_ms")
+
+# Cabeçalho: magic + taxa de amostragem (double); registos de 30 bytes + strings em UTF-8
+TRACE_MAGIC = b"ELPT\x01"
+_TRACE_HEADER = struct.Struct("<d")
+_TRACE_RECORD = struct.Struct("<qqfBBBHBHBB")
+_FLAG_SEAL_OK = 1
+_FLAG_BODY = 2
+# Nível de taxa: o selo nunca foi conferido em produção
+_FLAG_SEAL_UNKNOWN = 4
+_MAX_SHORT = 255
+_MAX_LONG = 65535
+
+_REALITY_INDEX = {name: i for i, name in enumerate(REALITY_CODES)}
+_STAGE_INDEX = {name: i for i, name in enumerate(STAGE_CODES)}
+
+
+class TraceSink:
+    """Registos binários do trace, com a mesma rotação por tamanho dos logs de eventos."""
+
+    def __init__(self, path: str, sample_rate: float, max_bytes: int = 256 << 20, backups: int = 5):
+        self._file = _RotatingFile(path, max_bytes, backups, header=TRACE_MAGIC + _TRACE_HEADER.pack(sample_rate))
+
+    def write_batch(self, records: List[TraceRecord]) -> None:
+        chunks = []
+        for r in records:
+            fingerprint, method = r.fingerprint.encode()[:_MAX_LONG], r.method.encode()[:_MAX_SHORT]
+            path, mask = r.path.encode()[:_MAX_LONG], r.mask.encode()[:_MAX_SHORT]
+            nonce = r.nonce.encode()
+            if len(nonce) > _MAX_SHORT:
+                # Truncar juntaria nonces distintos; o digest preserva a unicidade
+                nonce = nonce_digest(r.nonce).hex().encode()
+            flags = ((_FLAG_SEAL_OK if r.seal_ok else 0) | (_FLAG_BODY if r.body else 0)
+                     | (_FLAG_SEAL_UNKNOWN if r.seal_ok is None else 0))
+            chunks.append(_TRACE_RECORD.pack(
+                r.ts_ms, r.timestamp, r.latency_ms, _REALITY_INDEX[r.reality], _STAGE_INDEX[r.stage], flags,
+                len(fingerprint), len(method), len(path), len(mask), len(nonce),
+            ))
+            chunks.append(fingerprint + method + path + mask + nonce)
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_trace(path: str) -> Tuple[float, List[TraceRecord]]:
+    """(taxa de amostragem, registos) de um ficheiro de trace."""
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if not data.startswith(TRACE_MAGIC):
+        raise ValueError(f"{path} não é um trace ELP-Ω")
+    (sample_rate,) = _TRACE_HEADER.unpack_from(data, len(TRACE_MAGIC))
+    offset = len(TRACE_MAGIC) + _TRACE_HEADER.size
+    records = []
+    while offset < len(data):
+        (ts_ms, timestamp, latency, reality, stage, flags,
+         fp_len, m_len, p_len, mask_len, nonce_len) = _TRACE_RECORD.unpack_from(data, offset)
+        offset += _TRACE_RECORD.size
+        fields = []
+        for length in (fp_len, m_len, p_len, mask_len, nonce_len):
+            fields.append(data[offset:offset + length].decode())
+            offset += length
+        fingerprint, method, path_, mask, nonce = fields
+        records.append(TraceRecord(ts_ms, fingerprint, method, path_, mask, timestamp, nonce,
+                                   bool(flags & _FLAG_BODY),
+                                   None if flags & _FLAG_SEAL_UNKNOWN else bool(flags & _FLAG_SEAL_OK),
+                                   REALITY_CODES[reality], STAGE_CODES[stage], latency))
+    return sample_rate, records
+
+
+class TraceCapture(EventLog):
+    """
+    Captura amostrada para os adaptadores. Herda o anel não-bloqueante e a
+    thread escritora do EventLog; com o anel cheio o registo é descartado.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 0.01, capacity: int = 65536, batch_size: int = 1024,
+                 flush_interval: float = 0.5, max_bytes: int = 256 << 20, backups: int = 5):
+        if not 0.0 < sample_rate <= 1.0:
+            raise ValueError(f"sample_rate deve estar em (0, 1]: {sample_rate!r}")
+        super().__init__(TraceSink(path, sample_rate, max_bytes, backups), capacity, batch_size, flush_interval)
+        self.sample_rate = sample_rate
+        self._threshold = int(sample_rate * (1 << 32))
+        self.engine = None
+
+    def bind(self, engine) -> None:
+        self.engine = engine
+
+    def sample(self, fingerprint: str) -> bool:
+        """Mesmo cliente, mesma decisão: crc32 do fingerprint abaixo do limiar."""
+        return zlib.crc32(fingerprint.encode()) < self._threshold
+
+    def record(self, check, seal_ok, reality: str, stage: str, latency_ms: float) -> bool:
+        """
+        `check` é o RequestCheck do pedido. `seal_ok=None` quando um estágio
+        anterior falhou: o trace precisa do veredicto para simular
+        configurações mais permissivas, por isso é calculado aqui, só para os
+        pedidos amostrados.
+        """
+        if seal_ok is None:
+            seal_ok = self.engine.verify_seal(*check.seal_args())
+        return self.ring.offer(TraceRecord(
+            int(time.time() * 1000), check.fingerprint, check.method, check.path,
+            str(check.mask) if check.mask >= 0 else "", check.timestamp, check.nonce,
+            check.body_digest is not None, seal_ok, reality, stage, round(latency_ms, 3),
+        ))
+
+
+    def record_rate_limited(self, fingerprint: str, method: str, path: str, headers: dict, reality: str,
+                            stage: str, latency_ms: float) -> bool:
+        """
+        Nível de taxa: corre antes de qualquer HMAC e o trace não muda isso.
+        Os headers vão crus (só o timestamp é convertido) e o selo fica por
+        conferir (seal_ok=None); o simulador trata-o como válido.
+        """
+        return self.ring.offer(TraceRecord(
+            int(time.time() * 1000), fingerprint, method, path, headers.get("mask") or "",
+            parse_bounded_int(headers.get("timestamp"), TIMESTAMP_MAX_DIGITS) or 0, headers.get("nonce", ""),
+            bool(headers.get("body_digest")), None, reality, stage, round(latency_ms, 3),
+        ))
+
+
+class _Candidate:
+    """Componentes reais montados para uma configuração candidata."""
+
+    def __init__(self, max_age_ms: int = 300000, mask_width: int = 64, nonce_store: str = "dict",
+                 window: int = 1024, drift: int = 0, tight_window_ms: int = 5000, max_drift_ms: int = 20000,
+                 rate: float = 0.0, burst: int = 40, max_fingerprints: int = 100_000,
+                 cheap_entities: int = 1024, cheap_ttl: float = 1.0, route_policies=None):
+        if nonce_store == "window":
+            from elp_replay_window import SequenceWindowStore
+            store = SequenceWindowStore(max_age_ms, window=window)
+        elif nonce_store == "dict":
+            store = None
+        else:
+            raise ValueError(f"nonce_store desconhecido: {nonce_store!r} (dict ou window)")
+        self.engine = EntangledLogicOmegaV5(b"elp-trace-simulation", max_age_ms=max_age_ms,
+                                            mask_width=mask_width, nonce_store=store)
+        self.store = self.engine._used_nonces
+        self.drift = None
+        if drift:
+            from elp_drift import ClockDriftEstimator
+            self.drift = ClockDriftEstimator(max_age_ms, tight_window_ms, max_drift_ms)
+        self.guard = ElpGuard(self.engine, drift_estimator=self.drift, route_policies=route_policies)
+        self.shaper = self.cheap = None
+        if rate:
+            from elp_shaper import CheapShadowCache, GcraShaper
+            self.shaper = GcraShaper(rate, burst, max_fingerprints)
+            self.cheap = CheapShadowCache(self.engine, cheap_entities, cheap_ttl)
+
+    def sizes(self) -> dict:
+        return {"nonces": len(self.store), "drift_clients": len(self.drift) if self.drift else 0,
+                "shaper_fingerprints": len(self.shaper) if self.shaper else 0,
+                "cheap_entities": len(self.cheap._bodies) if self.cheap else 0}
+
+
+_PLACEHOLDER_SEAL = "0" * 64
+_BODY_DIGEST = "0" * 64
+
+
+def _replay(records: List[TraceRecord], candidate: _Candidate, sample_every: int = 1024) -> dict:
+    """Uma passagem do trace; devolve contadores e picos de entradas por store."""
+    guard, engine, shaper, cheap = candidate.guard, candidate.engine, candidate.shaper, candidate.cheap
+    decisions, peaks = Counter(), Counter()
+    cheap_lookups = 0
+    for i, r in enumerate(records):
+        policy = guard.policy(r.path)
+        if policy.bypass:
+            decisions["bypass"] += 1
+            continue
+        if shaper is not None and not shaper.allow(r.fingerprint, r.ts_ms / 1000):
+            cheap.body(r.method, r.path, r.ts_ms / 1000, template=policy.shadow_template)
+            cheap_lookups += 1
+            decisions[(Reality.SHADOW, Stage.RATE)] += 1
+            continue
+        headers = {"mask": r.mask, "timestamp": str(r.timestamp), "nonce": r.nonce}
+        if r.body:
+            headers["body_digest"] = _BODY_DIGEST
+        check = guard.precheck(r.method, r.path, headers, r.fingerprint, now_ms=r.ts_ms, policy=policy)
+        seal_ok = False
+        if check.failed_stage is None:
+            # HMAC real para o custo; o veredicto é o de produção. Sem veredicto (pedido
+            # limitado em produção) conta como válido: o pior caso para os stores
+            engine.verify_seal(_PLACEHOLDER_SEAL, *check.seal_args()[1:])
+            seal_ok = r.seal_ok is not False
+        reality, stage = guard.finish(check, seal_ok)
+        if reality != Reality.SHADOW and r.stage == Stage.BODY:
+            # O corpo adulterado não se reconstrói offline: vale o veredicto capturado
+            reality, stage = Reality.SHADOW, Stage.BODY
+        if reality == Reality.SHADOW:
+            json_body(engine.generate_shadow("STRUCT", r.method, r.path, r.nonce, policy.shadow_template))
+        decisions[(reality, stage)] += 1
+        if i % sample_every == 0:
+            for name, size in candidate.sizes().items():
+                peaks[name] = max(peaks[name], size)
+    for name, size in candidate.sizes().items():
+        peaks[name] = max(peaks[name], size)
+    return {"decisions": decisions, "peaks": peaks, "cheap_lookups": cheap_lookups}
+
+
+def _peak_rps(records: List[TraceRecord]) -> int:
+    per_second = Counter(r.ts_ms // 1000 for r in records)
+    return max(per_second.values()) if per_second else 0
+
+
+def simulate(records: List[TraceRecord], sample_rate: float = 1.0, memory: bool = True, **options) -> dict:
+    """
+    Reproduz o trace (ordenado por ts_ms) contra uma configuração candidata.
+    A vazão é medida numa passagem sem tracemalloc; com `memory=True`, uma
+    segunda passagem com componentes novos mede o pico de bytes alocados.
+    """
+    scale = 1.0 / sample_rate
+    candidate = _Candidate(**options)
+    gc.collect()
+    started = time.perf_counter()
+    result = _replay(records, candidate)
+    elapsed = time.perf_counter() - started
+
+    decisions, peaks = result["decisions"], result["peaks"]
+    total = len(records)
+    span_s = (records[-1].ts_ms - records[0].ts_ms) / 1000 if total > 1 else 0.0
+    decisions_per_s = total / elapsed if elapsed else 0.0
+    peak_rps = _peak_rps(records) * scale
+    realities, stages = Counter(), Counter()
+    for key, n in decisions.items():
+        if key == "bypass":
+            realities["BYPASS"] += n
+        else:
+            realities[key[0]] += n
+            if key[1]:
+                stages[key[1]] += n
+    limited = stages.get(Stage.RATE, 0)
+    report = {
+        "options": {k: v for k, v in options.items() if k != "route_policies"},
+        "requests": total,
+        "sample_rate": sample_rate,
+        "trace_seconds": round(span_s, 3),
+        "speedup": round(span_s / elapsed, 1) if elapsed else None,
+        "decisions_per_s": round(decisions_per_s),
+        "peak_rps": round(peak_rps),
+        # Só a cascata (sem a app nem o jitter): núcleos necessários no pico de tráfego
+        "cascade_cores": math.ceil(peak_rps / decisions_per_s) if decisions_per_s else None,
+        "realities": dict(realities),
+        "stages": dict(stages),
+        "peak_entries": {name: round(n * scale) for name, n in peaks.items() if n},
+        "replay_ratio": round(stages.get(Stage.REPLAY, 0) / total, 4) if total else 0.0,
+        "limited_ratio": round(limited / total, 4) if total else 0.0,
+    }
+    if result["cheap_lookups"]:
+        report["cheap_hit_ratio"] = round(1 - candidate.cheap.built / result["cheap_lookups"], 4)
+    if memory:
+        candidate = None
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        candidate = _Candidate(**options)
+        _replay(records, candidate)
+        peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+        report["peak_mib"] = round(peak_bytes * scale / 2 ** 20, 1)
+    return report
+
+
+def load_traces(paths) -> Tuple[float, List[TraceRecord]]:
+    """Junta ficheiros rodados (mesma taxa de amostragem) numa única linha temporal."""
+    rates, records = set(), []
+    for path in paths:
+        rate, part = read_trace(path)
+        rates.add(rate)
+        records.extend(part)
+    if len(rates) > 1:
+        raise ValueError(f"Traces com taxas de amostragem diferentes: {sorted(rates)}")
+    records.sort(key=lambda r: r.ts_ms)
+    return (rates.pop() if rates else 1.0), records
+
+
+def _parse_candidate(text: str) -> dict:
+    options = {}
+    for item in filter(None, text.split(",")):
+        key, _, value = item.partition("=")
+        for cast in (int, float):
+            try:
+                value = cast(value)
+                break
+            except ValueError:
+                pass
+        options[key.strip()] = value
+    return options
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Traces de tráfego ELP-Ω: resumo e simulação offline")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info")
+    info.add_argument("files", nargs="+")
+    simulate_cmd = sub.add_parser("simulate")
+    simulate_cmd.add_argument("files", nargs="+")
+    simulate_cmd.add_argument("--candidate", action="append",
+                              help="opções separadas por vírgula, ex.: nonce_store=window,drift=1,rate=20")
+    simulate_cmd.add_argument("--no-memory", action="store_true", help="salta a passagem com tracemalloc")
+    args = parser.parse_args(argv)
+
+    sample_rate, records = load_traces(args.files)
+    if args.command == "info":
+        realities = Counter(r.reality for r in records)
+        span = (records[-1].ts_ms - records[0].ts_ms) / 1000 if len(records) > 1 else 0.0
+        print(json.dumps({"requests": len(records), "sample_rate": sample_rate, "trace_seconds": span,
+                          "fingerprints": len({r.fingerprint for r in records}), "realities": dict(realities),
+                          "bytes": sum(os.path.getsize(p) for p in args.files)}, ensure_ascii=False))
+        return 0
+
+    for text in args.candidate or [""]:
+        try:
+            report = simulate(records, sample_rate, memory=not args.no_memory, **_parse_candidate(text))
+        except (TypeError, ValueError) as exc:
+            print(f"candidato inválido {text!r}: {exc}", file=sys.stderr)
+            return 2
+        print(json.dumps(report, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
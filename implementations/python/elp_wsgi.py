@@ -0,0 +1,260 @@
+"""
+Middleware ELP-Ω para WSGI (Flask, Django, gunicorn com threads).
+
+Mesma cascata de validação do adaptador ASGI (elp_guard). Cada pedido corre
+na sua própria thread, por isso o engine padrão é criado com
+`thread_safe=True` (nonces em faixas com lock próprio) e o jitter da Shadow
+pode ser um `time.sleep` simples: só bloqueia a thread do atacante.
+
+    app.wsgi_app = ElpOmegaWSGIMiddleware(app.wsgi_app, secret_key="...")
+"""
+import random
+import sys
+import time
+from typing import Optional
+
+from elp_events import Span, Stage
+from elp_guard import BodyDigest, ConfigSnapshot, ElpGuard, json_body, mirror_body
+from elp_omega import EntangledLogicOmegaV5, Reality
+
+# Headers X-ELP-* como aparecem no environ WSGI (PEP 3333)
+_ELP_ENVIRON = {"mask": "HTTP_X_ELP_MASK", "seal": "HTTP_X_ELP_SEAL",
+                "timestamp": "HTTP_X_ELP_TIMESTAMP", "nonce": "HTTP_X_ELP_NONCE",
+                "body_digest": "HTTP_X_ELP_BODY_DIGEST"}
+
+
+def _elp_headers(environ) -> dict:
+    return {key: environ[name] for key, name in _ELP_ENVIRON.items() if name in environ}
+
+
+class BodyDigestMismatch(OSError):
+    """O corpo lido não corresponde ao X-ELP-Body-Digest assinado (para a app: cliente desligou)."""
+
+
+class _DigestInput:
+    """
+    `wsgi.input` que alimenta o SHA-256 à medida que a app lê. O veredicto sai
+    quando o CONTENT_LENGTH se esgota (ou na leitura vazia, sem tamanho) e,
+    se negativo, a leitura que entregaria o fim do corpo levanta BodyDigestMismatch.
+    """
+
+    def __init__(self, stream, digest: BodyDigest, content_length: Optional[int]):
+        self.stream = stream
+        self.digest = digest
+        self.remaining = content_length
+
+    def _feed(self, chunk: bytes) -> bytes:
+        if self.digest.verdict is False:
+            raise BodyDigestMismatch("corpo não corresponde ao digest assinado")
+        if self.digest.verdict is None:
+            self.digest.update(chunk)
+            if self.remaining is not None:
+                self.remaining -= len(chunk)
+            if (not chunk or self.remaining is not None and self.remaining <= 0) and not self.digest.finish():
+                raise BodyDigestMismatch("corpo não corresponde ao digest assinado")
+        return chunk
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.remaining if self.remaining is not None else -1
+        return self._feed(self.stream.read(size))
+
+    def readline(self, size: int = -1) -> bytes:
+        if self.remaining is not None and (size is None or size < 0 or size > self.remaining):
+            size = self.remaining
+        return self._feed(self.stream.readline(size))
+
+    def readlines(self, hint: int = -1) -> list:
+        return list(iter(self.readline, b""))
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+
+def _json_response(start_response, body: bytes, status: str = "200 OK", exc_info=None):
+    # NÃO incluímos headers reveladores.
+    # exc_info: a app pode já ter chamado start_response antes de a resposta ser substituída
+    start_response(status, [("Content-Type", "application/json"), ("Content-Length", str(len(body)))], exc_info)
+    return [body]
+
+
+def _content_length(environ) -> Optional[int]:
+    try:
+        return int(environ.get("CONTENT_LENGTH") or "")
+    except ValueError:
+        return None
+
+
+class ElpOmegaWSGIMiddleware:
+    def __init__(self, app, secret_key: str = None, route_authorizer=None, mask_width: int = 64,
+                 engine: EntangledLogicOmegaV5 = None, event_log=None, drift_estimator=None,
+                 shaper=None, route_policies=None, capture=None, hot_config=None, tracer=None):
+        self.app = app
+        # Log de eventos de segurança (elp_events.EventLog), opcional e não-bloqueante
+        self.event_log = event_log
+        # Trace amostrado para simulação offline (elp_trace.TraceCapture), opcional
+        self.capture = capture
+        # Spans por estágio em 1 de cada N pedidos (elp_profile.StageTracer), opcional
+        self.tracer = tracer
+        # Modelagem de taxa por fingerprint (elp_shaper.GcraShaper), opcional
+        self.shaper = shaper
+        # Reconfiguração a quente (elp_config.HotConfig, com thread_safe=True): trocas chegam por install()
+        if hot_config is not None:
+            hot_config.subscribe(self.install)
+            return
+        # Um engine pronto tem precedência; o padrão é seguro entre threads
+        if engine is None:
+            engine = EntangledLogicOmegaV5(secret=secret_key.encode(), mask_width=mask_width, thread_safe=True)
+        self.install(ConfigSnapshot(0, None, engine, ElpGuard(engine, route_authorizer, drift_estimator,
+                                                              route_policies)))
+
+    def install(self, snapshot: ConfigSnapshot) -> None:
+        """Publica um snapshot de configuração; cada pedido lê `self.snapshot` uma única vez."""
+        if self.capture is not None:
+            self.capture.bind(snapshot.engine)
+        if self.shaper is not None:
+            from elp_shaper import CheapShadowCache
+            self._cheap_shadow = CheapShadowCache(snapshot.engine)
+        self.snapshot = snapshot
+
+    @property
+    def security_engine(self) -> EntangledLogicOmegaV5:
+        return self.snapshot.engine
+
+    @property
+    def guard(self) -> ElpGuard:
+        return self.snapshot.guard
+
+    def _fingerprint(self, environ) -> str:
+        """Identidade do cliente para logs e estatísticas (sobrescreva para usar headers do proxy)."""
+        return environ.get("REMOTE_ADDR", "")
+
+    def __call__(self, environ, start_response):
+        # O cliente assina o path completo, incluindo o ponto de montagem da app
+        path = environ.get("SCRIPT_NAME", "") + environ.get("PATH_INFO", "")
+        # Uma única leitura: o pedido inteiro corre sobre este snapshot, mesmo que outro seja publicado
+        snapshot = self.snapshot
+        guard, engine = snapshot.guard, snapshot.engine
+        # Rotas em bypass (health checks, estáticos) não pagam nada da cascata
+        policy = guard.policy(path)
+        if policy.bypass:
+            return self.app(environ, start_response)
+
+        started = time.perf_counter()
+        spans = self.tracer.begin() if self.tracer is not None else None
+        fingerprint = self._fingerprint(environ)
+        method = environ.get("REQUEST_METHOD", "GET")
+        template = policy.shadow_template
+        if self.shaper is not None and not self.shaper.allow(fingerprint):
+            # Nível barato: corpo em cache, sem parsing de headers nem HMAC
+            time.sleep(random.uniform(0.015, 0.060))
+            if spans is not None:
+                spans.mark(Span.JITTER)
+            self._emit(Reality.SHADOW, Stage.RATE, fingerprint, method, path, started, environ=environ)
+            response = _json_response(start_response, self._cheap_shadow.body(method, path, template=template))
+            if spans is not None:
+                spans.mark(Span.CHEAP)
+                self.tracer.end(spans, Reality.SHADOW, Stage.RATE, method, path)
+            return response
+        headers = _elp_headers(environ)
+        # Cascata do guard.evaluate, desdobrada para o trace conhecer o pedido e o veredicto do selo
+        check = guard.precheck(method, path, headers, fingerprint, policy=policy)
+        if spans is not None:
+            spans.mark(Span.PARSE)
+        seal_ok = check.failed_stage is None and engine.verify_seal(*check.seal_args())
+        if spans is not None and check.failed_stage is None:
+            spans.mark(Span.SEAL)
+        reality, stage = guard.finish(check, seal_ok)
+        if spans is not None:
+            spans.mark(Span.NONCE)
+
+        if reality == Reality.SHADOW:
+            response = self._serve_shadow_reality(start_response, method, path, environ.get("HTTP_X_ELP_NONCE", ""),
+                                                  template=template, engine=engine, spans=spans)
+        else:
+            digest = None
+            if headers.get("body_digest"):
+                # Corpo vinculado ao selo: conferido em streaming enquanto a app o lê
+                digest = BodyDigest(headers["body_digest"])
+                environ["wsgi.input"] = _DigestInput(environ.get("wsgi.input"), digest, _content_length(environ))
+            try:
+                if reality == Reality.MIRROR:
+                    response = self._serve_mirror_reality(environ, start_response, method, path, template, engine)
+                else:
+                    # Prime Reality: o iterável da app segue intacto (streaming preservado)
+                    response = self.app(environ, start_response)
+            except BodyDigestMismatch:
+                reality, stage = Reality.SHADOW, Stage.BODY
+                response = self._serve_shadow_reality(start_response, method, path,
+                                                      environ.get("HTTP_X_ELP_NONCE", ""), sys.exc_info(), template,
+                                                      engine)
+            else:
+                if digest is not None and digest.verdict is False:
+                    # A app (Flask, Django) apanhou o BodyDigestMismatch e respondeu por conta própria:
+                    # a resposta dela é descartada antes de qualquer byte sair
+                    if hasattr(response, "close"):
+                        response.close()
+                    reality, stage = Reality.SHADOW, Stage.BODY
+                    mismatch = BodyDigestMismatch("corpo não corresponde ao digest assinado")
+                    response = self._serve_shadow_reality(start_response, method, path,
+                                                          environ.get("HTTP_X_ELP_NONCE", ""),
+                                                          (BodyDigestMismatch, mismatch, None), template, engine)
+        if spans is not None:
+            # WSGI: "app" cobre a chamada; o iterável da resposta é consumido depois pelo servidor
+            if reality != Reality.SHADOW or stage == Stage.BODY:
+                spans.mark(Span.APP)
+            self.tracer.end(spans, reality, stage, method, path)
+        self._emit(reality, stage, fingerprint, method, path, started, check,
+                   seal_ok if check.failed_stage is None else None)
+        return response
+
+    def _serve_mirror_reality(self, environ, start_response, method, path, template="banking", engine=None):
+        """Resposta real mascarada; respostas não-JSON seguem para a Shadow."""
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured["status"], captured["headers"] = status, headers
+            return lambda data: None
+
+        result = self.app(environ, capture)
+        try:
+            raw = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        content_type = next((v for k, v in captured.get("headers", ()) if k.lower() == "content-type"), "")
+        engine = engine or self.snapshot.engine
+        body = mirror_body(engine, content_type, raw)
+        if body is None:
+            return self._serve_shadow_reality(start_response, method, path, environ.get("HTTP_X_ELP_NONCE", ""),
+                                              template=template, engine=engine)
+        return _json_response(start_response, body, captured.get("status", "200 OK"))
+
+    def _serve_shadow_reality(self, start_response, context, path, nonce, exc_info=None, template="banking",
+                              engine=None, spans=None):
+        shadow_payload = (engine or self.snapshot.engine).generate_shadow("STRUCT", context, path, nonce, template)
+        if spans is not None:
+            spans.mark(Span.SHADOW)
+        # Mesmo jitter do adaptador ASGI (15-60 ms) para imitar a Prime Reality
+        time.sleep(random.uniform(0.015, 0.060))
+        if spans is not None:
+            spans.mark(Span.JITTER)
+        body = json_body(shadow_payload)
+        if spans is not None:
+            spans.mark(Span.JSON)
+        return _json_response(start_response, body, exc_info=exc_info)
+
+    def _emit(self, reality, stage, fingerprint, method, path, started, check=None, seal_ok=None,
+              environ=None):
+        if self.event_log is None and self.capture is None:
+            return
+        latency_ms = (time.perf_counter() - started) * 1000
+        if self.event_log is not None:
+            self.event_log.emit(reality, stage, fingerprint, method, path, latency_ms)
+        if self.capture is not None and self.capture.sample(fingerprint):
+            if check is None:
+                # Nível de taxa: headers crus, sem precheck nem HMAC no caminho do pedido
+                self.capture.record_rate_limited(fingerprint, method, path, _elp_headers(environ), reality, stage,
+                                                 latency_ms)
+            else:
+                self.capture.record(check, seal_ok, reality, stage, latency_ms)
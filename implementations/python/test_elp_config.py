@@ -0,0 +1,177 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from elp_config import ConfigSnapshot, ElpConfig, HotConfig
+from elp_drift import ClockDriftEstimator
+from elp_events import Stage
+from elp_omega import DEFAULT_SHADOW_TEMPLATES, EntangledLogicOmegaV5, Reality
+from elp_shared import Keyring
+from elp_wsgi import ElpOmegaWSGIMiddleware
+
+SECRET = b"config-test-secret"
+
+def wsgi_call(app, engine, nonce, mask=0b1001, path="/api/v1/accounts/7", ts=None):
+    ts = int(time.time() * 1000) if ts is None else ts
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, "REMOTE_ADDR": "10.0.0.1",
+               "HTTP_X_ELP_MASK": str(mask), "HTTP_X_ELP_TIMESTAMP": str(ts), "HTTP_X_ELP_NONCE": nonce,
+               "HTTP_X_ELP_SEAL": engine.compute_seal(mask, "GET", ts, path, nonce)}
+    return b"".join(app(environ, lambda s, h, exc_info=None: None))
+
+def asgi_call(app, method="GET", body=b"", token="admin-token"):
+    scope = {"type": "http", "method": method, "path": "/config",
+             "headers": [(b"authorization", f"Bearer {token}".encode())] if token else []}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+class TestShadowSeed(unittest.TestCase):
+    def test_default_seed_is_the_secret(self):
+        default = EntangledLogicOmegaV5(SECRET)
+        explicit = EntangledLogicOmegaV5(SECRET, shadow_seed=SECRET)
+        reseeded = EntangledLogicOmegaV5(SECRET, shadow_seed=b"new-stability-seed")
+        args = ("STRUCT", "GET", "/api/v1/accounts/7", "n-1")
+        self.assertEqual(default.generate_shadow(*args)["data"], explicit.generate_shadow(*args)["data"])
+        self.assertNotEqual(default.generate_shadow(*args)["data"], reseeded.generate_shadow(*args)["data"])
+
+class TestHotConfig(unittest.TestCase):
+    def setUp(self):
+        self.hot = HotConfig(ElpConfig(), Keyring(SECRET), thread_safe=True)
+        self.app = ElpOmegaWSGIMiddleware(lambda e, s: s("200 OK", [("Content-Type", "text/plain")]) or [b"PRIME"],
+                                          hot_config=self.hot)
+
+    def test_snapshot_is_immutable(self):
+        snapshot = self.hot.snapshot
+        with self.assertRaises(AttributeError):
+            snapshot.engine = None
+        self.assertIs(self.app.snapshot, snapshot)
+        self.assertIsInstance(snapshot, ConfigSnapshot)
+
+    def test_swap_applies_to_new_requests_and_keeps_nonces(self):
+        engine = self.hot.snapshot.engine
+        self.assertEqual(wsgi_call(self.app, engine, "a"), b"PRIME")
+        self.hot.apply(ElpConfig(route_policies={"/api/*": {"required_mask": 0b100000}}, shadow_seed="s2"))
+        self.assertEqual(self.hot.snapshot.version, 2)
+        self.assertIs(self.app.security_engine, self.hot.snapshot.engine)
+        self.assertEqual(self.app.guard.precheck("GET", "/api/v1/accounts/7", {"mask": "9", "timestamp": "0"},
+                                                 "").failed_stage, Stage.AUTHORIZATION)
+        self.assertNotEqual(wsgi_call(self.app, engine, "b"), b"PRIME")
+        # O nonce consumido antes da troca continua consumido no snapshot seguinte
+        self.hot.apply(ElpConfig())
+        check = self.app.guard.precheck("GET", "/api/v1/accounts/7", {"mask": "9", "timestamp": str(
+            int(time.time() * 1000)), "nonce": "a", "seal": "x"}, "")
+        self.assertEqual(self.app.guard.finish(check, True), (Reality.SHADOW, Stage.REPLAY))
+
+    def test_key_rotation_keeps_previous_key_valid(self):
+        old_engine = self.hot.snapshot.engine
+        self.hot.apply(keyring=self.hot.keyring.rotate(b"config-test-secret-2"))
+        self.assertEqual(wsgi_call(self.app, old_engine, "k"), b"PRIME")
+        self.assertEqual(wsgi_call(self.app, self.hot.snapshot.engine, "l"), b"PRIME")
+
+    def test_max_age_change_reaches_drift_estimator(self):
+        hot = HotConfig(ElpConfig(), Keyring(SECRET), drift_estimator=ClockDriftEstimator())
+        hot.apply(ElpConfig(max_age_ms=1000))
+        guard, engine = hot.snapshot.guard, hot.snapshot.engine
+        now = int(time.time() * 1000)
+        elp = {"mask": "9", "timestamp": str(now - 60_000), "nonce": "old"}
+        elp["seal"] = engine.compute_seal(9, "GET", now - 60_000, "/api", "old")
+        self.assertEqual(guard.evaluate("GET", "/api", elp, "10.0.0.1"), (Reality.SHADOW, Stage.FRESHNESS))
+        check = guard.precheck("GET", "/api", dict(elp, timestamp=str(now - 500), nonce="new"), "10.0.0.1")
+        guard.finish(check, True)
+        self.assertEqual(engine._used_nonces._expiry["new"], now - 500 + 1000 + 1)
+
+    def test_invalid_config_keeps_current_snapshot(self):
+        before = self.hot.snapshot
+        for config in (ElpConfig(shadow_templates={"retail": DEFAULT_SHADOW_TEMPLATES["banking"]}),
+                       ElpConfig(permissions={"READ": 0, "WRITE": 1}, routes={}),
+                       ElpConfig(route_policies={"/api": {"shadow_template": "missing"}}),
+                       ElpConfig(mask_width=7)):
+            with self.assertRaises(ValueError, msg=config):
+                self.hot.apply(config)
+        self.assertIs(self.hot.snapshot, before)
+        self.assertEqual(self.hot.stats()["rejected"], 4)
+        with self.assertRaises(ValueError):
+            ElpConfig.from_mapping({"max_age": 1})
+
+    def test_wrong_types_and_ranges_are_rejected(self):
+        before = self.hot.snapshot
+        bad = ({"max_age_ms": "1000"}, {"max_age_ms": -5}, {"max_age_ms": 0}, {"max_age_ms": True},
+               {"mask_width": "64"}, {"shadow_seed": 7}, {"default_allow": "no"}, {"routes": ["GET /x"]})
+        for data in bad:
+            with self.assertRaises(ValueError, msg=data):
+                self.hot.apply(ElpConfig.from_mapping(data))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "elp.json")
+            with open(path, "w") as fh:
+                json.dump({"max_age_ms": "1000"}, fh)
+            with self.assertRaises(ValueError):
+                self.hot.apply_file(path)
+        self.assertIs(self.hot.snapshot, before)
+        self.assertEqual(self.hot.stats()["applied"], 0)
+        self.assertEqual(self.hot.stats()["rejected"], len(bad) + 1)
+        # O serviço continua a responder com o snapshot em vigor
+        self.assertEqual(wsgi_call(self.app, before.engine, "still-up"), b"PRIME")
+
+    def test_file_watcher(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "elp.json")
+            with open(path, "w") as fh:
+                json.dump({"max_age_ms": 300000}, fh)
+            self.hot.watch(path, interval=0.01)
+            try:
+                with open(path + ".tmp", "w") as fh:
+                    json.dump({"max_age_ms": 60000, "route_policies": {"/health": {"bypass": True}}}, fh)
+                os.replace(path + ".tmp", path)
+                self._wait(lambda: self.hot.snapshot.version == 2)
+                self.assertEqual(self.app.security_engine.max_age_ms, 60000)
+                self.assertTrue(self.app.guard.policy("/health").bypass)
+                with open(path, "w") as fh:
+                    fh.write("{not json")
+                self._wait(lambda: self.hot.rejected == 1)
+                self.assertEqual(self.hot.snapshot.version, 2)
+            finally:
+                self.hot.stop()
+
+    @staticmethod
+    def _wait(condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise AssertionError("timeout à espera do watcher")
+            time.sleep(0.01)
+
+class TestAdminApp(unittest.TestCase):
+    def setUp(self):
+        self.hot = HotConfig(ElpConfig(), Keyring(SECRET))
+        self.admin = self.hot.admin_app("admin-token")
+
+    def test_requires_token(self):
+        self.assertEqual(asgi_call(self.admin, token="wrong")[0], 401)
+        self.assertEqual(asgi_call(self.admin, token=None)[0], 401)
+        with self.assertRaises(ValueError):
+            self.hot.admin_app("")
+
+    def test_put_and_get(self):
+        status, body = asgi_call(self.admin, "PUT", json.dumps({"max_age_ms": 1000, "shadow_seed": "s2"}).encode())
+        self.assertEqual((status, body), (200, {"version": 2}))
+        status, body = asgi_call(self.admin)
+        self.assertEqual((status, body["version"], body["config"]["max_age_ms"]), (200, 2, 1000))
+        self.assertEqual(self.hot.snapshot.engine.shadow_seed, b"s2")
+
+    def test_rejects_invalid_body(self):
+        for payload in (b"{", b"[]", b'{"unknown": 1}', b'{"mask_width": 3}'):
+            self.assertEqual(asgi_call(self.admin, "PUT", payload)[0], 400, payload)
+        self.assertEqual(self.hot.snapshot.version, 1)
+        self.assertEqual(asgi_call(self.admin, "DELETE")[0], 405)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+import elp_conformance
+import elp_native
+
+class TestConformanceVectors(unittest.TestCase):
+    def setUp(self):
+        self.vectors = elp_conformance.load()
+
+    def test_corpus_is_current(self):
+        """O corpus publicado é exatamente o que o engine gera hoje (mudanças de contrato são explícitas)."""
+        self.assertEqual(self.vectors, elp_conformance.generate_vectors())
+
+    def test_python_engine_conforms(self):
+        self.assertEqual(elp_conformance.check_vectors(self.vectors, native=False), [])
+
+    @unittest.skipUnless(elp_native._elp_native is not None, "extensão _elp_native não compilada")
+    def test_native_engine_conforms(self):
+        self.assertEqual(elp_conformance.check_vectors(self.vectors, native=True), [])
+
+    def test_divergence_is_reported(self):
+        self.vectors["seals"][0]["seal"] = "0" * 64
+        self.vectors["nonces"]["ops"][0]["accepted"] = not self.vectors["nonces"]["ops"][0]["accepted"]
+        failures = elp_conformance.check_vectors(self.vectors)
+        self.assertEqual([f.split(":")[0] for f in failures], ["seals[0]", "nonces[0]"])
+
+if __name__ == "__main__":
+    unittest.main()
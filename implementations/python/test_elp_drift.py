@@ -0,0 +1,70 @@
+import unittest
+from elp_drift import DRIFTED, FRESH, STALE, ClockDriftEstimator
+from elp_omega import EntangledLogicOmegaV5
+from elp_wsgi import ElpOmegaWSGIMiddleware
+
+class TestClockDriftEstimator(unittest.TestCase):
+    def setUp(self):
+        self.drift = ClockDriftEstimator(max_age_ms=300000, tight_window_ms=2000, max_drift_ms=20000,
+                                         alpha=0.5, max_clients=2)
+
+    def test_unknown_client_gets_tight_window(self):
+        self.assertEqual(self.drift.classify("new", 1500), FRESH)
+        self.assertEqual(self.drift.classify("new", 60000), DRIFTED)
+        self.assertEqual(self.drift.classify("new", 400000), STALE)
+
+    def test_learns_consistent_offset(self):
+        """Cliente 15 s atrasado passa de MIRROR a PRIME depois de algumas amostras."""
+        self.assertEqual(self.drift.classify("slow", 15000), DRIFTED)
+        for _ in range(6):
+            self.drift.observe("slow", 15000)
+        self.assertEqual(self.drift.classify("slow", 15200), FRESH)
+        self.assertEqual(self.drift.classify("slow", 0), DRIFTED)
+
+    def test_center_is_clamped(self):
+        """Um desvio enorme não puxa a janela curta para fora de ±max_drift_ms."""
+        for _ in range(10):
+            self.drift.observe("far", 200000)
+        self.assertEqual(self.drift.classify("far", 200000), DRIFTED)
+
+    def test_nonce_outlives_every_accepted_offset(self):
+        """FRESH repetido mais tarde seria DRIFTED (MIRROR corre o handler): a retenção cobre max_age_ms inteiro."""
+        self.assertEqual(self.drift.nonce_expiry(1000, FRESH), 1000 + 300000 + 1)
+        self.assertEqual(self.drift.nonce_expiry(1000, DRIFTED), 1000 + 300000 + 1)
+        self.assertEqual(self.drift.classify("new", 300000), DRIFTED)
+
+    def test_bounded_lru(self):
+        for fp in ("a", "b", "c"):
+            self.drift.observe(fp, 0)
+        self.assertEqual(len(self.drift), 2)
+        self.assertEqual(self.drift.window("a"), (0.0, 2000.0))
+
+class TestDriftReplayThroughAdapter(unittest.TestCase):
+    def test_late_replay_never_reruns_handler(self):
+        calls = []
+
+        def handler(environ, start_response):
+            calls.append(environ["PATH_INFO"])
+            start_response("201 Created", [("Content-Type", "application/json")])
+            return [b'{"ok":true}']
+
+        engine = EntangledLogicOmegaV5(b"drift-replay-secret", thread_safe=True)
+        app = ElpOmegaWSGIMiddleware(handler, engine=engine, drift_estimator=ClockDriftEstimator())
+        clock = [1_700_000_000_000]
+        app.guard.clock_ms = lambda: clock[0]
+        ts = clock[0]
+        environ = {"REQUEST_METHOD": "POST", "PATH_INFO": "/api/v1/transfers", "REMOTE_ADDR": "10.0.0.1",
+                   "HTTP_X_ELP_MASK": "9", "HTTP_X_ELP_TIMESTAMP": str(ts), "HTTP_X_ELP_NONCE": "t-1",
+                   "HTTP_X_ELP_SEAL": engine.compute_seal(9, "POST", ts, "/api/v1/transfers", "t-1")}
+        statuses = []
+        start_response = lambda status, headers, exc_info=None: statuses.append(status)
+        app(dict(environ), start_response)
+        # Depois da antiga retenção curta (~30 s) e no limite exato da janela de frescor
+        for late_ms in (31_000, 120_000, 300_000):
+            clock[0] = ts + late_ms
+            app(dict(environ), start_response)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(statuses, ["201 Created"] + ["200 OK"] * 3)
+
+if __name__ == "__main__":
+    unittest.main()
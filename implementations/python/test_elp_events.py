@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import unittest
+from elp_events import BinarySink, EventLog, EventRing, NdjsonSink, Stage, read_binary_events
+from elp_omega import Reality
+
+class TestEventRing(unittest.TestCase):
+    def test_drops_and_counts_when_full(self):
+        ring = EventRing(capacity=2)
+        self.assertTrue(ring.offer(1))
+        self.assertTrue(ring.offer(2))
+        self.assertFalse(ring.offer(3))
+        self.assertEqual(ring.dropped, 1)
+        self.assertEqual(ring.drain(10), [1, 2])
+
+class TestEventLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_ndjson_writer(self):
+        path = os.path.join(self.tmp.name, "events.ndjson")
+        log = EventLog(NdjsonSink(path), flush_interval=0.01).start()
+        log.emit(Reality.SHADOW, Stage.REPLAY, "10.0.0.1", "GET", "/api", 17.5)
+        log.emit(Reality.PRIME, Stage.NONE, "10.0.0.2", "GET", "/api", 3.0)
+        log.close()
+        with open(path) as fh:
+            events = [json.loads(line) for line in fh]
+        self.assertEqual([e["stage"] for e in events], ["replay", ""])
+        self.assertEqual(events[0]["fingerprint"], "10.0.0.1")
+        self.assertEqual(log.stats()["written"], 2)
+
+    def test_binary_roundtrip_and_rotation(self):
+        path = os.path.join(self.tmp.name, "events.bin")
+        log = EventLog(BinarySink(path, max_bytes=200, backups=2), batch_size=1)
+        for i in range(10):
+            log.emit(Reality.SHADOW, Stage.SEAL, f"fp-{i}", "POST", "/pix", float(i))
+        log.close()
+        self.assertTrue(os.path.exists(path + ".1"))
+        self.assertFalse(os.path.exists(path + ".3"))
+        last = list(read_binary_events(path))[-1]
+        self.assertEqual((last.fingerprint, last.stage, last.reality), ("fp-9", "seal", "SHADOW"))
+
+    def test_oversized_client_fields_do_not_drop_the_batch(self):
+        path = os.path.join(self.tmp.name, "events.bin")
+        log = EventLog(BinarySink(path), batch_size=8)
+        log.emit(Reality.SHADOW, Stage.SEAL, "fp", "GET", "/before", 1.0)
+        log.emit(Reality.SHADOW, Stage.SEAL, "fp", "X" * 300, "/p" + "é" * 40000, 1.0)
+        log.emit(Reality.SHADOW, Stage.SEAL, "fp", "GET", "/after", 1.0)
+        log.close()
+        self.assertEqual((log.stats()["written"], log.stats()["write_errors"]), (3, 0))
+        events = list(read_binary_events(path))
+        self.assertEqual([e.path for e in events[::2]], ["/before", "/after"])
+        self.assertEqual(events[1].method, "X" * 255)
+        self.assertTrue(events[1].path.startswith("/pé"))
+
+    def test_writer_survives_failing_batch(self):
+        class FlakySink:
+            def __init__(self):
+                self.batches = []
+
+            def write_batch(self, events):
+                if not self.batches:
+                    self.batches.append(None)
+                    raise OverflowError("valor fora da coluna")
+                self.batches.append(list(events))
+
+            def close(self):
+                pass
+
+        sink = FlakySink()
+        log = EventLog(sink, batch_size=1, flush_interval=0.01).start()
+        log.emit(Reality.SHADOW, Stage.SEAL, "fp", "GET", "/a", 1.0)
+        log.emit(Reality.PRIME, Stage.NONE, "fp", "GET", "/b", 1.0)
+        log.close()
+        self.assertEqual((log.stats()["write_errors"], log.stats()["written"]), (1, 1))
+        self.assertEqual(sink.batches[1][0].path, "/b")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from elp_eventstore import ColumnarEventStore, EventStoreReader, HOUR_MS, main
+from elp_events import EventLog, SecurityEvent, Stage
+from elp_omega import Reality
+
+BASE = 1_764_000_000_000  # 2025-11-24 16:00 UTC
+
+def event(offset_ms, fp, path, stage, reality=Reality.SHADOW):
+    return SecurityEvent(BASE + offset_ms, reality, stage, fp, "GET", path, 12.5)
+
+class TestColumnarEventStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = os.path.join(self.tmp.name, "events")
+        store = ColumnarEventStore(self.root)
+        store.write_batch([
+            event(0, "1.1.1.1", "/a", Stage.REPLAY),
+            event(1, "1.1.1.1", "/a", Stage.REPLAY),
+            event(2, "1.1.1.1", "/b", Stage.REPLAY),
+            event(3, "2.2.2.2", "/a", Stage.SEAL),
+            event(4, "3.3.3.3", "/a", Stage.NONE, Reality.PRIME),
+            event(HOUR_MS + 5, "2.2.2.2", "/a", Stage.ADJACENCY),
+        ])
+        store.close()
+        self.reader = EventStoreReader(self.root)
+
+    def test_partitioned_by_hour(self):
+        partitions = [n for n in os.listdir(self.root) if n.isdigit()]
+        self.assertEqual(len(partitions), 2)
+
+    def test_replay_by_fingerprint_and_path(self):
+        groups = self.reader.group_count(("fingerprint", "path"), since_ms=BASE,
+                                         reality=Reality.SHADOW, stage=Stage.REPLAY)
+        self.assertEqual(groups, {("1.1.1.1", "/a"): 2, ("1.1.1.1", "/b"): 1})
+
+    def test_time_window_prunes_partitions(self):
+        self.assertEqual(self.reader.count(since_ms=BASE + HOUR_MS), 1)
+        self.assertEqual(self.reader.count(until_ms=BASE + 2), 3)
+        self.assertEqual(self.reader.count(fingerprint="9.9.9.9"), 0)
+
+    def test_classify_incidents(self):
+        incidents = {i["fingerprint"]: i for i in self.reader.classify_incidents()}
+        self.assertEqual(incidents["1.1.1.1"]["classification"], "replay_attack")
+        self.assertEqual(incidents["2.2.2.2"]["total"], 2)
+        self.assertNotIn("3.3.3.3", incidents)
+
+    def test_event_log_sink_and_cli(self):
+        root = os.path.join(self.tmp.name, "live")
+        log = EventLog(ColumnarEventStore(root))
+        log.emit(Reality.SHADOW, Stage.SEAL, "4.4.4.4", "POST", "/pix", 1.0)
+        log.close()
+        self.assertEqual(EventStoreReader(root).count(stage=Stage.SEAL), 1)
+        self.assertEqual(main(["query", "--root", root, "--since", "1h", "--group-by", "fingerprint"]), 0)
+
+    def test_attacker_chosen_strings_are_capped(self):
+        root = os.path.join(self.tmp.name, "capped")
+        store = ColumnarEventStore(root, limits={"path": 10})
+        log = EventLog(store).start()
+        for i in range(300):
+            log.emit(Reality.SHADOW, Stage.SEAL, "5.5.5.5", f"M{i}", f"/p/{i}", 1.0)
+        log.close()
+        self.assertEqual(log.stats()["written"], 300)
+        self.assertEqual(log.stats()["write_errors"], 0)
+        self.assertEqual(store.overflowed(), {"fingerprint": 0, "method": 300 - 255, "path": 300 - 9})
+        reader = EventStoreReader(root)
+        methods = reader.group_count(("method",))
+        self.assertEqual((len(methods), methods[("OTHER",)]), (256, 45))
+        self.assertEqual(reader.group_count(("path",))[("<other>",)], 291)
+        with self.assertRaises(ValueError):
+            ColumnarEventStore(root, limits={"method": 1000})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from elp_mask import MASK64, MASK128, MASK256, mask_format, parse_bounded_int
+
+class TestFixedWidthMask(unittest.TestCase):
+    def test_length_cap_before_parsing(self):
+        """100k dígitos são descartados sem chegar ao int()."""
+        self.assertIsNone(MASK64.parse("1" * 100_000))
+        self.assertIsNone(MASK64.parse(str(1 << 64)))
+        self.assertEqual(MASK64.parse(str((1 << 64) - 1)), (1 << 64) - 1)
+
+    def test_malformed_headers(self):
+        for raw in (None, "", "-1", " 5", "1_0", "+3", "٣"):
+            self.assertIsNone(MASK64.parse(raw), raw)
+        self.assertIsNone(parse_bounded_int("9" * 21, 20))
+
+    def test_wide_masks(self):
+        wide = (1 << 200) | (1 << 130) | 1
+        self.assertIsNone(MASK128.parse(str(wide)))
+        self.assertEqual(MASK256.parse(str(wide)), wide)
+        self.assertTrue(MASK256.is_valid(wide))
+        self.assertFalse(MASK128.is_valid(wide))
+
+    def test_words_roundtrip_and_boundary(self):
+        """Bits 63 e 64 são adjacentes mesmo estando em palavras diferentes."""
+        crossing = (1 << 63) | (1 << 64)
+        words = MASK128.to_words(crossing)
+        self.assertEqual(words, (1 << 63, 1))
+        self.assertEqual(MASK128.from_words(words), crossing)
+        self.assertFalse(MASK128.is_valid_words(words))
+        self.assertFalse(MASK128.is_valid(crossing))
+        self.assertTrue(MASK128.is_valid_words(MASK128.to_words((1 << 62) | (1 << 64))))
+
+    def test_unsupported_width(self):
+        with self.assertRaises(ValueError):
+            mask_format(96)
+
+if __name__ == "__main__":
+    unittest.main()
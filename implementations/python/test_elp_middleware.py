@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+import unittest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from elp_middleware import ElpOmegaMiddleware
+from elp_offload import AdaptiveOffloader
+from elp_events import EventLog, Stage
+from elp_drift import ClockDriftEstimator
+from elp_omega import EntangledLogicOmegaV5
+
+SECRET = "middleware-test-secret"
+
+def build_app(**options):
+    app = FastAPI()
+    app.add_middleware(ElpOmegaMiddleware, secret_key=SECRET, **options)
+
+    @app.get("/api/v1/resource")
+    async def resource():
+        return {"data": "PRIME_DATA", "cpf": "123.456.789-10"}
+
+    return app
+
+def signed_headers(path="/api/v1/resource", method="GET", mask=0b1001, nonce="n-1", ts=None, body=None):
+    engine = EntangledLogicOmegaV5(SECRET.encode())
+    ts = int(time.time() * 1000) if ts is None else ts
+    digest = None if body is None else hashlib.sha256(body).hexdigest()
+    headers = {
+        "X-ELP-Mask": str(mask),
+        "X-ELP-Timestamp": str(ts),
+        "X-ELP-Nonce": nonce,
+        "X-ELP-Seal": engine.compute_seal(mask, method, ts, path, nonce, digest),
+    }
+    if digest is not None:
+        headers["X-ELP-Body-Digest"] = digest
+    return headers
+
+class TestElpOmegaMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(build_app())
+
+    def test_prime_then_replay(self):
+        headers = signed_headers()
+        r1 = self.client.get("/api/v1/resource", headers=headers)
+        self.assertEqual(r1.json()["data"], "PRIME_DATA")
+        r2 = self.client.get("/api/v1/resource", headers=headers)
+        self.assertEqual(r2.status_code, 200)
+        self.assertNotIn("PRIME_DATA", r2.text)
+
+    def test_oversized_mask_header_goes_to_shadow(self):
+        """Máscara gigante não pode custar parsing nem derrubar o worker."""
+        headers = signed_headers()
+        headers["X-ELP-Mask"] = "1" * 100_000
+        r = self.client.get("/api/v1/resource", headers=headers)
+        self.assertEqual(r.status_code, 200)
+        self.assertIn("transaction_id", r.json())
+
+    def test_offloaded_verification(self):
+        """Com o offload sempre ativo o resultado da cascata não muda."""
+        offloader = AdaptiveOffloader(lag_threshold_ms=0.0)
+        client = TestClient(build_app(offloader=offloader))
+        r = client.get("/api/v1/resource", headers=signed_headers(nonce="offload-1"))
+        self.assertEqual(r.json()["data"], "PRIME_DATA")
+        self.assertEqual(offloader.telemetry()["offloaded"], 1)
+        offloader.shutdown()
+
+    def test_security_events_record_failing_stage(self):
+        class MemorySink:
+            events = []
+            def write_batch(self, batch):
+                self.events.extend(batch)
+            def close(self):
+                pass
+
+        sink = MemorySink()
+        log = EventLog(sink)
+        client = TestClient(build_app(event_log=log))
+        headers = signed_headers(nonce="events-1")
+        client.get("/api/v1/resource", headers=headers)
+        client.get("/api/v1/resource", headers=headers)
+        client.get("/api/v1/resource", headers={**headers, "X-ELP-Mask": "3"})
+        log.close()
+        self.assertEqual([(e.reality, e.stage) for e in sink.events],
+                         [("PRIME", ""), ("SHADOW", "replay"), ("SHADOW", "adjacency")])
+        self.assertGreater(sink.events[1].latency_ms, 0)
+
+    def test_drifted_client_gets_mirror(self):
+        """Selo válido com relógio 60 s atrasado: dados reais mascarados, não Shadow."""
+        client = TestClient(build_app(drift_estimator=ClockDriftEstimator(tight_window_ms=2000)))
+        fresh = client.get("/api/v1/resource", headers=signed_headers(nonce="drift-1"))
+        self.assertEqual(fresh.json()["data"], "PRIME_DATA")
+        stale_ts = int(time.time() * 1000) - 60_000
+        r = client.get("/api/v1/resource", headers=signed_headers(nonce="drift-2", ts=stale_ts))
+        self.assertEqual(r.json(), {"data": "*****_DATA", "cpf": "***.***.*89-10"})
+
+    def test_future_timestamp_nonce_outlives_now_plus_window(self):
+        """Nonce de timestamp adiantado fica retido até timestamp + max_age_ms."""
+        engine = EntangledLogicOmegaV5(SECRET.encode())
+        client = TestClient(build_app(engine=engine))
+        future_ts = int(time.time() * 1000) + 200_000
+        client.get("/api/v1/resource", headers=signed_headers(nonce="future-1", ts=future_ts))
+        self.assertEqual(engine._used_nonces._expiry["future-1"], future_ts + 300000 + 1)
+
+class TestPlainAsgi(unittest.TestCase):
+    """Sem framework nenhum: o middleware envolve uma app ASGI crua."""
+
+    def call(self, headers):
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b'{"data":"PRIME_DATA"}'})
+
+        middleware = ElpOmegaMiddleware(app, secret_key=SECRET)
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/resource", "client": ("10.0.0.1", 1),
+                 "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]}
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(middleware(scope, receive, send))
+        return sent[0]["status"], json.loads(b"".join(m.get("body", b"") for m in sent[1:]))
+
+    def test_prime_and_shadow(self):
+        self.assertEqual(self.call(signed_headers(nonce="raw-1")), (200, {"data": "PRIME_DATA"}))
+        status, body = self.call({"X-ELP-Mask": "3"})
+        self.assertEqual(status, 200)
+        self.assertIn("transaction_id", body)
+
+    def test_core_import_loads_no_framework(self):
+        probe = ("import sys, elp_omega, elp_middleware, elp_wsgi\n"
+                 "print(sorted(m for m in ('fastapi', 'starlette', 'elp_profile', 'elp_config') if m in sys.modules))\n"
+                 "print(elp_omega.ElpOmegaMiddleware is elp_middleware.ElpOmegaMiddleware)")
+        out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(out.stdout.split(), ["[]", "True"])
+
+class TestBodyBinding(unittest.TestCase):
+    """X-ELP-Body-Digest: o corpo é conferido em streaming enquanto a app o lê."""
+
+    def call(self, headers, chunks):
+        received = []
+
+        async def app(scope, receive, send):
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    received.append(None)
+                    break
+                received.append(message["body"])
+                if not message.get("more_body"):
+                    break
+            await send({"type": "http.response.start", "status": 201, "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b'{"stored":true}'})
+
+        log = EventLog(sink=None, capacity=8)
+        middleware = ElpOmegaMiddleware(app, secret_key=SECRET, event_log=log)
+        scope = {"type": "http", "method": "POST", "path": "/api/v1/resource", "client": ("10.0.0.1", 1),
+                 "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]}
+        pending = [{"type": "http.request", "body": c, "more_body": i < len(chunks) - 1} for i, c in enumerate(chunks)]
+        sent = []
+
+        async def receive():
+            return pending.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(middleware(scope, receive, send))
+        body = json.loads(b"".join(m.get("body", b"") for m in sent[1:]))
+        return sent[0]["status"], body, received, log.ring.drain(8)[0].stage
+
+    def test_streamed_body_matches(self):
+        chunks = [b'{"amount":', b' 100,', b' "to": "42"}']
+        status, body, received, stage = self.call(signed_headers(method="POST", nonce="b-1", body=b"".join(chunks)), chunks)
+        self.assertEqual((status, body, stage), (201, {"stored": True}, Stage.NONE))
+        self.assertEqual(received, chunks)
+
+    def test_tampered_body_never_reaches_app_whole(self):
+        headers = signed_headers(method="POST", nonce="b-2", body=b'{"amount": 100}')
+        status, body, received, stage = self.call(headers, [b'{"amount": ', b'999999}'])
+        self.assertEqual((status, stage), (200, Stage.BODY))
+        self.assertIn("transaction_id", body)
+        self.assertEqual(received, [b'{"amount": ', None])
+
+    def test_digest_is_covered_by_seal(self):
+        headers = signed_headers(method="POST", nonce="b-3", body=b"original")
+        headers["X-ELP-Body-Digest"] = hashlib.sha256(b"forged").hexdigest()
+        status, body, received, stage = self.call(headers, [b"forged"])
+        self.assertEqual((stage, received), (Stage.SEAL, []))
+
+if __name__ == "__main__":
+    unittest.main()
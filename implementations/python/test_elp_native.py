@@ -0,0 +1,68 @@
+import random
+import unittest
+import elp_native
+from elp_omega import EntangledLogicOmegaV5, NativeNonceStore, NonceStore
+
+needs_native = unittest.skipUnless(elp_native._elp_native is not None, "extensão _elp_native não compilada")
+
+class TestFallback(unittest.TestCase):
+    def test_pure_python_engine_always_available(self):
+        engine = EntangledLogicOmegaV5(b"k", native=False)
+        self.assertFalse(engine.native)
+        self.assertIsInstance(engine._used_nonces, NonceStore)
+        self.assertTrue(engine.verify_seal(engine.compute_seal(9, "GET", 1, "/p", "n"), 9, "GET", 1, "/p", "n"))
+
+    @unittest.skipIf(elp_native._elp_native is not None, "extensão presente")
+    def test_explicit_native_without_extension_fails_loudly(self):
+        with self.assertRaises(ImportError):
+            EntangledLogicOmegaV5(b"k", native=True)
+
+@needs_native
+class TestNativeParity(unittest.TestCase):
+    """Python é a referência: a extensão tem de produzir exatamente os mesmos bytes."""
+
+    def setUp(self):
+        options = dict(previous_secrets=[b"old-key"], mask_width=128)
+        self.py = EntangledLogicOmegaV5(b"parity-secret", native=False, **options)
+        self.rs = EntangledLogicOmegaV5(b"parity-secret", native=True, **options)
+        self.rng = random.Random(1234)
+
+    def requests(self, count=500):
+        for i in range(count):
+            mask = self.rng.choice([0, 9, 1 << 63, (1 << 128) - 1, self.rng.getrandbits(128)])
+            path = self.rng.choice(["/api/v1/resource", "/contas/42", "/pix/ção", "/"])
+            yield mask, self.rng.choice(["GET", "POST"]), self.rng.getrandbits(44), path, f"nonce-{i}"
+
+    def test_masks(self):
+        for mask in [-1, 0, 1, 3, 5, (1 << 63) | (1 << 64), 1 << 127, (1 << 128) - 1, 1 << 128, 0x5555 << 100]:
+            self.assertEqual(self.rs.is_valid_zeckendorf_mask(mask), self.py.is_valid_zeckendorf_mask(mask), mask)
+
+    def test_seals(self):
+        old = EntangledLogicOmegaV5(b"old-key", native=False)
+        for args in self.requests():
+            seal = self.py.compute_seal(*args)
+            self.assertEqual(self.rs.compute_seal(*args), seal)
+            self.assertTrue(self.rs.verify_seal(seal, *args))
+            self.assertTrue(self.rs.verify_seal(old.compute_seal(*args), *args))
+            self.assertFalse(self.rs.verify_seal(seal[:-1] + ("0" if seal[-1] != "0" else "1"), *args))
+            self.assertFalse(self.rs.verify_seal(seal[:10], *args))
+
+    def test_shadow_payloads(self):
+        for mask, context, ts, path, nonce in self.requests(200):
+            expected = self.py.generate_shadow("STRUCT", context, path, nonce)
+            actual = self.rs.generate_shadow("STRUCT", context, path, nonce)
+            expected.pop("timestamp"), actual.pop("timestamp")
+            self.assertEqual(actual, expected)
+
+    def test_nonce_store_semantics(self):
+        py, rs = NonceStore(1000), NativeNonceStore(1000)
+        now = 0
+        for _ in range(5000):
+            now += self.rng.randint(0, 50)
+            nonce = f"n{self.rng.randint(0, 300)}"
+            expiry = self.rng.choice([None, now + self.rng.randint(-10, 90_000)])
+            self.assertEqual(rs.add(nonce, now, expiry), py.add(nonce, now, expiry), (nonce, now, expiry))
+        self.assertEqual(sorted(rs.live_entries(now)), sorted(py.live_entries(now)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import time
+import unittest
+from elp_nonce_snapshot import NonceSnapshot, NonceSnapshotter, load_into, write_snapshot
+from elp_omega import NonceStore, nonce_digest
+from elp_shared import SharedNonceTable
+
+class TestNonceSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "nonces.snap")
+
+    def test_restart_closes_replay_gap(self):
+        """Nonce visto antes do reinício continua a ser Replay depois dele."""
+        before = NonceStore(max_age_ms=1000)
+        for i in range(100):
+            before.add(f"n{i}", 0)
+        self.assertEqual(write_snapshot(before.live_entries(10), self.path), 100)
+
+        after = NonceStore(max_age_ms=1000)
+        self.assertIsNotNone(load_into(after, self.path, now_ms=10))
+        self.assertFalse(after.add("n42", 20))
+        self.assertTrue(after.add("brand-new", 20))
+        # Vencida a janela antiga, o snapshot é solto
+        self.assertTrue(after.add("n42", 1001))
+        self.assertIsNone(after._snapshot)
+
+    def test_consecutive_restarts_keep_old_entries(self):
+        first = NonceStore(max_age_ms=1000)
+        first.add("old", 0)
+        write_snapshot(first.live_entries(0), self.path)
+        second = NonceStore(max_age_ms=1000)
+        load_into(second, self.path, now_ms=100)
+        second.add("mid", 100)
+        NonceSnapshotter(second, self.path).snapshot_now(now_ms=150)
+        snapshot = NonceSnapshot(self.path)
+        self.assertEqual(snapshot.count, 2)
+        self.assertTrue(snapshot.contains(nonce_digest("old"), 500))
+        snapshot.close()
+
+    def test_shared_table_and_expired_snapshot(self):
+        write_snapshot([(nonce_digest("x"), 500)], self.path)
+        table = SharedNonceTable(capacity=64, max_age_ms=1000, stripes=2)
+        load_into(table, self.path, now_ms=100)
+        self.assertFalse(table.add("x", 100))
+        # Snapshot inteiramente vencido não é sequer carregado
+        self.assertIsNone(load_into(NonceStore(), self.path, now_ms=600))
+
+    def test_corrupt_file_is_ignored(self):
+        with open(self.path, "wb") as fh:
+            fh.write(b"garbage")
+        self.assertIsNone(load_into(NonceStore(), self.path, now_ms=0))
+
+    def test_snapshot_thread_survives_unexpected_errors(self):
+        class FlakyStore(NonceStore):
+            calls = 0
+
+            def live_entries(self, now_ms):
+                self.calls += 1
+                if self.calls == 1:
+                    raise ValueError("mmap closed or invalid")
+                return super().live_entries(now_ms)
+
+        store = FlakyStore(max_age_ms=60_000)
+        store.add("n1", int(time.time() * 1000))
+        snapshotter = NonceSnapshotter(store, self.path, interval=0.01)
+        with self.assertLogs("elp_omega.nonce_snapshot", "ERROR"):
+            snapshotter.start()
+            deadline = time.monotonic() + 5
+            while snapshotter.snapshots == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        snapshotter.close()
+        stats = snapshotter.stats()
+        self.assertEqual(stats["write_errors"], 1)
+        self.assertGreaterEqual(stats["snapshots"], 2)
+        self.assertEqual(stats["last_count"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import asyncio
+import time
+import unittest
+from elp_offload import AdaptiveOffloader, LoopLagMonitor
+from elp_omega import EntangledLogicOmegaV5
+
+class TestAdaptiveOffloader(unittest.TestCase):
+    def setUp(self):
+        self.engine = EntangledLogicOmegaV5(b"offload-secret")
+
+    def test_lag_monitor_detects_blocking(self):
+        async def scenario():
+            monitor = LoopLagMonitor(interval=0.01, alpha=1.0)
+            monitor.ensure_started()
+            await asyncio.sleep(0.02)
+            time.sleep(0.05)  # bloqueia o loop de propósito
+            await asyncio.sleep(0.02)
+            monitor.stop()
+            return monitor.snapshot()
+
+        snapshot = asyncio.run(scenario())
+        self.assertGreaterEqual(snapshot["lag_max_ms"], 30)
+
+    def test_inline_below_threshold(self):
+        offloader = AdaptiveOffloader(self.engine, lag_threshold_ms=10_000)
+        seal = self.engine.compute_seal(1, "GET", 1, "/p", "n")
+
+        async def scenario():
+            return await offloader.verify_seal(seal, 1, "GET", 1, "/p", "n")
+
+        self.assertTrue(asyncio.run(scenario()))
+        self.assertEqual(offloader.telemetry()["inline"], 1)
+        offloader.shutdown()
+
+    def test_batched_offload_matches_inline(self):
+        """Acima do limiar as operações concorrentes seguem num único lote e devolvem o mesmo resultado."""
+        offloader = AdaptiveOffloader(self.engine, lag_threshold_ms=0.0)
+        seals = [self.engine.compute_seal(1, "GET", 1, "/p", f"n{i}") for i in range(8)]
+
+        async def scenario():
+            checks = [offloader.verify_seal(s, 1, "GET", 1, "/p", f"n{i}") for i, s in enumerate(seals)]
+            checks.append(offloader.verify_seal("forged", 1, "GET", 1, "/p", "n0"))
+            shadow = await offloader.generate_shadow("GET", "/p", "n0")
+            return await asyncio.gather(*checks), shadow
+
+        results, shadow = asyncio.run(scenario())
+        self.assertEqual(results, [True] * 8 + [False])
+        expected = self.engine.generate_shadow("STRUCT", "GET", "/p", "n0")
+        self.assertEqual(shadow["transaction_id"], expected["transaction_id"])
+        telemetry = offloader.telemetry()
+        self.assertEqual(telemetry["offloaded"], 10)
+        self.assertGreater(telemetry["avg_batch"], 1)
+        offloader.shutdown()
+
+if __name__ == "__main__":
+    unittest.main()
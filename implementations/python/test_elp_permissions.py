@@ -0,0 +1,52 @@
+import unittest
+from elp_omega import EntangledLogicOmegaV5
+from elp_permissions import PermissionCodec, RouteAuthorizer
+
+class TestPermissionCodec(unittest.TestCase):
+    def setUp(self):
+        self.codec = PermissionCodec({"READ": 0, "WRITE": 2, "ADMIN": 4})
+
+    def test_encode_decode_roundtrip(self):
+        """Qualquer combinação de permissões gera máscara Zeckendorf válida."""
+        mask = self.codec.encode(["READ", "ADMIN"])
+        self.assertEqual(mask, 0b10001)
+        self.assertTrue(EntangledLogicOmegaV5(b"k").is_valid_zeckendorf_mask(mask))
+        self.assertEqual(self.codec.decode(mask), {"READ", "ADMIN"})
+
+    def test_adjacent_mapping_rejected(self):
+        with self.assertRaises(ValueError):
+            PermissionCodec({"READ": 0, "WRITE": 1})
+
+    def test_unknown_permission(self):
+        with self.assertRaises(ValueError):
+            self.codec.encode(["DELETE"])
+
+    def test_remap(self):
+        """Rotação do operations.md: READ passa do bit 0 para o bit 6."""
+        remapped = self.codec.remap(READ=6)
+        self.assertEqual(remapped.encode(["READ"]), 1 << 6)
+        self.assertEqual(self.codec.encode(["READ"]), 1)
+
+class TestRouteAuthorizer(unittest.TestCase):
+    def setUp(self):
+        self.codec = PermissionCodec({"READ": 0, "WRITE": 2})
+        self.auth = RouteAuthorizer(self.codec, {
+            "GET /api/v1/resource": ["READ"],
+            "/api/v1/admin": ["READ", "WRITE"],
+        })
+
+    def test_authorize(self):
+        self.assertTrue(self.auth.authorize("GET", "/api/v1/resource", 0b1))
+        self.assertFalse(self.auth.authorize("GET", "/api/v1/resource", 0b100))
+        self.assertFalse(self.auth.authorize("POST", "/api/v1/admin", 0b1))
+        self.assertTrue(self.auth.authorize("POST", "/api/v1/admin", 0b101))
+        # Rota fora do índice segue a política padrão
+        self.assertTrue(self.auth.authorize("GET", "/health", 0))
+
+    def test_hot_swap_codec(self):
+        self.auth.swap_codec(self.codec.remap(READ=4))
+        self.assertFalse(self.auth.authorize("GET", "/api/v1/resource", 0b1))
+        self.assertTrue(self.auth.authorize("GET", "/api/v1/resource", 0b10000))
+
+if __name__ == "__main__":
+    unittest.main()
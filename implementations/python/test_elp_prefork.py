@@ -0,0 +1,115 @@
+import itertools
+import os
+import signal
+import tempfile
+import time
+import unittest
+from elp_prefork import PreforkRunner, _READY
+from elp_shared import Keyring, SharedNonceTable, SharedState
+
+class StubRunner(PreforkRunner):
+    """Workers sem uvicorn: `hang` faz o próximo worker nunca ficar pronto."""
+    RESPAWN_BACKOFF = 0.05
+    hang = False
+    hung_log = None
+
+    def _worker_main(self, ready_w: int) -> None:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        if not self.hang:
+            os.write(ready_w, _READY.pack(os.getpid()))
+        elif self.hung_log:
+            with open(self.hung_log, "a") as fh:
+                fh.write(f"{os.getpid()}\n")
+        os.close(ready_w)
+        while True:
+            time.sleep(1)
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+class TestRespawn(unittest.TestCase):
+    def test_stuck_replacement_is_retried_without_crashing(self):
+        shared = SharedState(Keyring(b"prefork-test"), SharedNonceTable(capacity=64, stripes=1))
+        runner = StubRunner(lambda s: None, shared, workers=2, ready_timeout=0.2)
+        try:
+            first, second = runner._spawn_generation()
+            os.kill(first, signal.SIGKILL)
+            # Espera a morte sem colher o processo: fica para o _reap
+            os.waitid(os.P_PID, first, os.WEXITED | os.WNOWAIT)
+            runner.hang = True
+            with self.assertLogs("elp_omega.prefork", "ERROR"):
+                runner._reap()
+            # O substituto preso foi abatido; o worker são continua
+            self.assertEqual(list(runner._pids), [second])
+            self.assertEqual(runner._missing, 1)
+            runner.hang = False
+            runner._reap()  # ainda dentro do backoff
+            self.assertEqual(runner._missing, 1)
+            time.sleep(runner._backoff)
+            runner._reap()
+            self.assertEqual(runner._missing, 0)
+            self.assertEqual(len(runner._pids), 2)
+            self.assertTrue(all(alive(pid) for pid in runner._pids))
+        finally:
+            runner._shutdown(list(runner._pids))
+
+    def test_failed_reload_keeps_previous_generation(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            ready_log, hung_log = os.path.join(tmp, "ready"), os.path.join(tmp, "hung")
+            reloads = itertools.count()
+
+            def loader():
+                if next(reloads) == 0:
+                    raise ValueError("Keyring vazio: keys.txt")
+                runner.hang = True  # a nova geração nunca fica pronta
+                return Keyring(b"new-key")
+
+            def on_ready(elapsed, pids):
+                with open(ready_log, "w") as fh:
+                    fh.write(" ".join(map(str, pids)))
+
+            shared = SharedState(Keyring(b"old-key"), SharedNonceTable(capacity=64, stripes=1))
+            runner = StubRunner(lambda s: None, shared, workers=2, ready_timeout=0.3,
+                                keyring_loader=loader, on_ready=on_ready)
+            runner.hung_log = hung_log
+            supervisor = os.fork()
+            if supervisor == 0:
+                code = 1
+                try:
+                    runner.run()
+                    code = 0
+                finally:
+                    os._exit(code)
+            try:
+                deadline = time.monotonic() + 5
+                while not os.path.exists(ready_log) and time.monotonic() < deadline:
+                    time.sleep(0.02)
+                time.sleep(0.05)
+                with open(ready_log) as fh:
+                    workers = [int(pid) for pid in fh.read().split()]
+                self.assertEqual(len(workers), 2)
+                # Se o pai morrer, os workers órfãos não podem sobreviver ao teste
+                self.addCleanup(lambda: [os.kill(pid, signal.SIGKILL) for pid in workers if alive(pid)])
+
+                # Keyring ilegível e, depois, uma geração que não fica pronta
+                for wait in (0.5, 1.0):
+                    os.kill(supervisor, signal.SIGHUP)
+                    time.sleep(wait)
+                    self.assertEqual(os.waitpid(supervisor, os.WNOHANG), (0, 0))
+                    self.assertTrue(all(alive(pid) for pid in workers))
+                with open(hung_log) as fh:
+                    hung = [int(pid) for pid in fh.read().split()]
+                self.assertEqual(len(hung), 2)
+                self.assertFalse(any(alive(pid) for pid in hung))
+            finally:
+                os.kill(supervisor, signal.SIGTERM)
+                _, status = os.waitpid(supervisor, 0)
+            self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+            self.assertFalse(any(alive(pid) for pid in workers))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+from collections import defaultdict
+from elp_middleware import ElpOmegaMiddleware
+from elp_omega import EntangledLogicOmegaV5, Reality
+from elp_profile import SamplingProfiler, Span, StageTracer, main, profiler_app, read_chrome_trace, summarize
+from elp_wsgi import ElpOmegaWSGIMiddleware
+
+SECRET = b"profile-test-secret"
+PATH = "/api/v1/accounts/7"
+
+def headers(engine, nonce, mask=0b1001, seal=None):
+    ts = int(time.time() * 1000)
+    return {"mask": str(mask), "timestamp": str(ts), "nonce": nonce,
+            "seal": seal or engine.compute_seal(mask, "GET", ts, PATH, nonce)}
+
+def spans_by_request(events):
+    """[(args do pedido, [estágios por ordem])] por faixa."""
+    tracks = defaultdict(list)
+    for event in events:
+        tracks[event["tid"]].append(event)
+    result = []
+    for track in sorted(tracks):
+        request = next(e for e in tracks[track] if e["name"] == "request")
+        stages = sorted((e for e in tracks[track] if e["name"] != "request"), key=lambda e: e["ts"])
+        result.append((request["args"], [e["name"] for e in stages]))
+    return result
+
+class TestStageTracer(unittest.TestCase):
+    def test_one_in_n_sampling(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tracer = StageTracer(os.path.join(tmp, "spans.json"), sample_every=4)
+            picked = [tracer.begin() is not None for _ in range(12)]
+            tracer.close()
+        self.assertEqual(picked, [True, False, False, False] * 3)
+        for bad in (0, 1.5):
+            with self.assertRaises(ValueError):
+                StageTracer("unused.json", sample_every=bad)
+
+    def test_wsgi_stage_spans(self):
+        engine = EntangledLogicOmegaV5(SECRET, thread_safe=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "spans.json")
+            tracer = StageTracer(path, sample_every=1)
+            app = ElpOmegaWSGIMiddleware(lambda e, s: s("200 OK", [("Content-Type", "text/plain")]) or [b"PRIME"],
+                                         engine=engine, tracer=tracer)
+            for elp in (headers(engine, "a"), headers(engine, "b", seal="0" * 64), headers(engine, "c", mask=3)):
+                environ = {"REQUEST_METHOD": "GET", "PATH_INFO": PATH, "REMOTE_ADDR": "10.0.0.1",
+                           **{f"HTTP_X_ELP_{k.upper()}": v for k, v in elp.items()}}
+                b"".join(app(environ, lambda s, h, exc_info=None: None))
+            tracer.close()
+            events = read_chrome_trace(path)
+        requests = spans_by_request(events)
+        self.assertEqual(requests[0], ({"method": "GET", "path": PATH, "reality": Reality.PRIME, "stage": ""},
+                                       [Span.PARSE, Span.SEAL, Span.NONCE, Span.APP]))
+        self.assertEqual(requests[1][1], [Span.PARSE, Span.SEAL, Span.NONCE, Span.SHADOW, Span.JITTER, Span.JSON])
+        # Adjacência falha antes do selo: não há span de HMAC
+        self.assertEqual(requests[2][1], [Span.PARSE, Span.NONCE, Span.SHADOW, Span.JITTER, Span.JSON])
+        jitter = next(e for e in events if e["name"] == Span.JITTER)
+        self.assertGreaterEqual(jitter["dur"], 15_000)
+
+    def test_asgi_stage_spans_and_summary(self):
+        engine = EntangledLogicOmegaV5(SECRET)
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"PRIME"})
+
+        async def run(middleware):
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                pass
+
+            for nonce in ("a", "a"):
+                scope = {"type": "http", "method": "GET", "path": PATH, "client": ("10.0.0.1", 1),
+                         "headers": [(f"x-elp-{k}".encode(), v.encode()) for k, v in headers(engine, nonce).items()]}
+                await middleware(scope, receive, send)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "spans.json")
+            tracer = StageTracer(path, sample_every=1)
+            asyncio.run(run(ElpOmegaMiddleware(app, engine=engine, tracer=tracer)))
+            tracer.close()
+            events = read_chrome_trace(path)
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                self.assertEqual(main(["summary", path]), 0)
+        requests = spans_by_request(events)
+        self.assertEqual(requests[0][1], [Span.PARSE, Span.SEAL, Span.NONCE, Span.APP])
+        self.assertEqual(requests[1][0]["stage"], "replay")
+        self.assertEqual(requests[1][1][-4:], [Span.SHADOW, Span.JITTER, Span.JSON, Span.SEND])
+        summary = summarize(events)
+        self.assertEqual((summary["request"]["count"], summary[Span.SEAL]["count"]), (2, 2))
+        self.assertIn(Span.JITTER, out.getvalue())
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_folded_stacks_of_live_threads(self):
+        stop = threading.Event()
+
+        def busy_elp_worker():
+            while not stop.is_set():
+                sum(range(1000))
+
+        thread = threading.Thread(target=busy_elp_worker, name="elp-busy")
+        thread.start()
+        try:
+            stacks = SamplingProfiler(interval=0.002).run(0.1)
+        finally:
+            stop.set()
+            thread.join()
+        folded = SamplingProfiler.folded(stacks)
+        self.assertTrue(any(line.startswith("elp-busy;") and "busy_elp_worker" in line
+                            for line in folded.splitlines()))
+        self.assertNotIn("SamplingProfiler.run", folded)
+
+    def test_endpoint(self):
+        app = profiler_app("prof-token", max_seconds=1)
+
+        def call(query=b"seconds=0.05", token="prof-token"):
+            scope = {"type": "http", "method": "GET", "path": "/", "query_string": query,
+                     "headers": [(b"authorization", f"Bearer {token}".encode())]}
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+
+            asyncio.run(app(scope, None, send))
+            return sent[0]["status"], sent[1]["body"].decode()
+
+        self.assertEqual(call(token="wrong")[0], 401)
+        self.assertEqual(call(b"seconds=5")[0], 400)
+        self.assertEqual(call(b"seconds=x")[0], 400)
+        status, body = call()
+        self.assertEqual(status, 200)
+        # A thread principal (o event loop) está no perfil, à espera do executor
+        self.assertIn("MainThread;", body)
+        with self.assertRaises(ValueError):
+            profiler_app("")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import random
+import time
+import unittest
+from elp_omega import EntangledLogicOmegaV5
+from elp_replay_window import SequenceWindowStore, split_sequence_nonce
+from elp_wsgi import ElpOmegaWSGIMiddleware
+
+class TestSequenceWindowStore(unittest.TestCase):
+    def setUp(self):
+        self.store = SequenceWindowStore(window=128, max_clients=2)
+
+    def test_reordering_inside_window(self):
+        self.assertTrue(self.store.add("c:10", 0))
+        self.assertTrue(self.store.add("c:12", 0))
+        self.assertTrue(self.store.add("c:11", 0))
+        self.assertFalse(self.store.add("c:11", 0))
+        self.assertFalse(self.store.add("c:12", 0))
+        self.assertIn("c:10", self.store)
+        self.assertNotIn("c:13", self.store)
+
+    def test_too_old_is_rejected(self):
+        self.assertTrue(self.store.add("c:1000", 0))
+        self.assertTrue(self.store.add("c:873", 0))
+        self.assertFalse(self.store.add("c:872", 0))
+        # Salto maior que a janela: nada do anel antigo sobrevive
+        self.assertTrue(self.store.add("c:5000", 0))
+        self.assertTrue(self.store.add("c:4990", 0))
+
+    def test_matches_reference_model(self):
+        rng, seen, top = random.Random(7), set(), None
+        for _ in range(5000):
+            seq = max(0, (top or 0) + rng.randint(-200, 40))
+            expected = seq not in seen and (top is None or seq > top or top - seq < self.store.window)
+            self.assertEqual(self.store.add(f"m:{seq}", 0), expected)
+            if expected:
+                seen.add(seq)
+                top = seq if top is None else max(top, seq)
+
+    def test_malformed_nonces(self):
+        for nonce in ("semseq", ":5", "c:", "c:-1", "c:+1", "c:1e3", f"c:{1 << 64}", "x" * 200 + ":1"):
+            self.assertIsNone(split_sequence_nonce(nonce), nonce)
+            self.assertFalse(self.store.add(nonce, 0))
+        self.assertEqual(split_sequence_nonce("svc:a:42"), ("svc:a", 42))
+
+    def test_eviction_waits_for_expiry(self):
+        """Janela de um cliente só é esquecida quando nenhum pedido dele pode voltar a ser fresco."""
+        self.assertTrue(self.store.add("a:1", 0, expiry_ms=100))
+        self.assertTrue(self.store.add("b:1", 10, expiry_ms=200))
+        self.assertFalse(self.store.add("c:1", 50))
+        self.assertEqual(self.store.rejected_full, 1)
+        self.assertTrue(self.store.add("c:1", 100))
+        self.assertEqual(len(self.store), 2)
+        self.assertNotIn("a:1", self.store)
+        self.assertGreater(self.store.stats()["bytes_per_client"], 0)
+
+class TestEngineWithSequenceWindow(unittest.TestCase):
+    def test_wsgi_replay_by_sequence(self):
+        secret = b"seq-secret"
+        engine = EntangledLogicOmegaV5(secret, nonce_store=SequenceWindowStore())
+        app = ElpOmegaWSGIMiddleware(lambda e, s: s("200 OK", [("Content-Type", "text/plain")]) or [b"PRIME"],
+                                     engine=engine)
+        ts = int(time.time() * 1000)
+
+        def call(nonce):
+            environ = {"REQUEST_METHOD": "GET", "PATH_INFO": "/api", "REMOTE_ADDR": "10.0.0.1",
+                       "HTTP_X_ELP_MASK": "9", "HTTP_X_ELP_TIMESTAMP": str(ts), "HTTP_X_ELP_NONCE": nonce,
+                       "HTTP_X_ELP_SEAL": engine.compute_seal(9, "GET", ts, "/api", nonce)}
+            return b"".join(app(environ, lambda s, h, exc_info=None: None))
+
+        self.assertEqual([call("cli-7:1"), call("cli-7:3"), call("cli-7:2")], [b"PRIME"] * 3)
+        self.assertNotEqual(call("cli-7:2"), b"PRIME")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import time
+import unittest
+from elp_drift import ClockDriftEstimator
+from elp_events import Stage
+from elp_guard import ElpGuard
+from elp_middleware import ElpOmegaMiddleware
+from elp_omega import DEFAULT_SHADOW_TEMPLATES, EntangledLogicOmegaV5, Reality
+from elp_routes import DEFAULT_POLICY, RoutePolicy, RoutePolicyTable
+from elp_wsgi import ElpOmegaWSGIMiddleware
+
+SECRET = b"routes-test-secret"
+TEMPLATES = dict(DEFAULT_SHADOW_TEMPLATES, retail=dict(DEFAULT_SHADOW_TEMPLATES["banking"], region="eu-west-1"))
+
+def signed(engine, path, mask=0b1001, nonce="n-1", ts=None):
+    ts = int(time.time() * 1000) if ts is None else ts
+    return {"mask": str(mask), "timestamp": str(ts), "nonce": nonce,
+            "seal": engine.compute_seal(mask, "GET", ts, path, nonce)}
+
+class TestRoutePolicyTable(unittest.TestCase):
+    def setUp(self):
+        self.table = RoutePolicyTable({
+            "/health": {"bypass": True},
+            "/static/*": {"bypass": True},
+            "/api/*": {"max_age_ms": 30_000},
+            "/api/v1/transfers": RoutePolicy(required_mask=0b101),
+        })
+
+    def test_exact_then_longest_prefix(self):
+        self.assertTrue(self.table.resolve("/health").bypass)
+        self.assertTrue(self.table.resolve("//health/").bypass)
+        self.assertIs(self.table.resolve("/healthz"), DEFAULT_POLICY)
+        self.assertTrue(self.table.resolve("/static").bypass)
+        self.assertTrue(self.table.resolve("/static/css/app.css").bypass)
+        self.assertEqual(self.table.resolve("/api/v1/transfers").required_mask, 0b101)
+        self.assertEqual(self.table.resolve("/api/v1/transfers/9").max_age_ms, 30_000)
+        self.assertIs(self.table.resolve("/"), DEFAULT_POLICY)
+
+    def test_dot_segments_never_bypass(self):
+        self.assertIs(self.table.resolve("/static/../api/v1/transfers"), DEFAULT_POLICY)
+        self.assertIs(self.table.resolve("/static/./x"), DEFAULT_POLICY)
+
+    def test_invalid_patterns_and_policies(self):
+        for routes in ({"health": {}}, {"/a/*/b": {}}, {"/a/../b": {}}, {"/a": {"required_mask": 0b11}},
+                       {"/a": {"max_age_ms": 0}}, {"/a": {"unknown": 1}}):
+            with self.assertRaises((ValueError, TypeError), msg=routes):
+                RoutePolicyTable(routes)
+
+    def test_update_routes_swaps_table(self):
+        self.table.update_routes({"/health/*": {"bypass": True}})
+        self.assertTrue(self.table.resolve("/health/live").bypass)
+        self.assertIs(self.table.resolve("/static/x"), DEFAULT_POLICY)
+
+class TestGuardWithPolicies(unittest.TestCase):
+    def setUp(self):
+        self.engine = EntangledLogicOmegaV5(SECRET, shadow_templates=TEMPLATES)
+        self.guard = ElpGuard(self.engine, route_policies=RoutePolicyTable({
+            "/api/fast": {"max_age_ms": 1000}, "/api/admin": {"required_mask": 0b1000},
+        }))
+
+    def test_tighter_freshness_window(self):
+        old = int(time.time() * 1000) - 5000
+        self.assertEqual(self.guard.evaluate("GET", "/api/fast", signed(self.engine, "/api/fast", ts=old), "c"),
+                         (Reality.SHADOW, Stage.FRESHNESS))
+        self.assertEqual(self.guard.evaluate("GET", "/api/slow", signed(self.engine, "/api/slow", ts=old), "c"),
+                         (Reality.PRIME, Stage.NONE))
+
+    def test_policy_never_widens_engine_window(self):
+        """Com ou sem estimador de drift, max_age_ms acima do engine não alarga a janela nem a vida do nonce."""
+        for drift in (None, ClockDriftEstimator()):
+            engine = EntangledLogicOmegaV5(SECRET, max_age_ms=10_000)
+            guard = ElpGuard(engine, drift_estimator=drift,
+                             route_policies=RoutePolicyTable({"/api/wide": {"max_age_ms": 600_000}}))
+            now = int(time.time() * 1000)
+            stale = signed(engine, "/api/wide", nonce="old", ts=now - 60_000)
+            self.assertEqual(guard.evaluate("GET", "/api/wide", stale, "c"), (Reality.SHADOW, Stage.FRESHNESS),
+                             msg=drift)
+            fresh = signed(engine, "/api/wide", nonce="new", ts=now)
+            self.assertEqual(guard.evaluate("GET", "/api/wide", fresh, "c"), (Reality.PRIME, Stage.NONE))
+            self.assertEqual(engine._used_nonces._expiry["new"], now + 10_000 + 1, msg=drift)
+
+    def test_required_mask(self):
+        self.assertEqual(self.guard.evaluate("GET", "/api/admin", signed(self.engine, "/api/admin", mask=0b1), "c"),
+                         (Reality.SHADOW, Stage.AUTHORIZATION))
+        self.assertEqual(self.guard.evaluate("GET", "/api/admin", signed(self.engine, "/api/admin"), "c"),
+                         (Reality.PRIME, Stage.NONE))
+
+    def test_unknown_template_fails_at_startup(self):
+        with self.assertRaises(ValueError):
+            ElpGuard(self.engine, route_policies=RoutePolicyTable({"/x": {"shadow_template": "nope"}}))
+
+class TestAdaptersWithPolicies(unittest.TestCase):
+    routes = {"/health": {"bypass": True}, "/api/shop/*": {"shadow_template": "retail"}}
+
+    def test_asgi_bypass_and_shadow_template(self):
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b'{"data":"PRIME_DATA"}'})
+
+        engine = EntangledLogicOmegaV5(SECRET, shadow_templates=TEMPLATES)
+        middleware = ElpOmegaMiddleware(app, engine=engine, route_policies=RoutePolicyTable(self.routes))
+
+        def call(path):
+            scope = {"type": "http", "method": "GET", "path": path, "client": ("10.0.0.1", 1), "headers": []}
+            sent = []
+
+            async def receive():
+                return {"type": "http.request", "body": b""}
+
+            async def send(message):
+                sent.append(message)
+
+            asyncio.run(middleware(scope, receive, send))
+            return json.loads(b"".join(m.get("body", b"") for m in sent[1:]))
+
+        self.assertEqual(call("/health"), {"data": "PRIME_DATA"})
+        self.assertEqual(call("/api/shop/cart")["meta"]["region"], "eu-west-1")
+        self.assertEqual(call("/api/bank")["meta"]["region"], "us-east-1")
+
+    def test_wsgi_bypass(self):
+        def app(environ, start_response):
+            start_response("200 OK", [("Content-Type", "application/json")])
+            return [b'{"data": "PRIME_DATA"}']
+
+        middleware = ElpOmegaWSGIMiddleware(app, engine=EntangledLogicOmegaV5(SECRET, shadow_templates=TEMPLATES),
+                                            route_policies=RoutePolicyTable(self.routes))
+
+        def call(path):
+            environ = {"REQUEST_METHOD": "GET", "SCRIPT_NAME": "", "PATH_INFO": path, "REMOTE_ADDR": "10.0.0.1"}
+            return json.loads(b"".join(middleware(environ, lambda s, h, exc_info=None: None)))
+
+        self.assertEqual(call("/health"), {"data": "PRIME_DATA"})
+        self.assertEqual(call("/api/shop/cart")["meta"]["region"], "eu-west-1")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from elp_omega import DEFAULT_SHADOW_TEMPLATES, EntangledLogicOmegaV5
+from elp_shadow_world import ShadowWorld, entity_of
+
+class TestShadowWorld(unittest.TestCase):
+    def test_entity_of(self):
+        self.assertEqual(entity_of("/api/v1/accounts/123/transactions"), "/api/v1/accounts/123")
+        self.assertEqual(entity_of("/api/v1/accounts/123?page=2"), "/api/v1/accounts/123")
+        self.assertEqual(entity_of("/api/v1/resource"), "/api/v1/resource")
+
+    def test_same_entity_across_nonces(self):
+        """Scraping repetido vê o mesmo saldo; só os campos por-pedido mudam."""
+        engine = EntangledLogicOmegaV5(b"world-secret")
+        a = engine.generate_shadow("STRUCT", "GET", "/accounts/42", "nonce-a")
+        b = engine.generate_shadow("STRUCT", "POST", "/accounts/42/statement", "nonce-b")
+        self.assertEqual(a["data"], b["data"])
+        self.assertNotEqual(a["transaction_id"], b["transaction_id"])
+        other = engine.generate_shadow("STRUCT", "GET", "/accounts/43", "nonce-a")
+        self.assertNotEqual(a["data"]["balance"], other["data"]["balance"])
+
+    def test_lru_eviction_regenerates_identically(self):
+        world = ShadowWorld(b"s", DEFAULT_SHADOW_TEMPLATES, max_entities=2)
+        first = world.entity("/accounts/1")
+        world.entity("/accounts/2")
+        world.entity("/accounts/3")
+        self.assertEqual(len(world), 2)
+        self.assertEqual(world.entity("/accounts/1"), first)
+        self.assertEqual(world.materialized, 4)
+
+    def test_returned_entity_is_a_copy(self):
+        world = ShadowWorld(b"s", DEFAULT_SHADOW_TEMPLATES)
+        world.entity("/accounts/1")["flags"].append("tampered")
+        self.assertNotIn("tampered", world.entity("/accounts/1")["flags"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import asyncio
+import io
+import json
+import time
+import unittest
+from elp_events import EventLog, Stage
+from elp_middleware import ElpOmegaMiddleware
+from elp_omega import EntangledLogicOmegaV5
+from elp_shaper import CheapShadowCache, CoalescedDelay, GcraShaper
+from elp_wsgi import ElpOmegaWSGIMiddleware
+
+class TestGcraShaper(unittest.TestCase):
+    def test_burst_then_nominal_rate(self):
+        shaper = GcraShaper(rate=10, burst=3)
+        self.assertEqual([shaper.allow("a", 0.0) for _ in range(5)], [True, True, True, True, False])
+        # 100 ms depois (1/rate) há espaço para exatamente mais um
+        self.assertEqual([shaper.allow("a", 0.1), shaper.allow("a", 0.1)], [True, False])
+        self.assertTrue(shaper.allow("b", 0.1))
+        self.assertEqual(shaper.limited, 2)
+
+    def test_rejected_requests_do_not_extend_penalty(self):
+        shaper = GcraShaper(rate=10, burst=0)
+        self.assertTrue(shaper.allow("a", 0.0))
+        for _ in range(1000):
+            shaper.allow("a", 0.05)
+        self.assertTrue(shaper.allow("a", 0.1))
+
+    def test_bounded_lru_and_stats(self):
+        shaper = GcraShaper(rate=1, burst=0, max_fingerprints=2)
+        for fp in ("a", "b", "a", "c"):
+            shaper.allow(fp, 0.0)
+        self.assertEqual(len(shaper), 2)
+        # "b" foi despejado e volta com o bucket cheio; "a" continua limitado
+        self.assertTrue(shaper.allow("b", 0.0))
+        self.assertFalse(shaper.allow("c", 0.0))
+        stats = shaper.stats()
+        self.assertEqual(stats["fingerprints"], 2)
+        self.assertGreater(stats["bytes_per_fingerprint"], 0)
+
+class TestCheapTier(unittest.TestCase):
+    def test_cached_body_per_entity(self):
+        cache = CheapShadowCache(EntangledLogicOmegaV5(b"k"), ttl=1.0)
+        first = cache.body("GET", "/contas/42/extrato", now=0.0)
+        self.assertIs(cache.body("GET", "/contas/42/extrato", now=0.5), first)
+        self.assertIn("transaction_id", json.loads(first))
+        cache.body("GET", "/contas/42/extrato", now=1.5)
+        cache.body("GET", "/contas/43/extrato", now=1.5)
+        self.assertEqual(cache.built, 3)
+
+    def test_coalesced_timers(self):
+        delay = CoalescedDelay(tick=0.01, slots=2)
+
+        async def flood():
+            await asyncio.gather(*(delay.wait() for _ in range(200)))
+
+        asyncio.run(flood())
+        self.assertLessEqual(delay.timers, 4)
+
+class TestShapedMiddleware(unittest.TestCase):
+    def test_wsgi_flood_skips_hmac(self):
+        engine = EntangledLogicOmegaV5(b"k", thread_safe=True)
+        calls = []
+        verify = engine.verify_seal
+        engine.verify_seal = lambda *args: calls.append(args) or verify(*args)
+        log = EventLog(sink=None, capacity=16)
+        app = ElpOmegaWSGIMiddleware(lambda e, s: [], engine=engine, event_log=log,
+                                     shaper=GcraShaper(rate=1, burst=1))
+        ts = int(time.time() * 1000)
+        bodies = []
+        for i in range(4):
+            environ = {"REQUEST_METHOD": "GET", "PATH_INFO": "/api/v1/resource", "REMOTE_ADDR": "10.0.0.9",
+                       "wsgi.input": io.BytesIO(b""), "HTTP_X_ELP_MASK": "9", "HTTP_X_ELP_TIMESTAMP": str(ts),
+                       "HTTP_X_ELP_NONCE": f"n-{i}",
+                       "HTTP_X_ELP_SEAL": engine.compute_seal(9, "GET", ts, "/api/v1/resource", f"n-{i}")}
+            bodies.append(b"".join(app(environ, lambda s, h, exc_info=None: None)))
+        # Rajada de 2 (burst=1) passa pela cascata; o resto fica no nível barato, sem HMAC
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(bodies[2], bodies[3])
+        self.assertEqual([e.stage for e in log.ring.drain(16)], [Stage.NONE, Stage.NONE, Stage.RATE, Stage.RATE])
+
+    def test_asgi_flood_gets_cheap_shadow(self):
+        async def app(scope, receive, send):
+            raise AssertionError("o pedido limitado nunca chega à app")
+
+        middleware = ElpOmegaMiddleware(app, secret_key="k", shaper=GcraShaper(rate=1, burst=0))
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/resource", "client": ("10.0.0.9", 1),
+                 "headers": [(b"x-elp-mask", b"3")]}
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def flood():
+            for _ in range(3):
+                await middleware(scope, None, send)
+
+        asyncio.run(flood())
+        bodies = [m["body"] for m in sent if m["type"] == "http.response.body"]
+        self.assertEqual(len(bodies), 3)
+        self.assertEqual(bodies[1], bodies[2])
+        self.assertEqual(middleware.shaper.limited, 2)
+
+if __name__ == "__main__":
+    unittest.main()
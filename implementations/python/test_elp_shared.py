@@ -0,0 +1,83 @@
+import os
+import unittest
+import threading
+from elp_omega import EntangledLogicOmegaV5, NonceStore, StripedNonceStore
+from elp_shared import Keyring, SharedNonceTable, SharedState
+
+class TestNonceStore(unittest.TestCase):
+    def test_expiry_reopens_nothing_inside_window(self):
+        store = NonceStore(max_age_ms=1000)
+        self.assertTrue(store.add("a", 0))
+        self.assertFalse(store.add("a", 999))
+        # Após a janela o nonce é descartado (o timestamp já seria rejeitado)
+        self.assertTrue(store.add("b", 1001))
+        self.assertNotIn("a", store)
+        self.assertEqual(len(store), 1)
+
+class TestStripedNonceStore(unittest.TestCase):
+    def test_threads_never_admit_a_nonce_twice(self):
+        store = StripedNonceStore(max_age_ms=1000, stripes=4)
+        admitted = []
+
+        def worker():
+            admitted.extend(n for n in range(500) if store.add(f"n{n}", 0))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(admitted), list(range(500)))
+        self.assertEqual(len(store), 500)
+        self.assertTrue(store.add("n1", 1000))
+
+class TestSharedNonceTable(unittest.TestCase):
+    def test_replay_visible_across_fork(self):
+        """Nonce consumido por um worker é Replay para os demais."""
+        table = SharedNonceTable(capacity=1024, max_age_ms=1000, stripes=4)
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if table.add("worker-nonce", 10) else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertFalse(table.add("worker-nonce", 20))
+        self.assertTrue(table.contains("worker-nonce", 20))
+
+    def test_expired_slots_are_reused(self):
+        table = SharedNonceTable(capacity=4, max_age_ms=100, stripes=1)
+        for i in range(4):
+            self.assertTrue(table.add(f"n{i}", 0))
+        # Faixa cheia: fail-closed
+        self.assertFalse(table.add("overflow", 50))
+        self.assertTrue(table.add("overflow", 200))
+        self.assertEqual(table.live_count(200), 1)
+
+    def test_full_rejections_counted_across_fork(self):
+        table = SharedNonceTable(capacity=4, max_age_ms=100, stripes=1)
+        for i in range(4):
+            table.add(f"n{i}", 0)
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if not table.add("child", 10) else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertFalse(table.add("parent", 10))
+        # Replay não é recusa por faixa cheia
+        self.assertFalse(table.add("n0", 10))
+        self.assertEqual(table.stats(10), {"capacity": 4, "live": 4, "load": 1.0, "rejected_full": 2})
+
+class TestKeyringRotation(unittest.TestCase):
+    def test_previous_key_still_verifies(self):
+        old = Keyring(b"old-key")
+        new = old.rotate(b"new-key")
+        self.assertEqual(new.previous, (b"old-key",))
+
+        signer = EntangledLogicOmegaV5(b"old-key")
+        seal = signer.compute_seal(1, "GET", 1, "/p", "n")
+        engine = SharedState(new).build_engine()
+        self.assertTrue(engine.verify_seal(seal, 1, "GET", 1, "/p", "n"))
+        self.assertFalse(engine.verify_seal(seal, 1, "GET", 1, "/p", "other"))
+        self.assertFalse(SharedState(new.rotate(b"newer-key")).build_engine().verify_seal(seal, 1, "GET", 1, "/p", "n"))
+
+if __name__ == "__main__":
+    unittest.main()
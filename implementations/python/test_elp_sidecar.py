@@ -0,0 +1,161 @@
+import asyncio
+import json
+import time
+import unittest
+from elp_omega import EntangledLogicOmegaV5
+from elp_sidecar import UpstreamProxy, create_sidecar
+
+SECRET = "sidecar-test-secret"
+
+def signed_headers(path, method="GET", nonce="n-1"):
+    engine = EntangledLogicOmegaV5(SECRET.encode())
+    ts = int(time.time() * 1000)
+    return [(b"x-elp-mask", b"9"), (b"x-elp-timestamp", str(ts).encode()), (b"x-elp-nonce", nonce.encode()),
+            (b"x-elp-seal", engine.compute_seal(9, method, ts, path, nonce).encode())]
+
+async def start_stub(seen):
+    """Upstream HTTP/1.1 keep-alive mínimo: ecoa o pedido; /chunked responde em chunks."""
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head[:-4].decode("latin-1").split("\r\n")
+                headers = dict(line.lower().split(": ", 1) for line in lines[1:])
+                if "content-length" in headers:
+                    body = await reader.readexactly(int(headers["content-length"]))
+                elif headers.get("transfer-encoding") == "chunked":
+                    body = b""
+                    while True:
+                        size = int((await reader.readuntil(b"\r\n"))[:-2], 16)
+                        body += await reader.readexactly(size + 2)
+                        body = body[:-2]
+                        if size == 0:
+                            break
+                else:
+                    body = b""
+                seen.append({"line": lines[0], "headers": headers, "body": body.decode()})
+                payload = json.dumps({"line": lines[0], "body": body.decode()}).encode()
+                if lines[0].split()[1].endswith("/chunked"):
+                    writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\ntransfer-encoding: chunked\r\n\r\n")
+                    for part in (payload[:10], payload[10:]):
+                        writer.write(b"%x\r\n%s\r\n" % (len(part), part))
+                    writer.write(b"0\r\n\r\n")
+                else:
+                    writer.write(b"HTTP/1.1 201 Created\r\ncontent-type: application/json\r\n"
+                                 b"content-length: %d\r\n\r\n%s" % (len(payload), payload))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+async def call(app, method, path, headers, chunks=(b"",), query=b""):
+    scope = {"type": "http", "method": method, "path": path, "raw_path": path.encode(), "query_string": query,
+             "headers": [(b"host", b"api.example")] + headers, "client": ("10.0.0.5", 1234), "scheme": "https"}
+    pending = [{"type": "http.request", "body": c, "more_body": i < len(chunks) - 1} for i, c in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        return pending.pop(0) if pending else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+class TestSidecar(unittest.TestCase):
+    def run_with_stub(self, scenario):
+        seen = []
+
+        async def main():
+            server, port = await start_stub(seen)
+            async with server:
+                return await scenario(port)
+
+        return asyncio.run(main()), seen
+
+    def test_prime_is_forwarded_over_pooled_connection(self):
+        async def scenario(port):
+            app = create_sidecar(f"http://127.0.0.1:{port}", secret_key=SECRET)
+            first = await call(app, "GET", "/api/v1/resource", signed_headers("/api/v1/resource", nonce="a"), query=b"x=1")
+            second = await call(app, "GET", "/api/v1/resource", signed_headers("/api/v1/resource", nonce="b"))
+            return first, second, app.app.pool.opened, app.app.pool.reused
+
+        (first, second, opened, reused), seen = self.run_with_stub(scenario)
+        self.assertEqual(first[0], 201)
+        self.assertEqual(json.loads(first[1])["line"], "GET /api/v1/resource?x=1 HTTP/1.1")
+        self.assertEqual((opened, reused), (1, 1))
+        headers = seen[0]["headers"]
+        self.assertFalse([name for name in headers if name.startswith("x-elp-")])
+        self.assertEqual((headers["host"], headers["x-forwarded-for"], headers["x-forwarded-proto"]),
+                         ("api.example", "10.0.0.5", "https"))
+
+    def test_shadow_never_reaches_upstream(self):
+        async def scenario(port):
+            app = create_sidecar(f"http://127.0.0.1:{port}", secret_key=SECRET)
+            return await call(app, "GET", "/api/v1/resource", [(b"x-elp-mask", b"3")])
+
+        (status, body), seen = self.run_with_stub(scenario)
+        self.assertEqual(status, 200)
+        self.assertIn("transaction_id", json.loads(body))
+        self.assertEqual(seen, [])
+
+    def test_streamed_body_and_chunked_response(self):
+        async def scenario(port):
+            app = create_sidecar(f"http://127.0.0.1:{port}/svc", secret_key=SECRET)
+            return await call(app, "POST", "/chunked", signed_headers("/chunked", "POST"), chunks=[b"ab", b"cd", b"ef"])
+
+        (status, body), seen = self.run_with_stub(scenario)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {"line": "POST /svc/chunked HTTP/1.1", "body": "abcdef"})
+        self.assertEqual(seen[0]["headers"]["transfer-encoding"], "chunked")
+
+    def test_close_without_response_retries_only_safe_methods(self):
+        """Upstream que lê o pedido e fecha sem responder: um POST nunca é reenviado."""
+        seen = []
+
+        async def handle(reader, writer):
+            try:
+                while True:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                    lines = head[:-4].decode("latin-1").split("\r\n")
+                    headers = dict(line.lower().split(": ", 1) for line in lines[1:])
+                    await reader.readexactly(int(headers.get("content-length", 0)))
+                    seen.append(lines[0])
+                    if lines[0].split()[1] == "/drop" and seen.count(lines[0]) == 1:
+                        writer.close()
+                        return
+                    writer.write(b"HTTP/1.1 200 OK\r\ncontent-length: 2\r\n\r\nok")
+                    await writer.drain()
+            except (asyncio.IncompleteReadError, ConnectionError):
+                writer.close()
+
+        async def scenario():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            async with server:
+                proxy = UpstreamProxy(f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}")
+                results = []
+                for method, chunks in (("POST", (b"amount=100",)), ("GET", (b"",))):
+                    await call(proxy, "GET", "/warm", [])  # deixa uma conexão ociosa no pool
+                    results.append(await call(proxy, method, "/drop", [], chunks=chunks))
+                proxy.pool.close()
+                return results
+
+        (post, get) = asyncio.run(scenario())
+        self.assertEqual(post[0], 502)
+        self.assertEqual(seen.count("POST /drop HTTP/1.1"), 1)
+        self.assertEqual(get, (200, b"ok"))
+        self.assertEqual(seen.count("GET /drop HTTP/1.1"), 2)
+
+    def test_upstream_down_is_bad_gateway(self):
+        async def scenario():
+            return await call(UpstreamProxy("http://127.0.0.1:9"), "GET", "/", [])
+
+        self.assertEqual(asyncio.run(scenario())[0], 502)
+        with self.assertRaises(ValueError):
+            UpstreamProxy("https://upstream:443")
+
+if __name__ == "__main__":
+    unittest.main()
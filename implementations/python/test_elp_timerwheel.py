@@ -0,0 +1,59 @@
+import asyncio
+import unittest
+from elp_timerwheel import TimerWheel
+
+class TestTimerWheel(unittest.TestCase):
+    def setUp(self):
+        self.wheel = TimerWheel()
+
+    def run_sleeps(self, delays):
+        """(atraso pedido, atraso real) por chamada, todas em paralelo."""
+        async def one(delay):
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await self.wheel.sleep(delay)
+            return delay, loop.time() - started
+
+        async def main():
+            return await asyncio.gather(*(one(d) for d in delays))
+
+        return asyncio.run(main())
+
+    def test_fires_after_requested_delay(self):
+        for requested, elapsed in self.run_sleeps([0.002, 0.015, 0.040, 0.060]):
+            self.assertGreaterEqual(elapsed, requested - self.wheel.tick)
+            self.assertLess(elapsed, requested + 0.05)
+        self.assertEqual(len(self.wheel), 0)
+        self.assertEqual(self.wheel.parked, 0)
+
+    def test_same_bucket_shares_one_wakeup(self):
+        # A criação das 1000 tarefas espalha-se por alguns ms: poucos baldes, não 1000 timers
+        self.run_sleeps([0.020] * 1000)
+        self.assertLess(self.wheel.wakeups, 50)
+
+    def test_cascades_across_levels(self):
+        """300 ms e 600 ms ficam no nível 1 e descem para o nível 0 na volta da roda."""
+        results = self.run_sleeps([0.600, 0.010, 0.300])
+        for requested, elapsed in results:
+            self.assertGreaterEqual(elapsed, requested - self.wheel.tick)
+            self.assertLess(elapsed, requested + 0.05)
+
+    def test_cancelled_waiter_does_not_cancel_bucket(self):
+        async def main():
+            first = asyncio.ensure_future(self.wheel.sleep(0.010))
+            second = asyncio.ensure_future(self.wheel.sleep(0.010))
+            await asyncio.sleep(0)
+            first.cancel()
+            await second
+            await asyncio.gather(first, return_exceptions=True)
+            return first.cancelled()
+
+        self.assertTrue(asyncio.run(main()))
+
+    def test_new_event_loop_resets_wheel(self):
+        self.run_sleeps([0.005])
+        self.run_sleeps([0.005])
+        self.assertEqual(len(self.wheel), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from elp_events import Stage
+from elp_omega import EntangledLogicOmegaV5, Reality
+from elp_shaper import GcraShaper
+from elp_trace import TraceCapture, TraceRecord, TraceSink, load_traces, main, read_trace, simulate
+from elp_wsgi import ElpOmegaWSGIMiddleware
+
+SECRET = b"trace-test-secret"
+
+def synthetic(clients=50, requests=40, step_ms=50, start_ms=1_700_000_000_000):
+    """Clientes legítimos com um replay a cada 10 pedidos; relógio virtual a 20 pedidos/s."""
+    records, ts = [], start_ms
+    for seq in range(requests):
+        for client in range(clients):
+            nonce = f"c{client}:{seq - 1 if seq % 10 == 9 else seq}"
+            records.append(TraceRecord(ts, f"10.0.0.{client}", "GET", f"/api/v1/accounts/{client}", "9", ts - 200,
+                                       nonce, False, True, Reality.PRIME, Stage.NONE, 12.5))
+            ts += step_ms // clients or 1
+    return records
+
+class TestTraceFormat(unittest.TestCase):
+    def test_roundtrip(self):
+        records = synthetic(clients=3, requests=2)
+        records.append(records[0]._replace(nonce="n" * 300, mask="", body=True, seal_ok=False,
+                                           reality=Reality.SHADOW, stage=Stage.BODY))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.bin")
+            sink = TraceSink(path, sample_rate=0.25)
+            sink.write_batch(records)
+            sink.close()
+            rate, loaded = read_trace(path)
+        self.assertEqual(rate, 0.25)
+        self.assertEqual(loaded[:-1], records[:-1])
+        self.assertEqual(len(loaded[-1].nonce), 32)  # nonce longo vira digest, não truncado
+        self.assertEqual((loaded[-1].body, loaded[-1].seal_ok, loaded[-1].stage), (True, False, Stage.BODY))
+
+    def test_sampling_is_per_fingerprint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            capture = TraceCapture(os.path.join(tmp, "t.bin"), sample_rate=0.1)
+            picked = [capture.sample(f"10.0.{i // 256}.{i % 256}") for i in range(10_000)]
+            self.assertEqual(picked, [capture.sample(f"10.0.{i // 256}.{i % 256}") for i in range(10_000)])
+            self.assertAlmostEqual(sum(picked) / len(picked), 0.1, delta=0.02)
+            capture.close()
+        with self.assertRaises(ValueError):
+            TraceCapture("unused.bin", sample_rate=0)
+
+class TestCaptureFromAdapter(unittest.TestCase):
+    def test_wsgi_capture_records_seal_verdicts(self):
+        engine = EntangledLogicOmegaV5(SECRET, thread_safe=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.bin")
+            capture = TraceCapture(path, sample_rate=1.0)
+            app = ElpOmegaWSGIMiddleware(lambda e, s: s("200 OK", [("Content-Type", "text/plain")]) or [b"PRIME"],
+                                         engine=engine, capture=capture)
+
+            def call(nonce, ts, seal=None):
+                environ = {"REQUEST_METHOD": "GET", "PATH_INFO": "/api", "REMOTE_ADDR": "10.0.0.1",
+                           "HTTP_X_ELP_MASK": "9", "HTTP_X_ELP_TIMESTAMP": str(ts), "HTTP_X_ELP_NONCE": nonce,
+                           "HTTP_X_ELP_SEAL": seal or engine.compute_seal(9, "GET", ts, "/api", nonce)}
+                return b"".join(app(environ, lambda s, h, exc_info=None: None))
+
+            now = int(time.time() * 1000)
+            call("a", now)
+            call("a", now)
+            call("b", now, seal="0" * 64)
+            call("c", now - 10 * 60_000)
+            capture.close()
+            _, records = read_trace(path)
+        self.assertEqual([(r.reality, r.stage, r.seal_ok) for r in records], [
+            (Reality.PRIME, Stage.NONE, True), (Reality.SHADOW, Stage.REPLAY, True),
+            (Reality.SHADOW, Stage.SEAL, False),
+            # Velho demais: o selo não é verificado em produção, mas o trace guarda o veredicto
+            (Reality.SHADOW, Stage.FRESHNESS, True),
+        ])
+        self.assertEqual((records[0].mask, records[0].nonce, records[0].path), ("9", "a", "/api"))
+
+    def test_rate_tier_capture_runs_no_hmac(self):
+        engine = EntangledLogicOmegaV5(SECRET, thread_safe=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.bin")
+            capture = TraceCapture(path, sample_rate=1.0)
+            app = ElpOmegaWSGIMiddleware(lambda e, s: s("200 OK", [("Content-Type", "text/plain")]) or [b"PRIME"],
+                                         engine=engine, capture=capture, shaper=GcraShaper(rate=0.001, burst=1))
+            now = int(time.time() * 1000)
+            for nonce in ("a", "b"):
+                environ = {"REQUEST_METHOD": "GET", "PATH_INFO": "/api", "REMOTE_ADDR": "10.0.0.1",
+                           "HTTP_X_ELP_MASK": "9", "HTTP_X_ELP_TIMESTAMP": str(now), "HTTP_X_ELP_NONCE": nonce,
+                           "HTTP_X_ELP_SEAL": engine.compute_seal(9, "GET", now, "/api", nonce)}
+                b"".join(app(environ, lambda s, h, exc_info=None: None))
+            seals = []
+            engine.verify_seal = lambda *args: seals.append(args) or True
+            b"".join(app(dict(environ, HTTP_X_ELP_NONCE="c"), lambda s, h, exc_info=None: None))
+            capture.close()
+            _, records = read_trace(path)
+        self.assertEqual(seals, [])
+        self.assertEqual([(r.stage, r.seal_ok) for r in records],
+                         [(Stage.NONE, True), (Stage.NONE, True), (Stage.RATE, None)])
+        self.assertEqual((records[2].mask, records[2].timestamp, records[2].nonce), ("9", now, "c"))
+        # Sem veredicto de produção, o simulador admite o selo: o pior caso para os stores
+        report = simulate(records, memory=False)
+        self.assertEqual(report["realities"], {Reality.PRIME: 3})
+
+class TestSimulator(unittest.TestCase):
+    def setUp(self):
+        self.records = synthetic()
+
+    def test_replays_and_window_sizing(self):
+        wide = simulate(self.records, memory=False)
+        narrow = simulate(self.records, memory=False, max_age_ms=1000)
+        self.assertEqual(wide["stages"][Stage.REPLAY], 50 * 4)
+        self.assertEqual(wide["replay_ratio"], narrow["replay_ratio"])
+        self.assertLess(narrow["peak_entries"]["nonces"], wide["peak_entries"]["nonces"])
+        self.assertGreater(wide["speedup"], 1)
+
+    def test_rate_candidate_and_sample_scaling(self):
+        report = simulate(self.records, sample_rate=0.5, memory=True, rate=5, burst=2)
+        self.assertGreater(report["limited_ratio"], 0.5)
+        self.assertGreater(report["cheap_hit_ratio"], 0)
+        self.assertEqual(report["peak_entries"]["shaper_fingerprints"], 100)
+        self.assertGreater(report["peak_mib"], 0)
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.bin")
+            sink = TraceSink(path, 1.0)
+            sink.write_batch(self.records)
+            sink.close()
+            self.assertEqual(len(load_traces([path])[1]), len(self.records))
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                code = main(["simulate", path, "--no-memory", "--candidate", "", "--candidate",
+                             "nonce_store=window,drift=1"])
+            self.assertEqual(code, 0)
+            reports = [json.loads(line) for line in out.getvalue().splitlines()]
+            self.assertEqual(reports[1]["options"], {"nonce_store": "window", "drift": 1})
+            with contextlib.redirect_stderr(io.StringIO()):
+                self.assertEqual(main(["simulate", path, "--candidate", "unknown=1"]), 2)
+
+if __name__ == "__main__":
+    unittest.main()
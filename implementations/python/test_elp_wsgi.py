@@ -0,0 +1,136 @@
+import hashlib
+import io
+import json
+import threading
+import time
+import unittest
+from elp_drift import ClockDriftEstimator
+from elp_events import EventLog, Stage
+from elp_omega import EntangledLogicOmegaV5
+from elp_wsgi import ElpOmegaWSGIMiddleware
+
+SECRET = "wsgi-test-secret"
+
+def resource_app(environ, start_response):
+    start_response("201 Created", [("Content-Type", "application/json")])
+    return [b'{"data": "PRIME_DATA", "cpf": "123.456.789-10"}']
+
+def signed_environ(path="/api/v1/resource", method="GET", mask=0b1001, nonce="n-1", ts=None, script_name="",
+                   body=None, signed_body=None):
+    engine = EntangledLogicOmegaV5(SECRET.encode())
+    ts = int(time.time() * 1000) if ts is None else ts
+    signed_body = body if signed_body is None else signed_body
+    digest = None if signed_body is None else hashlib.sha256(signed_body).hexdigest()
+    environ = {
+        "REQUEST_METHOD": method, "SCRIPT_NAME": script_name, "PATH_INFO": path[len(script_name):],
+        "REMOTE_ADDR": "10.0.0.1", "wsgi.input": io.BytesIO(body or b""),
+        "HTTP_X_ELP_MASK": str(mask), "HTTP_X_ELP_TIMESTAMP": str(ts), "HTTP_X_ELP_NONCE": nonce,
+        "HTTP_X_ELP_SEAL": engine.compute_seal(mask, method, ts, path, nonce, digest),
+    }
+    if digest is not None:
+        environ.update(HTTP_X_ELP_BODY_DIGEST=digest, CONTENT_LENGTH=str(len(body)))
+    return environ
+
+def call(app, environ):
+    status = []
+    body = b"".join(app(environ, lambda s, h, exc_info=None: status.append(s)))
+    return status[0], json.loads(body)
+
+class TestElpOmegaWSGIMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.app = ElpOmegaWSGIMiddleware(resource_app, secret_key=SECRET)
+
+    def test_prime_then_replay(self):
+        environ = signed_environ()
+        self.assertEqual(call(self.app, environ), ("201 Created", {"data": "PRIME_DATA", "cpf": "123.456.789-10"}))
+        status, body = call(self.app, dict(environ))
+        self.assertEqual(status, "200 OK")
+        self.assertIn("transaction_id", body)
+
+    def test_mounted_app_signs_full_path(self):
+        environ = signed_environ(path="/legacy/api/v1/resource", nonce="mounted", script_name="/legacy")
+        self.assertEqual(call(self.app, environ)[0], "201 Created")
+
+    def test_drifted_client_gets_mirror(self):
+        app = ElpOmegaWSGIMiddleware(resource_app, secret_key=SECRET,
+                                     drift_estimator=ClockDriftEstimator(tight_window_ms=2000))
+        environ = signed_environ(nonce="drift", ts=int(time.time() * 1000) - 60_000)
+        self.assertEqual(call(app, environ), ("201 Created", {"data": "*****_DATA", "cpf": "***.***.*89-10"}))
+
+    def test_concurrent_replay_admits_exactly_one(self):
+        """O mesmo nonce disparado por 32 threads: uma única Prime Reality."""
+        environ = signed_environ(nonce="race")
+        self.app._serve_shadow_reality = lambda *args, **kwargs: [b"{}"]
+        statuses, finished = [], []
+        barrier = threading.Barrier(32)
+
+        def worker():
+            barrier.wait()
+            finished.append(self.app(dict(environ), lambda s, h, exc_info=None: statuses.append(s)))
+
+        threads = [threading.Thread(target=worker) for _ in range(32)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # Todas terminam (uma exceção numa thread não contaria como resposta): 1 Prime + 31 Shadow
+        self.assertEqual(len(finished), 32)
+        self.assertEqual(statuses, ["201 Created"])
+        self.assertEqual(finished.count([b"{}"]), 31)
+
+    def test_body_bound_to_seal(self):
+        def upload_app(environ, start_response):
+            data = json.loads(environ["wsgi.input"].read())
+            start_response("201 Created", [("Content-Type", "application/json")])
+            return [json.dumps({"stored": data["amount"]}).encode()]
+
+        app = ElpOmegaWSGIMiddleware(upload_app, secret_key=SECRET)
+        environ = signed_environ(method="POST", nonce="body-1", body=b'{"amount": 100}')
+        self.assertEqual(call(app, environ), ("201 Created", {"stored": 100}))
+        environ = signed_environ(method="POST", nonce="body-2", body=b'{"amount": 999}', signed_body=b'{"amount": 100}')
+        status, body = call(app, environ)
+        self.assertEqual(status, "200 OK")
+        self.assertIn("transaction_id", body)
+
+    def test_body_mismatch_swallowed_by_app_still_goes_to_shadow(self):
+        """Flask/Django apanham a exceção da view e respondem 500: a resposta tem de ser a Shadow."""
+        closed = []
+
+        class ErrorPage(list):
+            def close(self):
+                closed.append(True)
+
+        def framework_app(environ, start_response):
+            try:
+                environ["wsgi.input"].read()
+            except OSError:
+                start_response("500 INTERNAL SERVER ERROR", [("Content-Type", "text/html")])
+                return ErrorPage([b"<h1>Internal Server Error</h1>"])
+            start_response("201 Created", [("Content-Type", "application/json")])
+            return [b'{"stored": true}']
+
+        class MemorySink:
+            events = []
+            def write_batch(self, batch):
+                self.events.extend(batch)
+            def close(self):
+                pass
+
+        sink = MemorySink()
+        log = EventLog(sink)
+        app = ElpOmegaWSGIMiddleware(framework_app, secret_key=SECRET, event_log=log)
+        environ = signed_environ(method="POST", nonce="swallow-1", body=b'{"amount": 999}',
+                                 signed_body=b'{"amount": 100}')
+        calls = []
+        body = b"".join(app(environ, lambda s, h, exc_info=None: calls.append((s, exc_info))))
+        log.close()
+        self.assertEqual(calls[0][0], "500 INTERNAL SERVER ERROR")
+        # A Shadow substitui os headers da app: o segundo start_response leva exc_info
+        self.assertEqual(calls[-1][0], "200 OK")
+        self.assertIsNotNone(calls[-1][1])
+        self.assertIn("transaction_id", json.loads(body))
+        self.assertEqual(closed, [True])
+        self.assertEqual([(e.reality, e.stage) for e in sink.events], [("SHADOW", Stage.BODY)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,6 +10,9 @@ use serde_json::json;
 
 type HmacSha256 = Hmac<Sha256>;
 
+#[cfg(feature = "python")]
+mod python;
+
 #[derive(Debug, Clone, PartialEq)]
 pub enum Reality {
     Prime,
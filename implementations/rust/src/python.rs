@@ -0,0 +1,194 @@
+//! Extensão Python `_elp_native` (feature `python`).
+//!
+//! Move para código nativo as partes quentes do `EntangledLogicOmegaV5` em
+//! Python: validação de máscara, selo HMAC (cálculo e verificação), registo de
+//! nonces e derivação das sementes da Shadow. O resultado de cada função é
+//! idêntico bit a bit ao da implementação Python (ver
+//! `implementations/python/elp_native.py` e `test_elp_native.py`); o RNG da
+//! Shadow continua no Python (Mersenne Twister), só a semente vem daqui.
+//!
+//! Build: `maturin develop --release` nesta pasta (o pyproject.toml já ativa a feature).
+
+use std::collections::{HashMap, VecDeque};
+use std::sync::Mutex;
+
+use hmac::{Hmac, Mac};
+use pyo3::prelude::*;
+use sha2::{Digest, Sha256};
+use subtle::ConstantTimeEq;
+
+type HmacSha256 = Hmac<Sha256>;
+
+/// Mesma largura das lanes do `NonceStore` Python.
+const LANE_MS: i64 = 30_000;
+
+/// Chave atual + anteriores, com o estado HMAC (ipad/opad) derivado uma única vez.
+#[pyclass(frozen, module = "_elp_native")]
+struct Sealer {
+    keys: Vec<HmacSha256>,
+}
+
+#[pymethods]
+impl Sealer {
+    #[new]
+    fn new(secrets: Vec<Vec<u8>>) -> PyResult<Self> {
+        if secrets.is_empty() {
+            return Err(pyo3::exceptions::PyValueError::new_err("Sealer sem chave atual"));
+        }
+        let keys = secrets
+            .iter()
+            .map(|s| HmacSha256::new_from_slice(s).expect("HMAC aceita chaves de qualquer tamanho"))
+            .collect();
+        Ok(Sealer { keys })
+    }
+
+    /// hexdigest do HMAC-SHA256 com a chave atual (payload já formatado pelo Python).
+    fn compute(&self, payload: &str) -> String {
+        let mut mac = self.keys[0].clone();
+        mac.update(payload.as_bytes());
+        hex::encode(mac.finalize().into_bytes())
+    }
+
+    /// Compara em tempo constante contra todas as chaves, como `hmac.compare_digest`.
+    fn verify(&self, seal: &str, payload: &str) -> bool {
+        let seal = seal.as_bytes();
+        for key in &self.keys {
+            let mut mac = key.clone();
+            mac.update(payload.as_bytes());
+            let expected = hex::encode(mac.finalize().into_bytes());
+            if expected.len() == seal.len() && bool::from(expected.as_bytes().ct_eq(seal)) {
+                return true;
+            }
+        }
+        false
+    }
+}
+
+/// Zeckendorf limitada à largura (até 128 bits; 256 fica no Python).
+#[pyfunction]
+fn is_valid_mask(mask: &Bound<'_, PyAny>, max_value: u128) -> bool {
+    match mask.extract::<u128>() {
+        Ok(m) => m <= max_value && (m & (m >> 1)) == 0,
+        // Negativo (-1 = header malformado) ou maior que 128 bits
+        Err(_) => false,
+    }
+}
+
+/// `int(sha256(seed).hexdigest(), 16) % 10**8`
+#[pyfunction]
+fn shadow_seed(seed_str: &str) -> u64 {
+    Sha256::digest(seed_str.as_bytes())
+        .iter()
+        .fold(0u64, |acc, &b| (acc * 256 + b as u64) % 100_000_000)
+}
+
+/// `int.from_bytes(sha256(seed).digest()[:8], "big")`
+#[pyfunction]
+fn entity_seed(seed_str: &str) -> u64 {
+    let digest = Sha256::digest(seed_str.as_bytes());
+    u64::from_be_bytes(digest[..8].try_into().unwrap())
+}
+
+struct Lanes {
+    expiry: HashMap<String, i64>,
+    lanes: HashMap<i64, VecDeque<String>>,
+    next_purge: i64,
+}
+
+impl Lanes {
+    fn purge(&mut self, now_ms: i64) -> usize {
+        let mut removed = 0;
+        let mut next_purge = i64::MAX;
+        let expiry = &mut self.expiry;
+        self.lanes.retain(|_, queue| {
+            while let Some(head) = queue.front() {
+                if expiry[head] > now_ms {
+                    break;
+                }
+                expiry.remove(head);
+                queue.pop_front();
+                removed += 1;
+            }
+            match queue.front() {
+                Some(head) => {
+                    next_purge = next_purge.min(expiry[head]);
+                    true
+                }
+                None => false,
+            }
+        });
+        self.next_purge = next_purge;
+        removed
+    }
+}
+
+/// Mesma semântica do `NonceStore` Python (expiração por nonce, lanes de TTL),
+/// protegida por um Mutex: segura entre threads, inclusive em builds free-threaded.
+#[pyclass(frozen, module = "_elp_native")]
+struct NonceTable {
+    #[pyo3(get)]
+    max_age_ms: i64,
+    inner: Mutex<Lanes>,
+}
+
+#[pymethods]
+impl NonceTable {
+    #[new]
+    #[pyo3(signature = (max_age_ms=300_000))]
+    fn new(max_age_ms: i64) -> Self {
+        NonceTable {
+            max_age_ms,
+            inner: Mutex::new(Lanes { expiry: HashMap::new(), lanes: HashMap::new(), next_purge: i64::MAX }),
+        }
+    }
+
+    #[pyo3(signature = (nonce, now_ms, expiry_ms=None))]
+    fn add(&self, nonce: &str, now_ms: i64, expiry_ms: Option<i64>) -> bool {
+        let mut state = self.inner.lock().unwrap();
+        if now_ms >= state.next_purge {
+            state.purge(now_ms);
+        }
+        if state.expiry.contains_key(nonce) {
+            return false;
+        }
+        let expiry_ms = expiry_ms.unwrap_or(now_ms + self.max_age_ms);
+        state.expiry.insert(nonce.to_owned(), expiry_ms);
+        // div_euclid = divisão inteira com piso, como `//` no Python
+        let lane = (expiry_ms - now_ms).div_euclid(LANE_MS);
+        state.lanes.entry(lane).or_default().push_back(nonce.to_owned());
+        if expiry_ms < state.next_purge {
+            state.next_purge = expiry_ms;
+        }
+        true
+    }
+
+    fn purge(&self, now_ms: i64) -> usize {
+        self.inner.lock().unwrap().purge(now_ms)
+    }
+
+    /// (nonce, expiração) ainda válidos; o Python calcula os digests para o snapshot.
+    fn live_items(&self, now_ms: i64) -> Vec<(String, i64)> {
+        let state = self.inner.lock().unwrap();
+        state.expiry.iter().filter(|(_, exp)| **exp > now_ms).map(|(n, exp)| (n.clone(), *exp)).collect()
+    }
+
+    fn __contains__(&self, nonce: &str) -> bool {
+        self.inner.lock().unwrap().expiry.contains_key(nonce)
+    }
+
+    fn __len__(&self) -> usize {
+        self.inner.lock().unwrap().expiry.len()
+    }
+}
+
+#[pymodule]
+#[pyo3(name = "_elp_native")]
+fn elp_native(m: &Bound<'_, PyModule>) -> PyResult<()> {
+    m.add_class::<Sealer>()?;
+    m.add_class::<NonceTable>()?;
+    m.add_function(wrap_pyfunction!(is_valid_mask, m)?)?;
+    m.add_function(wrap_pyfunction!(shadow_seed, m)?)?;
+    m.add_function(wrap_pyfunction!(entity_seed, m)?)?;
+    m.add("LANE_MS", LANE_MS)?;
+    Ok(())
+}
@@ -1,30 +1,28 @@
+import argparse
 import uvicorn
 from fastapi import FastAPI
 import sys
 import os
 
-# --- CORREÇÃO DO PATH ---
-# Garante que o Python encontre os módulos na pasta implementations
-current_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(os.path.join(current_dir, "implementations", "python"))
+# Com `pip install -e implementations/python` os módulos já estão no path;
+# num checkout sem instalação, usa a pasta da implementação diretamente.
+try:
+    from elp_middleware import ElpOmegaMiddleware
+except ImportError:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.append(os.path.join(current_dir, "implementations", "python"))
+    from elp_middleware import ElpOmegaMiddleware
 
-# Importação do Middleware
-from elp_middleware import ElpOmegaMiddleware 
-
-app = FastAPI()
-
-# ATIVANDO O ELP-OMEGA
 # A chave deve ser a mesma que está no demo_attack.py
-app.add_middleware(ElpOmegaMiddleware, secret_key="SUA_CHAVE_MESTRA_AQUI")
+SECRET_KEY = "SUA_CHAVE_MESTRA_AQUI"
 
-@app.get("/api/v1/resource")
 async def sensitive_data():
     # Simulamos um pequeno processamento real de banco de dados (10ms a 50ms)
     # para que a Prime Reality não seja instantânea demais (0ms), o que seria suspeito.
     import time
     import random
     time.sleep(random.uniform(0.010, 0.050))
-    
+
     return {
         "data": {
             "secret": "DADOS SECRETOS DO BANC0 CENTRAL",
@@ -35,10 +33,61 @@ async def sensitive_data():
         # O atacante deve inferir pelo conteúdo
     }
 
+def create_app(shared=None):
+    """Fábrica da API. Com `shared` (runner pre-fork), o engine usa o estado partilhado do processo pai."""
+    app = FastAPI()
+
+    # ATIVANDO O ELP-OMEGA
+    if shared is not None:
+        app.add_middleware(ElpOmegaMiddleware, engine=shared.build_engine())
+    else:
+        app.add_middleware(ElpOmegaMiddleware, secret_key=SECRET_KEY)
+
+    app.get("/api/v1/resource")(sensitive_data)
+    return app
+
+app = create_app()
+
+def _load_keyring(keyring_file):
+    from elp_shared import Keyring
+    if keyring_file:
+        return Keyring.from_file(keyring_file)
+    if os.environ.get("ELP_SECRET_KEY"):
+        return Keyring.from_env()
+    return Keyring(SECRET_KEY.encode())
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de demonstração ELP-Ω")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="> 1 ativa o runner pre-fork (SO_REUSEPORT)")
+    parser.add_argument("--keyring-file", help="Uma chave por linha; recarregado com SIGHUP (com --workers > 1)")
+    parser.add_argument("--nonce-snapshot", help="Ficheiro de snapshot dos nonces (fecha a janela de Replay no reinício)")
+    args = parser.parse_args()
+
     print("🛡️  SISTEMA DE DEFESA ELP-OMEGA ATIVO...")
     print("   -> Modo Stealth: ON")
-    print("   -> Ouvindo em http://127.0.0.1:8000")
-    
-    # Otimização: Usamos 127.0.0.1 em vez de localhost para evitar delay de DNS IPv6
-    uvicorn.run(app, host="127.0.0.1", port=8000, log_level="error")
\ No newline at end of file
+    print(f"   -> Ouvindo em http://{args.host}:{args.port} ({args.workers} worker(s))")
+
+    if args.workers > 1 or args.keyring_file or args.nonce_snapshot:
+        from elp_shared import SharedState
+
+        # Keyring e snapshot dos nonces valem também com um único processo
+        shared = SharedState(_load_keyring(args.keyring_file))
+        snapshotter = shared.enable_nonce_snapshots(args.nonce_snapshot) if args.nonce_snapshot else None
+        try:
+            if args.workers > 1:
+                from elp_prefork import PreforkRunner
+
+                PreforkRunner(
+                    create_app, shared, host=args.host, port=args.port, workers=args.workers,
+                    keyring_loader=lambda: _load_keyring(args.keyring_file),
+                ).run()
+            else:
+                uvicorn.run(create_app(shared), host=args.host, port=args.port, log_level="error")
+        finally:
+            if snapshotter is not None:
+                snapshotter.close()
+    else:
+        # Otimização: Usamos 127.0.0.1 em vez de localhost para evitar delay de DNS IPv6
+        uvicorn.run(app, host=args.host, port=args.port, log_level="error")